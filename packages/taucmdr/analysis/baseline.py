@@ -0,0 +1,236 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2016, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""Performance baselines and regression checks.
+
+A baseline summarizes one or more trials of an experiment: for each metric, each function's mean 
+exclusive and inclusive value per rank and the program's total per rank, averaged over the baseline 
+trials with their standard deviation.  A rank's value is the sum over its threads.  Values are per-rank 
+means so trials with different rank counts can be checked against the same baseline.  The summary is small and is stored as a JSON file
+in the experiment directory, so checking a trial against it doesn't require the baseline trials' data.
+"""
+
+import os
+import json
+import math
+from taucmdr import logger, util
+from taucmdr.error import ConfigurationError
+
+
+LOGGER = logger.get_logger(__name__)
+
+BASELINE_FILENAME = 'baseline.json'
+
+BASELINE_VERSION = 2
+
+BASELINE_FIELDS = ('excl', 'incl')
+"""Per-function fields summarized in baselines."""
+
+TOTAL = '<total>'
+"""Name used for the program's total in regression reports."""
+
+
+def _per_rank_means(data, metric):
+    """Returns a dictionary mapping function names to (excl, incl) per-rank means and the total per rank.
+    
+    A rank's value is the sum of its threads' values so trials with different thread counts per rank,
+    e.g. different OpenMP thread counts, are compared by the work each rank did.  The total is summed
+    over flat timers only since callpath timers repeat their values.
+    """
+    nthreads = len(data.threads)
+    nranks = len(set(thread[0] for thread in data.threads))
+    columns = data.function_data[metric]
+    excl, incl = columns['excl'], columns['incl']
+    means = {}
+    for fid, name in enumerate(data.functions):
+        start, stop = fid*nthreads, (fid+1)*nthreads
+        means[name] = (math.fsum(excl[start:stop]) / nranks, math.fsum(incl[start:stop]) / nranks)
+    return means, data.flat_total(metric) / nranks
+
+
+def _mean_stddev(values):
+    mean = math.fsum(values) / len(values)
+    if len(values) < 2:
+        return [mean, 0.0]
+    return [mean, math.sqrt(math.fsum((value - mean)**2 for value in values) / (len(values) - 1))]
+
+
+def summarize(datasets, trial_numbers):
+    """Summarize the profile data of one or more trials as a baseline.
+    
+    Args:
+        datasets (list): :any:`ProfileData` objects of the baseline trials.
+        trial_numbers (list): Numbers of the baseline trials.
+        
+    Returns:
+        dict: The baseline summary.
+        
+    Raises:
+        ConfigurationError: The trials do not have any metrics in common.
+    """
+    metrics = [metric for metric in datasets[0].metrics if all(metric in data.metrics for data in datasets)]
+    if not metrics:
+        raise ConfigurationError("Baseline trials %s do not have any metrics in common" % 
+                                 ', '.join(str(num) for num in trial_numbers))
+    summary = {'version': BASELINE_VERSION, 'trials': list(trial_numbers), 'metrics': {}}
+    for metric in metrics:
+        per_trial = [_per_rank_means(data, metric) for data in datasets]
+        names = set()
+        for means, _ in per_trial:
+            names.update(means)
+        functions = {}
+        for name in names:
+            values = [means.get(name, (0.0, 0.0)) for means, _ in per_trial]
+            functions[name] = [_mean_stddev([value[idx] for value in values]) for idx in xrange(len(BASELINE_FIELDS))]
+        summary['metrics'][metric] = {'total': _mean_stddev([total for _, total in per_trial]), 
+                                      'functions': functions}
+    return summary
+
+
+def save_baseline(prefix, summary):
+    """Write a baseline summary to an experiment directory.
+    
+    Args:
+        prefix (str): Experiment directory.
+        summary (dict): Baseline summary from :any:`summarize`.
+    """
+    path = os.path.join(prefix, BASELINE_FILENAME)
+    util.mkdirp(prefix)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as fout:
+        json.dump(summary, fout, separators=(',', ':'))
+    os.rename(tmp_path, path)
+    LOGGER.debug("Wrote baseline of trials %s to '%s'", summary['trials'], path)
+
+
+def load_baseline(prefix):
+    """Read a baseline summary from an experiment directory.
+    
+    Args:
+        prefix (str): Experiment directory.
+        
+    Returns:
+        dict: The baseline summary.
+        
+    Raises:
+        ConfigurationError: The experiment has no baseline or the baseline is invalid.
+    """
+    path = os.path.join(prefix, BASELINE_FILENAME)
+    try:
+        with open(path) as fin:
+            summary = json.load(fin)
+    except IOError:
+        raise ConfigurationError("No baseline has been set for this experiment",
+                                 "Use `tau trial baseline set` to set a baseline.")
+    except ValueError as err:
+        raise ConfigurationError("Invalid baseline file '%s': %s" % (path, err),
+                                 "Use `tau trial baseline set` to reset the baseline.")
+    if summary.get('version') != BASELINE_VERSION:
+        raise ConfigurationError("Baseline file '%s' was written by an incompatible version of TAU Commander" % path,
+                                 "Use `tau trial baseline set` to reset the baseline.")
+    return summary
+
+
+def remove_baseline(prefix):
+    """Delete an experiment's baseline summary, if it has one."""
+    path = os.path.join(prefix, BASELINE_FILENAME)
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def check_regressions(summary, data, metric=None, field='excl', absolute=None, relative=None, sigmas=None, 
+                      min_percent=1.0, functions=True):
+    """Check profile data for regressions against a baseline.
+    
+    A value regresses if it exceeds the baseline value by more than every given threshold.
+    If no threshold is given the relative threshold defaults to 10%.
+    
+    Args:
+        summary (dict): Baseline summary from :any:`load_baseline`.
+        data (ProfileData): Profile data of the trial to check.
+        metric (str): Metric to check.  Default is the trial's first metric.
+        field (str): One of :any:`BASELINE_FIELDS`, used for per-function checks.
+        absolute (float): Allowed increase in the metric's units.
+        relative (float): Allowed increase as a fraction of the baseline value, e.g. 0.1 for 10%.
+        sigmas (float): Allowed increase in standard deviations of the baseline trials.
+        min_percent (float): Skip functions whose baseline value is less than this percentage of the total.
+        functions (bool): If False, only check the program's total.
+        
+    Returns:
+        list: One dictionary for each regression with 'name', 'baseline', 'value', 'delta', 'ratio', 
+              and 'limit' keys, ordered by descending delta.  The program's total is named :any:`TOTAL`.
+              
+    Raises:
+        ConfigurationError: Invalid metric, field, or thresholds.
+    """
+    if metric is None:
+        metric = data.metrics[0]
+    if metric not in data.metrics or metric not in summary['metrics']:
+        raise ConfigurationError("Metric '%s' is not in both the trial and the baseline" % metric,
+                                 "Baseline metrics: %s" % ', '.join(sorted(summary['metrics'])))
+    if field not in BASELINE_FIELDS:
+        raise ConfigurationError("Invalid baseline field '%s'" % field, 
+                                 "Valid fields: %s" % ', '.join(BASELINE_FIELDS))
+    if sigmas is not None and len(summary['trials']) < 2:
+        raise ConfigurationError("Statistical thresholds need a baseline of at least two trials",
+                                 "Use `tau trial baseline set` with several trial numbers.")
+    if absolute is None and relative is None and sigmas is None:
+        relative = 0.1
+
+    def limit(mean, stddev):
+        limits = []
+        if absolute is not None:
+            limits.append(mean + absolute)
+        if relative is not None:
+            limits.append(mean * (1 + relative))
+        if sigmas is not None:
+            limits.append(mean + sigmas * stddev)
+        return max(limits)
+
+    def check(name, base, value):
+        mean, stddev = base
+        max_value = limit(mean, stddev)
+        if value > max_value:
+            regressions.append({'name': name, 'baseline': mean, 'value': value, 'delta': value - mean,
+                                'ratio': value / mean if mean else None, 'limit': max_value})
+
+    regressions = []
+    baseline = summary['metrics'][metric]
+    means, total = _per_rank_means(data, metric)
+    check(TOTAL, baseline['total'], total)
+    if functions:
+        idx = BASELINE_FIELDS.index(field)
+        min_value = baseline['total'][0] * min_percent / 100.0
+        for name, base in baseline['functions'].iteritems():
+            if base[idx][0] >= min_value:
+                check(name, base[idx], means.get(name, (0.0, 0.0))[idx])
+        # Functions that are not in the baseline are checked against zero
+        for name, value in means.iteritems():
+            if name not in baseline['functions'] and value[idx] >= min_value:
+                check(name, (0.0, 0.0), value[idx])
+    regressions.sort(key=lambda reg: reg['delta'], reverse=True)
+    return regressions
@@ -0,0 +1,241 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2016, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""Persistent binary cache of parsed trial profiles.
+
+Parsing text profiles can take minutes for large trials, so the first time a trial's profiles are
+loaded the :any:`ProfileData` columns are saved in the trial directory.  Later loads memory-map
+the cache and only copies a column out of the map when it is first used, so loading is nearly instant.
+The cache is in the trial directory so it is removed with the trial.
+
+The cache file starts with a fixed-size header (magic, format version, key, header length) followed 
+by a JSON header holding the names, metadata, and column offsets, then the raw ``array('d')`` columns
+in native byte order aligned to 8 bytes.  The key is a digest of the sizes and modification times 
+of the trial's data files so a cache is ignored if the trial data changes, e.g. when the trial is 
+packed or its trace data is dropped.
+"""
+
+import os
+import sys
+import mmap
+import json
+import struct
+import hashlib
+import tempfile
+from array import array
+from taucmdr import logger
+from taucmdr.analysis import profile
+from taucmdr.analysis.profile import ProfileData, FUNCTION_FIELDS, USER_EVENT_FIELDS
+
+
+LOGGER = logger.get_logger(__name__)
+
+CACHE_VERSION = 1
+
+_MAGIC = 'TAUCACHE'
+
+_PREAMBLE = struct.Struct('<8sI20sQ')
+
+_ALIGN = 8
+
+
+def cache_key(trial):
+    """Compute a digest of the sizes and modification times of a trial's data files.
+    
+    Args:
+        trial (Trial): The trial.
+        
+    Returns:
+        str: 20-byte binary digest.
+    """
+    digest = hashlib.sha1()
+    digest.update(str(CACHE_VERSION))
+    digest.update(str(trial.profile_format()))
+    if trial.is_compact():
+        names = [trial.open_pack().path]
+    else:
+        names = [os.path.join(trial.prefix, name) for name in trial.data_members()]
+    for path in names:
+        stat = os.stat(path)
+        digest.update('%s\0%d\0%r\0' % (os.path.relpath(path, trial.prefix), stat.st_size, stat.st_mtime))
+    return digest.digest()
+
+
+class _MappedColumns(dict):
+    """Columns that are copied out of the cache file's memory map when first used."""
+
+    def __init__(self, mapped, offsets):
+        super(_MappedColumns, self).__init__()
+        self._mapped = mapped
+        self._offsets = offsets
+
+    def __missing__(self, key):
+        start, count = self._offsets[key]
+        column = array('d')
+        column.fromstring(self._mapped[start:start+count*column.itemsize])
+        self[key] = column
+        return column
+
+    def _load_all(self):
+        for key in self._offsets:
+            if not dict.__contains__(self, key):
+                self.__missing__(key)
+
+    def itervalues(self):
+        self._load_all()
+        return super(_MappedColumns, self).itervalues()
+
+    def iteritems(self):
+        self._load_all()
+        return super(_MappedColumns, self).iteritems()
+
+    def values(self):
+        self._load_all()
+        return super(_MappedColumns, self).values()
+
+    def items(self):
+        self._load_all()
+        return super(_MappedColumns, self).items()
+
+
+def save_cache(path, data, key):
+    """Write profile data to a cache file.
+    
+    The file is written to a temporary file and renamed so readers never see a partial cache.
+    
+    Args:
+        path (str): Path to the cache file.
+        data (ProfileData): The profile data.
+        key (str): Cache key from :any:`cache_key`.
+    """
+    columns = [('function', metric, field, data.function_data[metric][field]) 
+               for metric in data.metrics for field in FUNCTION_FIELDS]
+    columns.extend(('user_event', None, field, data.user_event_data[field]) for field in USER_EVENT_FIELDS)
+    header = {'byteorder': sys.byteorder,
+              'threads': data.threads,
+              'metrics': data.metrics,
+              'functions': data.functions,
+              'groups': data.groups,
+              'user_events': data.user_events,
+              'metadata': data.metadata,
+              'columns': [(kind, metric, field, len(column)) for kind, metric, field, column in columns]}
+    header = json.dumps(header, separators=(',', ':'))
+    data_start = _PREAMBLE.size + len(header)
+    padding = -data_start % _ALIGN
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.' + os.path.basename(path))
+    try:
+        with os.fdopen(fd, 'wb') as fout:
+            fout.write(_PREAMBLE.pack(_MAGIC, CACHE_VERSION, key, len(header)))
+            fout.write(header)
+            fout.write('\0' * padding)
+            for _, _, _, column in columns:
+                column.tofile(fout)
+        os.rename(tmp_path, path)
+    except:
+        os.remove(tmp_path)
+        raise
+
+
+def load_cache(path, key):
+    """Load profile data from a cache file.
+    
+    Args:
+        path (str): Path to the cache file.
+        key (str): Expected cache key from :any:`cache_key`.
+        
+    Returns:
+        ProfileData: The profile data, or None if the cache is missing, stale, or invalid.
+    """
+    try:
+        with open(path, 'rb') as fin:
+            mapped = mmap.mmap(fin.fileno(), 0, access=mmap.ACCESS_READ)
+    except (IOError, OSError, ValueError):
+        return None
+    try:
+        magic, version, cached_key, header_size = _PREAMBLE.unpack_from(mapped)
+        if magic != _MAGIC or version != CACHE_VERSION or cached_key != key:
+            LOGGER.debug("Ignoring stale analysis cache '%s'", path)
+            return None
+        header = json.loads(mapped[_PREAMBLE.size:_PREAMBLE.size+header_size])
+        if header['byteorder'] != sys.byteorder:
+            return None
+    except (struct.error, ValueError, KeyError):
+        LOGGER.debug("Ignoring invalid analysis cache '%s'", path)
+        return None
+    data = ProfileData([tuple(thread) for thread in header['threads']], [str(metric) for metric in header['metrics']])
+    data.functions = [intern(str(name)) for name in header['functions']]
+    data.function_ids = dict((name, idx) for idx, name in enumerate(data.functions))
+    data.groups = [[intern(str(group)) for group in groups] for groups in header['groups']]
+    data.user_events = [intern(str(name)) for name in header['user_events']]
+    data.user_event_ids = dict((name, idx) for idx, name in enumerate(data.user_events))
+    data.metadata = header['metadata']
+    offset = _PREAMBLE.size + header_size
+    offset += -offset % _ALIGN
+    function_offsets = dict((str(metric), {}) for metric in data.metrics)
+    user_event_offsets = {}
+    for kind, metric, field, count in header['columns']:
+        offsets = function_offsets[str(metric)] if kind == 'function' else user_event_offsets
+        offsets[str(field)] = (offset, count)
+        offset += count * array('d').itemsize
+    if offset > len(mapped):
+        LOGGER.debug("Ignoring truncated analysis cache '%s'", path)
+        return None
+    data.function_data = dict((metric, _MappedColumns(mapped, offsets)) 
+                              for metric, offsets in function_offsets.iteritems())
+    data.user_event_data = _MappedColumns(mapped, user_event_offsets)
+    return data
+
+
+def load_trial(trial, nprocs=None, nodes=None):
+    """Load a trial's profiles from the trial's analysis cache, parsing and caching them if needed.
+    
+    Args:
+        trial (Trial): The trial.
+        nprocs (int): Number of processes parsing profiles, see :any:`profile.load_profiles`.
+        nodes (set): If not None and the trial has no cache, only parse profiles of these nodes (ranks)
+                     and don't write a cache.  The cache holds all nodes if it exists.
+        
+    Returns:
+        ProfileData: The profile data.
+        
+    Raises:
+        ConfigurationError: The trial has no profiles or a profile is invalid.
+    """
+    key = cache_key(trial)
+    path = trial.analysis_cache_path()
+    data = load_cache(path, key)
+    if data is not None:
+        LOGGER.debug("Loaded trial %s profiles from '%s'", trial['number'], path)
+        return data
+    if nodes is not None:
+        return profile.load_trial(trial, nprocs, nodes)
+    data = profile.load_trial(trial, nprocs)
+    try:
+        save_cache(path, data, key)
+    except (IOError, OSError) as err:
+        LOGGER.debug("Could not write analysis cache '%s': %s", path, err)
+    return data
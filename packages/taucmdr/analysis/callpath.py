@@ -0,0 +1,265 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2016, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""Call trees from TAU callpath profiles.
+
+When the measurement's ``callpath`` depth is greater than zero TAU writes a timer for each call path
+as well as for each function, e.g. ``main => solve => MPI_Allreduce()``.  :any:`CallTree` splits 
+these names into frames and builds a trie of interned frame ids.  TAU truncates call paths to the 
+callpath depth by dropping the outermost frames, so with a small depth the tree may have several
+roots that are not the program's entry point.  Those roots have no values of their own so each 
+function's values are counted once.
+"""
+
+import heapq
+from array import array
+from taucmdr.error import ConfigurationError
+from taucmdr.analysis.profile import FUNCTION_FIELDS, CALLPATH_SEPARATOR
+
+
+SEPARATOR = CALLPATH_SEPARATOR
+"""Separator between frames in TAU callpath timer names."""
+
+
+def callpath_timers(data):
+    """Find the timers that make up a call tree.
+    
+    These are the callpath timers and the flat timers of the program's entry points, which TAU
+    only records by their flat timers.  If the call paths are truncated then the outermost frame of
+    a truncated path is also called from somewhere else.  Its flat timer counts every call so it is
+    not added as a root: its values are already in the call paths that end at it.
+    
+    Args:
+        data (ProfileData): Profile data with callpath timers.
+        
+    Returns:
+        list: (function id, list of frame names) tuples.
+        
+    Raises:
+        ConfigurationError: `data` has no callpath timers.
+    """
+    paths = [(fid, [frame.strip() for frame in name.split(SEPARATOR)]) 
+             for fid, name in enumerate(data.functions) if SEPARATOR in name]
+    if not paths:
+        raise ConfigurationError("The profile data does not have callpath timers",
+                                 "Set the measurement's callpath depth greater than zero, e.g. "
+                                 "`tau measurement edit <name> --callpath 100`.")
+    callees = set(frame for _, path in paths for frame in path[1:])
+    roots = set(path[0] for _, path in paths if path[0] not in callees)
+    paths.extend((fid, [name]) for fid, name in enumerate(data.functions) if name in roots)
+    return paths
+
+
+class CallTree(object):
+    """Call tree of a trial built from the trial's callpath timers.
+    
+    Nodes are identified by integer ids.  Node 0 is a virtual root whose children are the outermost 
+    recorded frames.  Node values are the callpath timers' values summed over all threads; a node 
+    without a timer of its own, e.g. the prefix of a truncated call path, has zero values.
+    
+    Attributes:
+        metric (str): Metric of the node values.
+        frames (list): Frame (function) names in frame id order.
+        parents (array): Parent node id of each node, -1 for the root.
+        node_frames (array): Frame id of each node, -1 for the root.
+        functions (array): Function id in the profile data of each node's timer, or -1.
+        children (list): Dictionary mapping frame id to child node id for each node.
+        values (dict): Maps each of :any:`FUNCTION_FIELDS` to an ``array('d')`` of node values.
+    """
+
+    def __init__(self, data, metric=None):
+        """Build the call tree.
+        
+        Args:
+            data (ProfileData): Profile data with callpath timers.
+            metric (str): Metric name.  Default is the first metric in `data`.
+            
+        Raises:
+            ConfigurationError: `data` has no callpath timers.
+        """
+        self.data = data
+        self.metric = metric or data.metrics[0]
+        self.frames = []
+        self.frame_ids = {}
+        self.parents = array('i', [-1])
+        self.node_frames = array('i', [-1])
+        self.functions = array('i', [-1])
+        self.children = [{}]
+        for fid, path in callpath_timers(data):
+            self.functions[self._insert(path)] = fid
+        totals = dict((field, data.totals(self.metric, field)) for field in FUNCTION_FIELDS)
+        self.values = dict((field, array('d', (column[fid] if fid >= 0 else 0.0 for fid in self.functions)))
+                           for field, column in totals.iteritems())
+
+    def __len__(self):
+        return len(self.parents)
+
+    def _insert(self, path):
+        node = 0
+        for name in path:
+            try:
+                frame = self.frame_ids[name]
+            except KeyError:
+                frame = self.frame_ids[intern(name)] = len(self.frames)
+                self.frames.append(intern(name))
+            try:
+                node = self.children[node][frame]
+            except KeyError:
+                child = len(self.parents)
+                self.children[node][frame] = child
+                self.parents.append(node)
+                self.node_frames.append(frame)
+                self.functions.append(-1)
+                self.children.append({})
+                node = child
+        return node
+
+    def path(self, node):
+        """Returns the list of frame names from the outermost frame to `node`."""
+        frames = []
+        while node > 0:
+            frames.append(self.frames[self.node_frames[node]])
+            node = self.parents[node]
+        frames.reverse()
+        return frames
+
+    def path_name(self, node):
+        """Returns the TAU callpath timer name of `node`."""
+        return SEPARATOR.join(self.path(node))
+
+    def find(self, path):
+        """Find the node for a call path.
+        
+        Args:
+            path: Callpath timer name or list of frame names.
+            
+        Returns:
+            int: The node id.
+            
+        Raises:
+            KeyError: The call path is not in the tree.
+        """
+        if isinstance(path, basestring):
+            path = [frame.strip() for frame in path.split(SEPARATOR)]
+        node = 0
+        for name in path:
+            node = self.children[node][self.frame_ids[name]]
+        return node
+
+    def subtree(self, node=0):
+        """Iterate over the ids of `node` and all its descendants in depth-first order."""
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            yield node
+            stack.extend(self.children[node].itervalues())
+
+    def subtree_total(self, node=0, field='excl'):
+        """Returns the sum of a field over `node` and all its descendants.
+        
+        The subtree total of exclusive values is the inclusive value of the call path as recorded
+        in the tree, which may differ from the timer's inclusive value if the tree is truncated.
+        """
+        column = self.values[field]
+        return sum(column[idx] for idx in self.subtree(node))
+
+    def hottest_paths(self, count=10, field='excl'):
+        """Find the call paths with the largest values.
+        
+        Args:
+            count (int): Number of call paths to return.
+            field (str): One of :any:`FUNCTION_FIELDS`.
+            
+        Returns:
+            list: (callpath timer name, value) tuples ordered by descending value.
+        """
+        column = self.values[field]
+        nodes = heapq.nlargest(count, xrange(1, len(self)), key=column.__getitem__)
+        return [(self.path_name(node), column[node]) for node in nodes]
+
+    def _group_by(self, name, field, related):
+        # `related` maps a node of `name` to (related node, node holding the value) pairs
+        try:
+            frame = self.frame_ids[name]
+        except KeyError:
+            raise ConfigurationError("No function named '%s' in the call tree" % name)
+        column = self.values[field]
+        groups = {}
+        for node in xrange(1, len(self)):
+            if self.node_frames[node] == frame:
+                for other, valued in related(node):
+                    key = self.frames[self.node_frames[other]]
+                    groups[key] = groups.get(key, 0.0) + column[valued]
+        return sorted(groups.iteritems(), key=lambda item: item[1], reverse=True)
+
+    def callers(self, name, field='incl'):
+        """Find the functions that call a function.
+        
+        Args:
+            name (str): Function name.
+            field (str): One of :any:`FUNCTION_FIELDS`.
+            
+        Returns:
+            list: (caller name, value) tuples ordered by descending value, where value is the sum of 
+                  `name`'s call path values over all call paths in which the caller calls `name`.
+                  
+        Raises:
+            ConfigurationError: `name` is not in the call tree.
+        """
+        return self._group_by(name, field, 
+                              lambda node: [(self.parents[node], node)] if self.parents[node] > 0 else [])
+
+    def callees(self, name, field='incl'):
+        """Find the functions that a function calls.
+        
+        Args:
+            name (str): Function name.
+            field (str): One of :any:`FUNCTION_FIELDS`.
+            
+        Returns:
+            list: (callee name, value) tuples ordered by descending value, where value is the sum of 
+                  the callee's call path values over all call paths in which `name` calls the callee.
+                  
+        Raises:
+            ConfigurationError: `name` is not in the call tree.
+        """
+        return self._group_by(name, field, lambda node: [(child, child) for child in self.children[node].itervalues()])
+
+    def column(self, node, field='excl'):
+        """Returns a node's values on every thread.
+        
+        Args:
+            node (int): Node id.
+            field (str): One of :any:`FUNCTION_FIELDS`.
+            
+        Returns:
+            array: ``len(threads)`` values in thread index order, zero if the node has no timer of its own.
+        """
+        fid = self.functions[node]
+        if fid < 0:
+            return array('d', [0.0]) * len(self.data.threads)
+        return self.data.column(self.metric, field, fid)
@@ -0,0 +1,303 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2016, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""Rank clustering and outlier detection.
+
+Each rank (node) is described by a feature vector of its values for the functions with the largest
+totals, summed over the rank's threads.  Features are standardized so that functions with large 
+values don't dominate, then ranks are grouped by k-means.  Outlier ranks are flagged by the robust 
+z-score of each raw feature within the rank's cluster, which uses the median and median absolute 
+deviation so a few extreme ranks can't hide themselves by inflating the mean and standard deviation.
+Clusters with fewer than :any:`MIN_CLUSTER_FRACTION` of the ranks are scored against the nearest 
+larger cluster so that a group of similar stragglers can't hide itself in a cluster of its own.
+"""
+
+import math
+import heapq
+import random
+import operator
+from taucmdr.error import ConfigurationError
+from taucmdr.analysis.profile import FUNCTION_FIELDS
+
+
+DEFAULT_CLUSTERS = 4
+
+MAX_FEATURES = 16
+"""Number of functions with the largest totals used as clustering features."""
+
+OUTLIER_THRESHOLD = 3.5
+"""Robust z-score above which a rank is an outlier, as recommended by Iglewicz and Hoaglin."""
+
+MIN_CLUSTER_FRACTION = 0.1
+"""Clusters with a smaller fraction of the ranks are scored against the nearest larger cluster."""
+
+TOTAL = '<total>'
+"""Feature name of the rank's total over all functions."""
+
+
+def rank_features(data, metric=None, field='excl', max_features=MAX_FEATURES):
+    """Build a rank by function feature matrix.
+    
+    Args:
+        data (ProfileData): The profile data.
+        metric (str): Metric name.  Default is the first metric in `data`.
+        field (str): One of :any:`FUNCTION_FIELDS`.
+        max_features (int): Maximum number of functions to use as features.
+        
+    Returns:
+        tuple: (ranks, functions, rows) where `ranks` is the sorted list of node numbers, `functions` is 
+               the list of feature function names, and `rows` is a list with one list of feature values 
+               per rank.
+    """
+    metric = metric or data.metrics[0]
+    if field not in FUNCTION_FIELDS:
+        raise ConfigurationError("Invalid profile field '%s'" % field,
+                                 "Valid fields: %s" % ', '.join(FUNCTION_FIELDS))
+    totals = data.totals(metric, field)
+    fids = [fid for fid in heapq.nlargest(max_features, xrange(len(totals)), key=totals.__getitem__) 
+            if totals[fid] > 0]
+    ranks = sorted(set(thread[0] for thread in data.threads))
+    rank_index = dict((rank, idx) for idx, rank in enumerate(ranks))
+    thread_ranks = [rank_index[thread[0]] for thread in data.threads]
+    rows = [[0.0] * len(fids) for _ in ranks]
+    for feature, fid in enumerate(fids):
+        for tid, value in enumerate(data.column(metric, field, fid)):
+            rows[thread_ranks[tid]][feature] += value
+    return ranks, [data.functions[fid] for fid in fids], rows
+
+
+def standardize(rows):
+    """Scale each feature to zero mean and unit standard deviation.
+    
+    Features that have the same value on every rank are set to zero.
+    
+    Args:
+        rows (list): Feature vectors.
+        
+    Returns:
+        list: Standardized feature vectors.
+    """
+    if not rows:
+        return []
+    count = float(len(rows))
+    columns = zip(*rows)
+    means = [math.fsum(column) / count for column in columns]
+    stddevs = [math.sqrt(math.fsum((value - mean)**2 for value in column) / count) 
+               for column, mean in zip(columns, means)]
+    scales = [1.0 / stddev if stddev else 0.0 for stddev in stddevs]
+    return [map(operator.mul, map(operator.sub, row, means), scales) for row in rows]
+
+
+def _distance(lhs, rhs):
+    delta = map(operator.sub, lhs, rhs)
+    return sum(map(operator.mul, delta, delta))
+
+
+def _nearest(row, centroids):
+    best, best_dist = 0, _distance(row, centroids[0])
+    for idx in xrange(1, len(centroids)):
+        dist = _distance(row, centroids[idx])
+        if dist < best_dist:
+            best, best_dist = idx, dist
+    return best, best_dist
+
+
+def kmeans(rows, count, max_iterations=100, seed=0):
+    """Group feature vectors into clusters by k-means.
+    
+    Initial centroids are chosen by k-means++ with a fixed seed so results are reproducible.
+    
+    Args:
+        rows (list): Feature vectors.
+        count (int): Number of clusters.  Fewer clusters are made if there are fewer distinct rows.
+        max_iterations (int): Maximum number of assignment and update steps.
+        seed (int): Random seed.
+        
+    Returns:
+        tuple: (assignments, centroids) where `assignments` is the cluster index of each row.
+    """
+    rng = random.Random(seed)
+    distinct = len(set(tuple(row) for row in rows))
+    count = min(count, distinct)
+    centroids = [list(rows[rng.randrange(len(rows))])]
+    dists = [_distance(row, centroids[0]) for row in rows]
+    while len(centroids) < count:
+        target = rng.random() * math.fsum(dists)
+        acc = 0.0
+        for idx, dist in enumerate(dists):
+            acc += dist
+            if acc >= target and dist > 0:
+                break
+        centroids.append(list(rows[idx]))
+        dists = map(min, dists, [_distance(row, centroids[-1]) for row in rows])
+    assignments = None
+    for _ in xrange(max_iterations):
+        nearest = [_nearest(row, centroids) for row in rows]
+        new_assignments = [cluster for cluster, _ in nearest]
+        if new_assignments == assignments:
+            break
+        assignments = new_assignments
+        sums = [[0.0] * len(rows[0]) for _ in centroids]
+        sizes = [0] * len(centroids)
+        for row, cluster in zip(rows, assignments):
+            sums[cluster] = map(operator.add, sums[cluster], row)
+            sizes[cluster] += 1
+        for cluster, size in enumerate(sizes):
+            if size:
+                centroids[cluster] = [value / size for value in sums[cluster]]
+            else:
+                # Move an empty cluster's centroid to the row farthest from its centroid
+                farthest = max(xrange(len(rows)), key=lambda idx: nearest[idx][1])
+                centroids[cluster] = list(rows[farthest])
+                nearest[farthest] = (cluster, 0.0)
+    return assignments, centroids
+
+
+def robust_scale(values):
+    """Compute the median and robust z-score scale factor of values.
+    
+    The scale factor is 0.6745 over the median absolute deviation (MAD), so ``(value - median) * scale`` 
+    is comparable to a standard z-score for normally distributed values.
+    
+    Args:
+        values (list): Values.
+        
+    Returns:
+        tuple: (median, scale).  The scale is zero if the values have no spread.
+    """
+    ordered = sorted(values)
+    count = len(ordered)
+    median = (ordered[(count - 1) // 2] + ordered[count // 2]) / 2.0
+    deviations = sorted(abs(value - median) for value in values)
+    mad = (deviations[(count - 1) // 2] + deviations[count // 2]) / 2.0
+    if mad:
+        return median, 0.6745 / mad
+    # More than half the values are equal, fall back to the mean absolute deviation
+    meanad = math.fsum(deviations) / count
+    return median, 1.0 / (1.253314 * meanad) if meanad else 0.0
+
+
+def robust_zscores(values):
+    """Compute the robust (median and MAD based) z-score of each value.
+    
+    Args:
+        values (list): Values.
+        
+    Returns:
+        tuple: (median, list of z-scores).  Scores are zero if the values have no spread.
+    """
+    median, scale = robust_scale(values)
+    return median, [(value - median) * scale for value in values]
+
+
+def _rank_ranges(ranks):
+    """Format sorted rank numbers compactly, e.g. "0-3,7,9-12"."""
+    parts = []
+    start = prev = None
+    for rank in ranks:
+        if start is None:
+            start = prev = rank
+        elif rank == prev + 1:
+            prev = rank
+        else:
+            parts.append(str(start) if start == prev else '%d-%d' % (start, prev))
+            start = prev = rank
+    if start is not None:
+        parts.append(str(start) if start == prev else '%d-%d' % (start, prev))
+    return ','.join(parts)
+
+
+def cluster_ranks(data, count=DEFAULT_CLUSTERS, metric=None, field='excl', max_features=MAX_FEATURES, 
+                  threshold=OUTLIER_THRESHOLD):
+    """Group ranks with similar behavior and find outlier ranks.
+    
+    Args:
+        data (ProfileData): The profile data.
+        count (int): Number of clusters.
+        metric (str): Metric name.  Default is the first metric in `data`.
+        field (str): One of :any:`FUNCTION_FIELDS`.
+        max_features (int): Maximum number of functions to use as features.
+        threshold (float): Robust z-score magnitude above which a rank is an outlier.
+        
+    Returns:
+        dict: 'functions' is the list of feature function names.  'clusters' is a list of dictionaries 
+              with 'ranks' (sorted rank numbers), 'rank_ranges' (formatted rank numbers), 'size', and 
+              'representative' (the rank closest to the cluster centroid) keys, largest cluster first.
+              'outliers' is a list of dictionaries with 'rank', 'function', 'value', 'median', and 
+              'zscore' keys for each outlier rank's most extreme feature compared to the rank's cluster, 
+              most extreme first.
+              
+    Raises:
+        ConfigurationError: Invalid arguments or no data to cluster.
+    """
+    if count < 1:
+        raise ConfigurationError("Invalid cluster count: %s" % count)
+    ranks, functions, rows = rank_features(data, metric, field, max_features)
+    if not functions:
+        raise ConfigurationError("No %s values to cluster ranks by" % field)
+    scaled = standardize(rows)
+    assignments, centroids = kmeans(scaled, count)
+    members = [[] for _ in centroids]
+    for idx, cluster in enumerate(assignments):
+        members[cluster].append(idx)
+    clusters = []
+    for cluster, indices in enumerate(members):
+        if not indices:
+            continue
+        representative = min(indices, key=lambda idx: _distance(scaled[idx], centroids[cluster]))
+        members_ranks = [ranks[idx] for idx in indices]
+        clusters.append({'ranks': members_ranks, 'rank_ranges': _rank_ranges(members_ranks), 
+                         'size': len(indices), 'representative': ranks[representative]})
+    clusters.sort(key=lambda cluster: (-cluster['size'], cluster['ranks'][0]))
+    # Ranks are compared to their own cluster since the distribution over all ranks may be multimodal.
+    # A small group of similar stragglers forms its own cluster with a small spread, so ranks in small
+    # clusters are compared to the nearest large cluster instead.
+    min_size = max(3, int(math.ceil(MIN_CLUSTER_FRACTION * len(ranks))))
+    large = [cluster for cluster, indices in enumerate(members) if len(indices) >= min_size]
+    features = zip(*rows) + [[math.fsum(row) for row in rows]]
+    names = functions + [TOTAL]
+    worst = {}
+    for cluster, indices in enumerate(members):
+        if not indices:
+            continue
+        reference = indices
+        if len(indices) < min_size:
+            others = [other for other in large if other != cluster]
+            if others:
+                nearest = min(others, key=lambda other: _distance(centroids[cluster], centroids[other]))
+                reference = members[nearest]
+            else:
+                reference = range(len(ranks))
+        for name, values in zip(names, features):
+            median, scale = robust_scale([values[idx] for idx in reference])
+            for idx in indices:
+                zscore = (values[idx] - median) * scale
+                if abs(zscore) > threshold and abs(zscore) > abs(worst.get(idx, {}).get('zscore', 0.0)):
+                    worst[idx] = {'rank': ranks[idx], 'function': name, 'value': values[idx], 
+                                  'median': median, 'zscore': zscore}
+    outliers = sorted(worst.itervalues(), key=lambda outlier: abs(outlier['zscore']), reverse=True)
+    return {'functions': functions, 'clusters': clusters, 'outliers': outliers}
@@ -0,0 +1,249 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2016, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""Point-to-point communication matrices.
+
+When the measurement's ``comm_matrix`` option is set TAU records a user event on each sending rank
+for each destination rank, named ``Message size sent to node <N>``, whose sample count is the number
+of messages and whose mean is the mean message size in bytes.  With callpath profiling TAU also 
+records the same events qualified by call path,
+``Message size sent to node <N> : main => MPI_Send()``,
+which are only used if the unqualified events are missing.
+
+:any:`CommMatrix` holds the matrix in sparse coordinate (COO) form, one entry per communicating 
+(sender, receiver) pair, and can be converted to compressed sparse row (CSR) form.
+"""
+
+import re
+import sys
+import math
+import heapq
+import struct
+from array import array
+from taucmdr.error import ConfigurationError
+
+
+_SENT_EVENT = re.compile(r'^Message size sent to node (\d+)(\s*:.*)?$')
+
+BINARY_MAGIC = 'TAUCOMM1'
+
+_BINARY_HEADER = struct.Struct('<8sqq')
+
+
+class CommMatrix(object):
+    """Sparse point-to-point communication matrix.
+    
+    Entries are ordered by sender, then receiver, and each pair occurs at most once.
+    
+    Attributes:
+        nranks (int): Number of ranks, i.e. the matrix is `nranks` by `nranks`.
+        senders (array): Sender rank of each entry.
+        receivers (array): Receiver rank of each entry.
+        messages (array): Number of messages of each entry.
+        bytes (array): Number of bytes of each entry.
+    """
+
+    def __init__(self, nranks, senders, receivers, messages, nbytes):
+        self.nranks = nranks
+        self.senders = senders
+        self.receivers = receivers
+        self.messages = messages
+        self.bytes = nbytes
+
+    def __len__(self):
+        return len(self.senders)
+
+    @classmethod
+    def from_coo(cls, nranks, entries):
+        """Build a matrix from unordered entries, summing entries of the same (sender, receiver) pair.
+        
+        Args:
+            nranks (int): Number of ranks.
+            entries: Iterable of (sender, receiver, messages, bytes) tuples.
+            
+        Returns:
+            CommMatrix: The matrix.
+        """
+        # Pairs are keyed by their row-major index so duplicates are summed in one pass
+        messages, nbytes = {}, {}
+        for sender, receiver, count, size in entries:
+            key = sender * nranks + receiver
+            messages[key] = messages.get(key, 0.0) + count
+            nbytes[key] = nbytes.get(key, 0.0) + size
+        keys = sorted(messages)
+        return cls(nranks, array('i', (key // nranks for key in keys)), array('i', (key % nranks for key in keys)),
+                   array('d', (messages[key] for key in keys)), array('d', (nbytes[key] for key in keys)))
+
+    @classmethod
+    def from_profile(cls, data):
+        """Extract the communication matrix from profile data.
+        
+        Args:
+            data (ProfileData): Profile data with TAU communication matrix user events.
+            
+        Returns:
+            CommMatrix: The matrix.
+            
+        Raises:
+            ConfigurationError: `data` has no communication matrix events.
+        """
+        plain, qualified = [], []
+        for eid, name in enumerate(data.user_events):
+            match = _SENT_EVENT.match(name)
+            if match:
+                (qualified if match.group(2) else plain).append((eid, int(match.group(1))))
+        events = plain or qualified
+        if not events:
+            raise ConfigurationError("The profile data does not have communication matrix events",
+                                     "Enable the measurement's communication matrix, e.g. "
+                                     "`tau measurement edit <name> --comm-matrix`.")
+        senders = [thread[0] for thread in data.threads]
+        nranks = max(max(senders), max(receiver for _, receiver in events)) + 1
+        counts = data.user_event_data['count']
+        means = data.user_event_data['mean']
+        nthreads = len(data.threads)
+
+        def entries():
+            for eid, receiver in events:
+                start, stop = eid * nthreads, (eid + 1) * nthreads
+                # Sizes are computed a column at a time and only threads that sent messages are visited
+                sizes = map(float.__mul__, counts[start:stop], means[start:stop])
+                for tid, count in enumerate(counts[start:stop]):
+                    if count:
+                        yield senders[tid], receiver, count, sizes[tid]
+        return cls.from_coo(nranks, entries())
+
+    def to_csr(self):
+        """Convert the matrix to compressed sparse row form.
+        
+        Returns:
+            tuple: (indptr, indices, messages, bytes) where row `i`'s entries are at positions 
+                   ``indptr[i]`` to ``indptr[i+1]`` of the other arrays and `indices` are receiver ranks.
+        """
+        indptr = array('i', [0]) * (self.nranks + 1)
+        for sender in self.senders:
+            indptr[sender + 1] += 1
+        for rank in xrange(self.nranks):
+            indptr[rank + 1] += indptr[rank]
+        return indptr, self.receivers, self.messages, self.bytes
+
+    def sent(self, field='bytes'):
+        """Returns the total bytes or messages sent by each rank."""
+        totals = array('d', [0.0]) * self.nranks
+        for sender, value in zip(self.senders, getattr(self, field)):
+            totals[sender] += value
+        return totals
+
+    def received(self, field='bytes'):
+        """Returns the total bytes or messages received by each rank."""
+        totals = array('d', [0.0]) * self.nranks
+        for receiver, value in zip(self.receivers, getattr(self, field)):
+            totals[receiver] += value
+        return totals
+
+    def top_pairs(self, count=10, field='bytes'):
+        """Find the (sender, receiver) pairs that communicate the most.
+        
+        Args:
+            count (int): Maximum number of pairs to return.
+            field (str): 'bytes' or 'messages'.
+            
+        Returns:
+            list: Dictionaries with 'sender', 'receiver', 'messages', and 'bytes' keys, largest first.
+        """
+        values = getattr(self, field)
+        top = heapq.nlargest(count, xrange(len(self)), key=values.__getitem__)
+        return [{'sender': self.senders[idx], 'receiver': self.receivers[idx], 
+                 'messages': self.messages[idx], 'bytes': self.bytes[idx]} for idx in top]
+
+    def summary(self):
+        """Summarize the matrix.
+        
+        Returns:
+            dict: 'ranks', 'pairs' (number of communicating pairs), 'density' (fraction of possible pairs 
+                  that communicate), 'messages', 'bytes', 'mean_message_size', and 'max_sent_bytes', 
+                  'mean_sent_bytes', and 'send_imbalance' (max / mean bytes sent per rank).
+        """
+        total_bytes = math.fsum(self.bytes)
+        total_messages = math.fsum(self.messages)
+        sent = self.sent()
+        mean_sent = total_bytes / self.nranks if self.nranks else 0.0
+        max_sent = max(sent) if self.nranks else 0.0
+        return {'ranks': self.nranks,
+                'pairs': len(self),
+                'density': float(len(self)) / (self.nranks * self.nranks) if self.nranks else 0.0,
+                'messages': total_messages,
+                'bytes': total_bytes,
+                'mean_message_size': total_bytes / total_messages if total_messages else 0.0,
+                'max_sent_bytes': max_sent,
+                'mean_sent_bytes': mean_sent,
+                'send_imbalance': max_sent / mean_sent if mean_sent else 0.0}
+
+    def write_csv(self, fout):
+        """Write the matrix entries as CSV with a 'sender,receiver,messages,bytes' header."""
+        fout.write('sender,receiver,messages,bytes\n')
+        for entry in zip(self.senders, self.receivers, self.messages, self.bytes):
+            fout.write('%d,%d,%.0f,%.0f\n' % entry)
+
+    def write_binary(self, fout):
+        """Write the matrix in compact binary form.
+        
+        The file is a header of the 8-byte magic ``TAUCOMM1`` followed by the number of ranks and the 
+        number of entries as little-endian 64-bit integers, then the senders and receivers as 
+        little-endian 32-bit integers and the messages and bytes as little-endian 64-bit floats.
+        """
+        fout.write(_BINARY_HEADER.pack(BINARY_MAGIC, self.nranks, len(self)))
+        for column in self.senders, self.receivers, self.messages, self.bytes:
+            if sys.byteorder != 'little':
+                column = array(column.typecode, column)
+                column.byteswap()
+            column.tofile(fout)
+
+    @classmethod
+    def read_binary(cls, fin):
+        """Read a matrix written by :any:`write_binary`.
+        
+        Raises:
+            ConfigurationError: The file is not a binary communication matrix.
+        """
+        try:
+            magic, nranks, nnz = _BINARY_HEADER.unpack(fin.read(_BINARY_HEADER.size))
+        except struct.error:
+            magic = None
+        if magic != BINARY_MAGIC:
+            raise ConfigurationError("'%s' is not a binary communication matrix" % getattr(fin, 'name', fin))
+        columns = []
+        for typecode in 'iidd':
+            column = array(typecode)
+            try:
+                column.fromfile(fin, nnz)
+            except EOFError:
+                raise ConfigurationError("Binary communication matrix '%s' is truncated" % getattr(fin, 'name', fin))
+            if sys.byteorder != 'little':
+                column.byteswap()
+            columns.append(column)
+        return cls(nranks, *columns)
@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2016, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""Cross-trial profile comparison.
+
+Functions are aligned by name across trials and compared by a statistic of their per-rank 
+distribution, e.g. the mean across ranks, so trials with different rank counts can be compared.
+A rank's value is the sum of its threads' values so trials with different thread counts per rank,
+e.g. different OpenMP thread counts, are compared by the work each rank did.  A function that does 
+not occur in a trial has zero values in that trial.
+"""
+
+import math
+from taucmdr.error import ConfigurationError
+from taucmdr.analysis.statistics import DEFAULT_PERCENTILES, function_statistics
+
+
+COMPARE_FIELDS = ('excl', 'incl', 'calls')
+"""Per-function fields compared by default."""
+
+STATISTICS = ('mean', 'min', 'max', 'total', 'stddev') + tuple('p%d' % pct for pct in DEFAULT_PERCENTILES)
+"""Statistics of the per-rank distribution that functions can be compared by."""
+
+SORT_KEYS = ('delta', 'ratio', 'value', 'name')
+"""Comparison sort orders: largest absolute change, largest relative change, largest baseline value, or name."""
+
+
+def compare_profiles(datasets, metric=None, fields=COMPARE_FIELDS, statistic='mean'):
+    """Compare functions across the profile data of two or more trials.
+    
+    Args:
+        datasets (list): :any:`ProfileData` objects, the first is the baseline.
+        metric (str): Metric name.  Default is the baseline's first metric.
+        fields (tuple): Per-function fields to compare.
+        statistic (str): One of :any:`STATISTICS`.
+        
+    Returns:
+        list: One dictionary per function with a 'name' key and a key for each of `fields` mapping to a
+              dictionary with 'values' (the statistic in each dataset), 'deltas' (difference from the 
+              baseline for each non-baseline dataset), and 'ratios' (quotient of the baseline value for each 
+              non-baseline dataset, or None if the baseline value is zero).
+              
+    Raises:
+        ConfigurationError: Invalid statistic or a dataset does not have `metric`.
+    """
+    if statistic not in STATISTICS:
+        raise ConfigurationError("Invalid statistic '%s'" % statistic, 
+                                 "Valid statistics: %s" % ', '.join(STATISTICS))
+    if metric is None:
+        metric = datasets[0].metrics[0]
+    percentiles = (int(statistic[1:]),) if statistic.startswith('p') else ()
+    tables = {}
+    names = []
+    seen = set()
+    for data in datasets:
+        for name in data.functions:
+            if name not in seen:
+                seen.add(name)
+                names.append(name)
+        for field in fields:
+            stats = function_statistics(data, metric, field, percentiles, by_rank=True)
+            tables.setdefault(field, []).append(dict((func['name'], func[statistic]) for func in stats))
+    rows = []
+    for name in names:
+        row = {'name': name}
+        for field in fields:
+            values = [table.get(name, 0.0) for table in tables[field]]
+            base = values[0]
+            row[field] = {'values': values,
+                          'deltas': [value - base for value in values[1:]],
+                          'ratios': [value / base if base else None for value in values[1:]]}
+        rows.append(row)
+    return rows
+
+
+def _ratio_change(ratio, value):
+    if ratio is None:
+        # Baseline is zero: new functions are infinitely larger, absent functions are unchanged
+        return float('inf') if value else 0.0
+    if ratio <= 0:
+        return float('inf')
+    return abs(math.log(ratio))
+
+
+def sort_comparison(rows, field='excl', key='delta'):
+    """Sort compared functions with the biggest changes first.
+    
+    Args:
+        rows (list): Function comparisons as returned by :any:`compare_profiles`.
+        field (str): Compared field to sort by.
+        key (str): One of :any:`SORT_KEYS`.
+        
+    Returns:
+        list: Sorted function comparisons.
+    """
+    if key == 'name':
+        return sorted(rows, key=lambda row: row['name'])
+    if key == 'value':
+        return sorted(rows, key=lambda row: row[field]['values'][0], reverse=True)
+    if key == 'ratio':
+        # A function that gets twice as fast ranks with one that gets twice as slow
+        def change(row):
+            comparison = row[field]
+            return max([_ratio_change(ratio, value) 
+                        for ratio, value in zip(comparison['ratios'], comparison['values'][1:])] + [0.0])
+        return sorted(rows, key=change, reverse=True)
+    if key == 'delta':
+        return sorted(rows, key=lambda row: max([abs(delta) for delta in row[field]['deltas']] + [0.0]), reverse=True)
+    raise ConfigurationError("Invalid sort key '%s'" % key, "Valid sort keys: %s" % ', '.join(SORT_KEYS))
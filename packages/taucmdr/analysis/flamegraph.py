@@ -0,0 +1,255 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2016, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""Folded stacks and flame graphs from TAU callpath profiles.
+
+Folded stacks are the text format read by Brendan Gregg's FlameGraph scripts and many other 
+profile viewers: one line per call path with semicolon-separated frames and a value, e.g. 
+``main;solve;MPI_Allreduce() 1234``.  Each line's value is the call path's exclusive value, so
+values sum to the program's total, even if the call paths were truncated (see :any:`callpath_timers`).  Lines are generated from the profile data one at a time.
+
+:any:`write_svg` renders a self-contained SVG flame graph from a :any:`CallTree` without 
+any external tools.
+"""
+
+import os
+import zlib
+from array import array
+from xml.sax.saxutils import escape
+from taucmdr import logger
+from taucmdr.error import ConfigurationError
+from taucmdr.analysis import cache
+from taucmdr.analysis.callpath import CallTree, callpath_timers
+
+
+LOGGER = logger.get_logger(__name__)
+
+FLAMEGRAPH_FORMATS = ('folded', 'svg')
+"""Flame graph export formats: folded stacks or SVG flame graph."""
+
+SVG_WIDTH = 1200
+
+SVG_FRAME_HEIGHT = 16
+
+SVG_FONT_SIZE = 12
+
+SVG_MIN_WIDTH = 0.1
+"""Frames narrower than this many pixels are not drawn."""
+
+_SVG_PAD = 10
+
+_SVG_TITLE_HEIGHT = 3 * SVG_FONT_SIZE
+
+
+def _frame(name):
+    # Semicolons separate frames and newlines separate stacks in the folded format
+    return name.replace(';', ':').replace('\n', ' ')
+
+
+def _thread_frame(thread):
+    return 'n,c,t %d,%d,%d' % thread
+
+
+def _iter_folded(data, metric, field, per_rank, timers):
+    if per_rank:
+        column = data.function_data[metric][field]
+        nthreads = len(data.threads)
+        thread_frames = [_thread_frame(thread) for thread in data.threads]
+        for fid, path in timers:
+            stack = ';'.join(_frame(name) for name in path)
+            offset = fid * nthreads
+            for tid, thread_frame in enumerate(thread_frames):
+                yield thread_frame + ';' + stack, column[offset + tid]
+    else:
+        totals = data.totals(metric, field)
+        for fid, path in timers:
+            yield ';'.join(_frame(name) for name in path), totals[fid]
+
+
+def folded_stacks(data, metric=None, field='excl', per_rank=False):
+    """Generate folded stacks from profile data.
+    
+    Args:
+        data (ProfileData): Profile data with callpath timers.
+        metric (str): Metric name.  Default is the first metric in `data`.
+        field (str): Per-function field to use as the stack value.
+        per_rank (bool): If True, generate one stack per call path and thread with the thread 
+                         as the outermost frame.  Otherwise values are summed over all threads.
+                         
+    Returns:
+        generator: (folded stack, value) pairs.
+        
+    Raises:
+        ConfigurationError: `data` has no callpath timers.
+    """
+    return _iter_folded(data, metric or data.metrics[0], field, per_rank, callpath_timers(data))
+
+
+def write_folded(fout, stacks):
+    """Write folded stacks.
+    
+    Values are rounded to integers and stacks with zero values are skipped.
+    
+    Args:
+        fout (file): File to write to.
+        stacks: Iterable of (folded stack, value) pairs as generated by :any:`folded_stacks`.
+        
+    Returns:
+        int: Number of stacks written.
+    """
+    count = 0
+    for stack, value in stacks:
+        value = int(round(value))
+        if value > 0:
+            fout.write('%s %d\n' % (stack, value))
+            count += 1
+    return count
+
+
+def _color(name):
+    # Warm colors that are stable across renderings of the same function
+    digest = zlib.crc32(name) & 0xffffffff
+    red = 205 + (digest & 0xff) * 50 // 255
+    green = ((digest >> 8) & 0xff) * 230 // 255
+    blue = ((digest >> 16) & 0xff) * 55 // 255
+    return 'rgb(%d,%d,%d)' % (red, green, blue)
+
+
+def write_svg(fout, tree, field='excl', title='Flame Graph', units=''):
+    """Render a call tree as an SVG flame graph.
+    
+    Frames are drawn bottom-up with each node's width proportional to the sum of its subtree's values.
+    Siblings are ordered by name so flame graphs of similar trials are comparable.  Hovering over a 
+    frame shows its name and value.
+    
+    Args:
+        fout (file): File to write to.
+        tree (CallTree): The call tree.
+        field (str): Per-function field to use as the node value.
+        title (str): Flame graph title.
+        units (str): Units of the node values.
+        
+    Returns:
+        int: Number of frames drawn.
+        
+    Raises:
+        ConfigurationError: The call tree has no nonzero values.
+    """
+    # pylint: disable=too-many-locals
+    nodes = len(tree)
+    # Children always have larger ids than their parents
+    widths = array('d', tree.values[field])
+    for node in xrange(nodes - 1, 0, -1):
+        widths[tree.parents[node]] += widths[node]
+    total = widths[0]
+    if total <= 0:
+        raise ConfigurationError("Call tree has no %s values to draw" % field)
+    depths = array('i', [0]) * nodes
+    for node in xrange(1, nodes):
+        depths[node] = depths[tree.parents[node]] + 1
+    scale = (SVG_WIDTH - 2 * _SVG_PAD) / total
+    height = max(depths) * SVG_FRAME_HEIGHT + _SVG_TITLE_HEIGHT + 2 * _SVG_PAD
+    fout.write('<?xml version="1.0" standalone="no"?>\n'
+               '<svg version="1.1" width="%d" height="%d" viewBox="0 0 %d %d" '
+               'xmlns="http://www.w3.org/2000/svg">\n' % (SVG_WIDTH, height, SVG_WIDTH, height))
+    fout.write('<style type="text/css">text { font-family: Verdana, sans-serif; font-size: %dpx; fill: #000; } '
+               'rect { stroke: #fff; stroke-width: 0.5; } g:hover rect { stroke: #000; }</style>\n' % SVG_FONT_SIZE)
+    fout.write('<rect x="0" y="0" width="100%" height="100%" fill="#f8f8f8" style="stroke: none"/>\n')
+    fout.write('<text x="%d" y="%d" text-anchor="middle" style="font-size: %dpx">%s</text>\n' % 
+               (SVG_WIDTH // 2, 2 * SVG_FONT_SIZE, SVG_FONT_SIZE + 5, escape(title)))
+    char_width = 0.59 * SVG_FONT_SIZE
+    drawn = 0
+    stack = [(0, 0.0)]
+    while stack:
+        node, offset = stack.pop()
+        if node:
+            width = widths[node] * scale
+            xpos = _SVG_PAD + offset * scale
+            ypos = height - _SVG_PAD - depths[node] * SVG_FRAME_HEIGHT
+            name = tree.frames[tree.node_frames[node]]
+            tooltip = '%s (%s%s, %.2f%%)' % (name, '{:,.0f}'.format(widths[node]), units and ' ' + units, 
+                                            100.0 * widths[node] / total)
+            fout.write('<g><title>%s</title><rect x="%.1f" y="%d" width="%.1f" height="%d" fill="%s"/>' % 
+                       (escape(tooltip), xpos, ypos, width, SVG_FRAME_HEIGHT - 1, _color(name)))
+            chars = int((width - 6) / char_width)
+            if chars >= 3:
+                label = name if len(name) <= chars else name[:chars-2] + '..'
+                fout.write('<text x="%.1f" y="%d">%s</text>' % (xpos + 3, ypos + SVG_FONT_SIZE, escape(label)))
+            fout.write('</g>\n')
+            drawn += 1
+        children = sorted(tree.children[node].itervalues(), key=lambda child: tree.frames[tree.node_frames[child]])
+        child_offset = offset
+        pending = []
+        for child in children:
+            if widths[child] * scale >= SVG_MIN_WIDTH:
+                pending.append((child, child_offset))
+            child_offset += widths[child]
+        # Pop children in name order
+        stack.extend(reversed(pending))
+    fout.write('</svg>\n')
+    return drawn
+
+
+def export_trial(trial, dest, fmt, per_rank=False, nprocs=None):
+    """Export a trial's callpath profiles as folded stacks or an SVG flame graph.
+    
+    Args:
+        trial (Trial): The trial.
+        dest (str): Path to directory to contain exported data.
+        fmt (str): One of :any:`FLAMEGRAPH_FORMATS`.
+        per_rank (bool): If True, write folded stacks for each thread separately.
+        nprocs (int): Number of processes parsing profiles.
+        
+    Returns:
+        str: Path to the exported file.
+        
+    Raises:
+        ConfigurationError: The trial has no callpath profiles.
+    """
+    if fmt not in FLAMEGRAPH_FORMATS:
+        raise ConfigurationError("Invalid flame graph format '%s'" % fmt,
+                                 "Valid formats: %s" % ', '.join(FLAMEGRAPH_FORMATS))
+    expr = trial.populate('experiment')
+    export_file = os.path.join(dest, '%s.trial%d.%s' % (expr['name'], trial['number'], fmt))
+    data = cache.load_trial(trial, nprocs)
+    if fmt == 'folded':
+        stacks = folded_stacks(data, per_rank=per_rank)
+        write = lambda fout: write_folded(fout, stacks)
+    else:
+        title = "%s trial %d %s" % (expr['name'], trial['number'], data.metrics[0])
+        tree = CallTree(data)
+        write = lambda fout: write_svg(fout, tree, title=title)
+    LOGGER.info("Writing '%s'...", export_file)
+    # Don't leave a partial file that looks like a complete export
+    try:
+        with open(export_file, 'w') as fout:
+            write(fout)
+    except:
+        if os.path.exists(export_file):
+            os.remove(export_file)
+        raise
+    return export_file
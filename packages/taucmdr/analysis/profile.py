@@ -0,0 +1,432 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2016, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""Columnar TAU profile data.
+
+TAU writes one ``profile.N.C.T`` text file per node, context, and thread, and one ``MULTI__<metric>``
+directory of such files per metric when more than one metric is measured.  :any:`ProfileData` holds 
+all of a trial's profiles as columns of doubles, one ``array('d')`` per metric and field, so values
+can be summed, compared, or sliced by function or by thread without per-value Python objects.
+
+Function data columns are laid out function-major: the value for function id `f` on thread index 
+`t` is at index ``f * len(threads) + t``, so one function's values across all threads are contiguous.
+"""
+
+import os
+import math
+import tempfile
+import multiprocessing
+from array import array
+from taucmdr import logger, util
+from taucmdr.error import Error, ConfigurationError
+from taucmdr.cf import tau_profile
+from taucmdr.cf.pack import TrialPack
+
+
+LOGGER = logger.get_logger(__name__)
+
+PARALLEL_MIN_FILES = 256
+"""Profiles are parsed in parallel by default if there are at least this many profile files."""
+
+_PACKS = {}
+
+FUNCTION_FIELDS = ('calls', 'subrs', 'excl', 'incl')
+"""Per-function fields: number of calls, number of child calls, exclusive value, and inclusive value."""
+
+USER_EVENT_FIELDS = ('count', 'max', 'min', 'mean', 'sumsqr')
+"""Per-user event fields: number of samples, maximum, minimum, mean, and sum of squares."""
+
+CALLPATH_SEPARATOR = ' => '
+"""Separator between frames in TAU callpath timer names."""
+
+
+class ProfileData(object):
+    """TAU profile data for all threads of a trial in columnar arrays.
+    
+    Function and user event names are interned and identified by their index in :any:`functions`
+    or :any:`user_events`.  A function or user event that did not occur on a thread has zero values.
+    
+    Attributes:
+        threads (list): (node, context, thread) tuples in thread index order.
+        metrics (list): Metric names, e.g. ['TIME', 'PAPI_FP_INS'].
+        functions (list): Function names in function id order.
+        groups (list): List of group names for each function id.
+        user_events (list): User event names in user event id order.
+        metadata (list): Dictionary of metadata name/value pairs for each thread index.
+        function_data (dict): Maps metric name to a dictionary mapping each of :any:`FUNCTION_FIELDS` to 
+                              an ``array('d')`` of ``len(functions) * len(threads)`` values.
+        user_event_data (dict): Maps each of :any:`USER_EVENT_FIELDS` to an ``array('d')`` of
+                                ``len(user_events) * len(threads)`` values.
+    """
+    
+    def __init__(self, threads, metrics):
+        self.threads = list(threads)
+        self.thread_ids = dict((thread, idx) for idx, thread in enumerate(self.threads))
+        self.metrics = list(metrics)
+        self.functions = []
+        self.function_ids = {}
+        self.groups = []
+        self.user_events = []
+        self.user_event_ids = {}
+        self.metadata = [{} for _ in self.threads]
+        self.function_data = dict((metric, dict((field, array('d')) for field in FUNCTION_FIELDS)) 
+                                  for metric in self.metrics)
+        self.user_event_data = dict((field, array('d')) for field in USER_EVENT_FIELDS)
+        self._zeros = array('d', [0.0]) * len(self.threads)
+
+    def _add_function(self, name, groups):
+        try:
+            return self.function_ids[name]
+        except KeyError:
+            pass
+        fid = self.function_ids[intern(name)] = len(self.functions)
+        self.functions.append(intern(name))
+        self.groups.append([intern(group) for group in groups])
+        for columns in self.function_data.itervalues():
+            for column in columns.itervalues():
+                column.extend(self._zeros)
+        return fid
+
+    def _add_user_event(self, name):
+        try:
+            return self.user_event_ids[name]
+        except KeyError:
+            pass
+        eid = self.user_event_ids[intern(name)] = len(self.user_events)
+        self.user_events.append(intern(name))
+        for column in self.user_event_data.itervalues():
+            column.extend(self._zeros)
+        return eid
+
+    def add_profile(self, metric, thread, profile):
+        """Add one parsed profile file to the columns.
+        
+        Args:
+            metric (str): Name of the profile's metric.
+            thread (tuple): The profile's (node, context, thread) tuple.
+            profile (dict): Profile as returned by :any:`tau_profile.parse_profile`.
+        """
+        tid = self.thread_ids[thread]
+        nthreads = len(self.threads)
+        columns = self.function_data[metric]
+        calls, subrs, excl, incl = [columns[field] for field in FUNCTION_FIELDS]
+        for name, ncalls, nsubrs, vexcl, vincl, groups in profile['functions']:
+            idx = self._add_function(name, groups) * nthreads + tid
+            calls[idx] = ncalls
+            subrs[idx] = nsubrs
+            excl[idx] = vexcl
+            incl[idx] = vincl
+        # User events and metadata are repeated in every metric's profile so only read them once
+        if metric == self.metrics[0]:
+            self.metadata[tid] = dict(profile['metadata'])
+            columns = [self.user_event_data[field] for field in USER_EVENT_FIELDS]
+            for event in profile['user_events']:
+                idx = self._add_user_event(event[0]) * nthreads + tid
+                for column, value in zip(columns, event[1:]):
+                    column[idx] = value
+
+    def function_id(self, name):
+        """Returns the id of a function.
+        
+        Raises:
+            KeyError: No function named `name`.
+        """
+        return self.function_ids[name]
+
+    def column(self, metric, field, function):
+        """Returns one function's values on every thread.
+        
+        Args:
+            metric (str): Metric name.
+            field (str): One of :any:`FUNCTION_FIELDS`.
+            function: Function name or id.
+            
+        Returns:
+            array: ``len(threads)`` values in thread index order.
+        """
+        fid = function if isinstance(function, int) else self.function_ids[function]
+        nthreads = len(self.threads)
+        return self.function_data[metric][field][fid*nthreads:(fid+1)*nthreads]
+
+    def value(self, metric, field, function, thread):
+        """Returns one function's value on one thread.
+        
+        Args:
+            metric (str): Metric name.
+            field (str): One of :any:`FUNCTION_FIELDS`.
+            function: Function name or id.
+            thread (tuple): (node, context, thread) tuple.
+            
+        Returns:
+            float: The value.
+        """
+        fid = function if isinstance(function, int) else self.function_ids[function]
+        return self.function_data[metric][field][fid*len(self.threads) + self.thread_ids[thread]]
+
+    def totals(self, metric, field):
+        """Returns each function's value summed over all threads.
+        
+        Args:
+            metric (str): Metric name.
+            field (str): One of :any:`FUNCTION_FIELDS`.
+            
+        Returns:
+            array: ``len(functions)`` values in function id order.
+        """
+        column = self.function_data[metric][field]
+        nthreads = len(self.threads)
+        return array('d', (sum(column[idx:idx+nthreads]) for idx in xrange(0, len(column), nthreads)))
+
+    def flat_function_ids(self):
+        """Returns the ids of the flat timers, i.e. every function that is not a callpath timer.
+        
+        A callpath timer measures calls of a function that are also counted by the function's flat 
+        timer, so program totals are computed from flat timers only.
+        
+        Returns:
+            list: Function ids in ascending order.
+        """
+        return [fid for fid, name in enumerate(self.functions) if CALLPATH_SEPARATOR not in name]
+
+    def flat_total(self, metric, field='excl', tids=None):
+        """Returns the sum of the flat timers' values, e.g. the program's total time if `field` is 'excl'.
+        
+        Args:
+            metric (str): Metric name.
+            field (str): One of :any:`FUNCTION_FIELDS`.
+            tids (list): Thread indices to sum over, or None to sum over all threads.
+            
+        Returns:
+            float: The total.
+        """
+        column = self.function_data[metric][field]
+        nthreads = len(self.threads)
+        fids = self.flat_function_ids()
+        if tids is None:
+            return math.fsum(math.fsum(column[fid*nthreads:(fid+1)*nthreads]) for fid in fids)
+        return math.fsum(column[fid*nthreads + tid] for fid in fids for tid in tids)
+
+    def user_event_column(self, field, event):
+        """Returns one user event's values on every thread.
+        
+        Args:
+            field (str): One of :any:`USER_EVENT_FIELDS`.
+            event: User event name or id.
+            
+        Returns:
+            array: ``len(threads)`` values in thread index order.
+        """
+        eid = event if isinstance(event, int) else self.user_event_ids[event]
+        nthreads = len(self.threads)
+        return self.user_event_data[field][eid*nthreads:(eid+1)*nthreads]
+
+
+def _open_profile(source, name):
+    prefix, pack_path = source
+    if pack_path is None:
+        try:
+            return open(os.path.join(prefix, name))
+        except IOError:
+            return None
+    try:
+        pack = _PACKS[pack_path]
+    except KeyError:
+        pack = _PACKS[pack_path] = TrialPack(pack_path)
+    try:
+        return pack.open(name)
+    except KeyError:
+        return None
+
+
+def _load_serial(source, metrics, threads):
+    data = ProfileData(threads, [metric for metric, _ in metrics])
+    for metric, metric_dir in metrics:
+        for thread in threads:
+            name = os.path.join(metric_dir, 'profile.%d.%d.%d' % thread)
+            fin = _open_profile(source, name)
+            if fin is not None:
+                with fin:
+                    data.add_profile(metric, thread, tau_profile.parse_profile(name, fin))
+    return data
+
+
+def _ingest_shard(args):
+    # Columns are returned through a file instead of the result pipe to avoid pickling large arrays.
+    # Error objects don't survive pickling so send the error message and hints back instead.
+    source, metrics, threads, workdir = args
+    try:
+        data = _load_serial(source, metrics, threads)
+    except Error as err:
+        return None, (err.value, err.hints)
+    fd, path = tempfile.mkstemp(dir=workdir)
+    with os.fdopen(fd, 'wb') as fout:
+        for metric in data.metrics:
+            for field in FUNCTION_FIELDS:
+                data.function_data[metric][field].tofile(fout)
+        for field in USER_EVENT_FIELDS:
+            data.user_event_data[field].tofile(fout)
+    return {'functions': data.functions, 'groups': data.groups, 'user_events': data.user_events,
+            'metadata': data.metadata, 'path': path}, None
+
+
+def _merge_shards(metrics, threads, shards):
+    """Merge per-shard columns into one :any:`ProfileData`.
+    
+    Each shard's function and user event names are mapped to global ids, then each shard's block of
+    each function's column is copied into place with one slice assignment.
+    """
+    data = ProfileData(threads, [metric for metric, _ in metrics])
+    for _, shard in shards:
+        for name, groups in zip(shard['functions'], shard['groups']):
+            if name not in data.function_ids:
+                data.function_ids[name] = len(data.functions)
+                data.functions.append(name)
+                data.groups.append(groups)
+        for name in shard['user_events']:
+            if name not in data.user_event_ids:
+                data.user_event_ids[name] = len(data.user_events)
+                data.user_events.append(name)
+    nthreads = len(threads)
+    for columns in data.function_data.itervalues():
+        for field in FUNCTION_FIELDS:
+            columns[field] = array('d', [0.0]) * (len(data.functions) * nthreads)
+    for field in USER_EVENT_FIELDS:
+        data.user_event_data[field] = array('d', [0.0]) * (len(data.user_events) * nthreads)
+    for start, shard in shards:
+        width = len(shard['metadata'])
+        data.metadata[start:start+width] = shard['metadata']
+        blocks = [(data.function_data[metric][field], [data.function_ids[name] for name in shard['functions']]) 
+                  for metric in data.metrics for field in FUNCTION_FIELDS]
+        event_ids = [data.user_event_ids[name] for name in shard['user_events']]
+        blocks.extend((data.user_event_data[field], event_ids) for field in USER_EVENT_FIELDS)
+        with open(shard['path'], 'rb') as fin:
+            for column, ids in blocks:
+                local = array('d')
+                local.fromfile(fin, len(ids) * width)
+                for local_id, global_id in enumerate(ids):
+                    offset = global_id * nthreads + start
+                    column[offset:offset+width] = local[local_id*width:(local_id+1)*width]
+        os.remove(shard['path'])
+    return data
+
+
+def _load(source, metrics, threads, nprocs):
+    if nprocs is None:
+        nprocs = multiprocessing.cpu_count() if len(metrics) * len(threads) >= PARALLEL_MIN_FILES else 1
+    nprocs = min(nprocs, len(threads))
+    if nprocs <= 1:
+        return _load_serial(source, metrics, threads)
+    # Several shards per process balance the load when some ranks have much larger profiles
+    width = max(-(-len(threads) // (nprocs * 4)), 1)
+    starts = range(0, len(threads), width)
+    workdir = util.mkdtemp()
+    LOGGER.debug("Loading %d profiles in %d shards with %d processes", 
+                 len(metrics) * len(threads), len(starts), nprocs)
+    pool = multiprocessing.Pool(nprocs)
+    try:
+        results = pool.imap(_ingest_shard, [(source, metrics, threads[start:start+width], workdir) 
+                                            for start in starts])
+        shards = []
+        for start, (shard, error) in zip(starts, results):
+            if error:
+                value, hints = error
+                raise ConfigurationError(value, *hints)
+            shards.append((start, shard))
+    finally:
+        pool.terminate()
+        pool.join()
+    try:
+        return _merge_shards(metrics, threads, shards)
+    finally:
+        util.rmtree(workdir, ignore_errors=True)
+
+
+def _select_nodes(threads, nodes):
+    if nodes is None:
+        return threads
+    selected = [thread for thread in threads if thread[0] in nodes]
+    if not selected:
+        raise ConfigurationError("No TAU profiles for node(s) %s" % ', '.join(str(node) for node in sorted(nodes)))
+    return selected
+
+
+def load_profiles(prefix, nprocs=None, nodes=None):
+    """Load TAU profiles from a directory.
+    
+    Profiles are parsed in parallel if there are many profile files.  Each process parses a shard of 
+    the threads into its own columns and the shards are merged into one :any:`ProfileData`.  Function 
+    and user event ids are assigned in the order the names are first found.
+    
+    Args:
+        prefix (str): Directory containing ``profile.*.*.*`` files or ``MULTI__*`` directories.
+        nprocs (int): Number of processes parsing profiles.  If None then use one process per CPU core 
+                      if there are at least :any:`PARALLEL_MIN_FILES` profile files.
+        nodes (set): If not None, only load profiles of these nodes (ranks).
+        
+    Returns:
+        ProfileData: The profile data.
+        
+    Raises:
+        ConfigurationError: No profiles were found or a profile is invalid.
+    """
+    metrics, threads = tau_profile.find_profiles(prefix)
+    threads = _select_nodes(threads, nodes)
+    metrics = [(metric, os.path.relpath(metric_dir, prefix)) for metric, metric_dir in metrics]
+    data = _load((prefix, None), metrics, threads, nprocs)
+    LOGGER.debug("Loaded %d functions on %d threads from '%s'", len(data.functions), len(threads), prefix)
+    return data
+
+
+def load_trial(trial, nprocs=None, nodes=None):
+    """Load a trial's TAU profiles or merged profile.
+    
+    Profiles are read directly from packed trials without unpacking the trial data.
+    Merged profiles are streamed, see :any:`load_xml_profile`.
+    
+    Args:
+        trial (Trial): The trial.
+        nprocs (int): Number of processes parsing TAU profiles, see :any:`load_profiles`.
+        nodes (set): If not None, only load TAU profiles of these nodes (ranks).  Merged profiles
+                     are always loaded completely.
+        
+    Returns:
+        ProfileData: The profile data.
+        
+    Raises:
+        ConfigurationError: The trial has no TAU profiles or a profile is invalid.
+    """
+    profile_fmt = trial.profile_format()
+    if profile_fmt == 'merged':
+        from taucmdr.analysis.xml_profile import load_xml_profile
+        with trial.open_data_file('tauprofile.xml') as fin:
+            return load_xml_profile('tauprofile.xml', fin)
+    if profile_fmt != 'tau':
+        raise ConfigurationError("Trial %s does not have TAU profiles" % trial['number'])
+    if not trial.is_compact():
+        return load_profiles(trial.prefix, nprocs, nodes)
+    metrics, threads = tau_profile.profile_members(trial.data_members())
+    return _load((None, trial.open_pack().path), metrics, _select_nodes(threads, nodes), nprocs)
@@ -0,0 +1,226 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2016, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""Summary statistics over columnar profile data.
+
+Statistics are computed per function over the function's contiguous column of per-thread values
+(see :any:`ProfileData`) with builtin reductions so no per-value Python code runs in the common case.
+Top-N queries select with a bounded heap instead of sorting all values.
+"""
+
+import math
+import heapq
+import operator
+import itertools
+from array import array
+from taucmdr.error import ConfigurationError
+from taucmdr.analysis.profile import FUNCTION_FIELDS
+
+
+DEFAULT_PERCENTILES = (50, 90, 99)
+"""Percentiles reported by default."""
+
+
+def percentile(ordered, pct):
+    """Compute a percentile of sorted values with linear interpolation between the closest ranks.
+    
+    Args:
+        ordered (list): Values in ascending order.
+        pct (float): Percentile in the range [0, 100].
+        
+    Returns:
+        float: The percentile, or 0.0 if `ordered` is empty.
+    """
+    if not ordered:
+        return 0.0
+    pos = (len(ordered) - 1) * pct / 100.0
+    low = int(math.floor(pos))
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (pos - low)
+
+
+def column_statistics(column, percentiles=DEFAULT_PERCENTILES):
+    """Compute summary statistics of one function's values across threads.
+    
+    Args:
+        column (array): Per-thread values.
+        percentiles (tuple): Percentiles to compute.
+        
+    Returns:
+        dict: 'total', 'mean', 'min', 'max', 'stddev', 'imbalance' (max / mean), and 'p<N>' for each percentile.
+    """
+    count = len(column)
+    if not count:
+        stats = dict((key, 0.0) for key in ('total', 'mean', 'min', 'max', 'stddev', 'imbalance'))
+        stats.update(('p%s' % pct, 0.0) for pct in percentiles)
+        return stats
+    total = math.fsum(column)
+    mean = total / count
+    # Deviations from the mean are summed in a second pass since sumsqr/count - mean**2 cancels 
+    # catastrophically when the values are large compared to their spread, e.g. cycle counts
+    stats = {'total': total,
+             'mean': mean,
+             'min': min(column),
+             'max': max(column),
+             'stddev': math.sqrt(math.fsum((value - mean)**2 for value in column) / count)}
+    stats['imbalance'] = stats['max'] / mean if mean else 0.0
+    if percentiles:
+        ordered = sorted(column)
+        for pct in percentiles:
+            stats['p%s' % pct] = percentile(ordered, pct)
+    return stats
+
+
+def _check_column(data, metric, field):
+    if metric not in data.function_data:
+        raise ConfigurationError("Metric '%s' is not in the profile data" % metric,
+                                 "Available metrics: %s" % ', '.join(data.metrics))
+    if field not in FUNCTION_FIELDS:
+        raise ConfigurationError("Invalid profile field '%s'" % field,
+                                 "Valid fields: %s" % ', '.join(FUNCTION_FIELDS))
+    return data.function_data[metric][field]
+
+
+def _rank_thread_ids(data):
+    ranks = {}
+    for tid, thread in enumerate(data.threads):
+        ranks.setdefault(thread[0], []).append(tid)
+    return [ranks[rank] for rank in sorted(ranks)]
+
+
+def function_statistics(data, metric=None, field='excl', percentiles=DEFAULT_PERCENTILES, by_rank=False):
+    """Compute summary statistics across threads for every function in the profile data.
+    
+    Each function's 'percent' is its share of the sum of all flat timers' exclusive values, i.e. 
+    the percentage of the total measured time (or other metric) spent in or under the function.
+    Callpath timers are not part of the sum since their values are also counted by flat timers.
+    
+    Args:
+        data (ProfileData): The profile data.
+        metric (str): Metric name.  Default is the first metric in `data`.
+        field (str): One of :any:`FUNCTION_FIELDS`.
+        percentiles (tuple): Percentiles to compute.
+        by_rank (bool): If True, compute statistics across ranks, where a rank's value is the sum of
+                        its threads' values, instead of across threads.
+        
+    Returns:
+        list: One dictionary per function as returned by :any:`column_statistics` with additional 
+              'name' and 'percent' keys, ordered by descending total.
+              
+    Raises:
+        ConfigurationError: `metric` or `field` is not in the profile data.
+    """
+    if metric is None:
+        metric = data.metrics[0]
+    _check_column(data, metric, field)
+    grand_total = data.flat_total(metric)
+    rank_tids = _rank_thread_ids(data) if by_rank else None
+    if rank_tids and len(rank_tids) == len(data.threads):
+        # One thread per rank: the thread values are the rank values
+        rank_tids = None
+    results = []
+    for fid, name in enumerate(data.functions):
+        column = data.column(metric, field, fid)
+        if rank_tids:
+            column = array('d', (math.fsum(column[tid] for tid in tids) for tids in rank_tids))
+        stats = column_statistics(column, percentiles)
+        stats['name'] = name
+        stats['percent'] = 100.0 * stats['total'] / grand_total if grand_total else 0.0
+        results.append(stats)
+    results.sort(key=operator.itemgetter('total'), reverse=True)
+    return results
+
+
+def top_functions(data, count=20, metric=None, field='excl', node=None, callpath=False):
+    """Find the functions with the largest values.
+    
+    Callpath timers repeat values already counted by flat timers so they are not ranked unless 
+    `callpath` is True, and are never part of the total that percentages are computed from.
+    
+    Args:
+        data (ProfileData): The profile data.
+        count (int): Maximum number of functions to return.
+        metric (str): Metric name.  Default is the first metric in `data`.
+        field (str): One of :any:`FUNCTION_FIELDS`.
+        node (int): If not None, only consider threads of this node (rank).  Otherwise values are
+                    summed over all threads.
+        callpath (bool): If True, rank callpath timers as well as flat timers.
+        
+    Returns:
+        list: Dictionaries with 'name', 'value', and 'percent' keys ordered by descending value, where
+              'percent' is the percentage of all flat timers' exclusive values on the considered threads.
+              
+    Raises:
+        ConfigurationError: Invalid metric or field, or no threads of `node` in the profile data.
+    """
+    metric = metric or data.metrics[0]
+    column = _check_column(data, metric, field)
+    nthreads = len(data.threads)
+    if node is None:
+        values = data.totals(metric, field)
+        grand_total = data.flat_total(metric)
+    else:
+        tids = [tid for tid, thread in enumerate(data.threads) if thread[0] == node]
+        if not tids:
+            raise ConfigurationError("No threads of node %s in the profile data" % node)
+        # Strided slices gather one thread's value of every function without a Python loop
+        values = column[tids[0]::nthreads]
+        for tid in tids[1:]:
+            values = map(operator.add, values, column[tid::nthreads])
+        grand_total = data.flat_total(metric, tids=tids)
+    fids = xrange(len(values)) if callpath else data.flat_function_ids()
+    top = heapq.nlargest(count, fids, key=values.__getitem__)
+    return [{'name': data.functions[fid], 'value': values[fid],
+             'percent': 100.0 * values[fid] / grand_total if grand_total else 0.0} for fid in top]
+
+
+def top_function_threads(data, count=20, metric=None, field='excl', callpath=False):
+    """Find the (function, thread) pairs with the largest values.
+    
+    Args:
+        data (ProfileData): The profile data.
+        count (int): Maximum number of pairs to return.
+        metric (str): Metric name.  Default is the first metric in `data`.
+        field (str): One of :any:`FUNCTION_FIELDS`.
+        callpath (bool): If True, rank callpath timers as well as flat timers.
+        
+    Returns:
+        list: Dictionaries with 'name', 'thread', and 'value' keys ordered by descending value.
+        
+    Raises:
+        ConfigurationError: Invalid metric or field.
+    """
+    column = _check_column(data, metric or data.metrics[0], field)
+    nthreads = len(data.threads)
+    if callpath:
+        indices = xrange(len(column))
+    else:
+        indices = itertools.chain.from_iterable(xrange(fid*nthreads, (fid+1)*nthreads) 
+                                                for fid in data.flat_function_ids())
+    top = heapq.nlargest(count, indices, key=column.__getitem__)
+    return [{'name': data.functions[idx // nthreads], 'thread': data.threads[idx % nthreads], 'value': column[idx]}
+            for idx in top]
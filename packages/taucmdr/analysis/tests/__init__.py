@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2016, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""Unit test utility functions for the analysis package."""
+
+import os
+from taucmdr import tests
+from taucmdr.analysis.profile import load_profiles
+from taucmdr.cf.tests.test_tau_profile import write_profiles
+
+
+def write_test_profiles(name, metrics=('TIME',), nodes=3):
+    """Write synthetic profiles to a new directory in the test working directory.
+    
+    Args:
+        name (str): Name of the directory.
+        metrics (tuple): Metric names.
+        nodes (int): Number of nodes, each with one thread.
+        
+    Returns:
+        str: Path to the directory.
+    """
+    prefix = os.path.join(tests.get_test_workdir(), name)
+    write_profiles(prefix, list(metrics), nodes=nodes)
+    return prefix
+
+
+def load_test_profiles(name, metrics=('TIME',), nodes=3):
+    """Write synthetic profiles as in :any:`write_test_profiles` and load them.
+    
+    Returns:
+        ProfileData: The loaded profile data.
+    """
+    return load_profiles(write_test_profiles(name, metrics, nodes))
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2016, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""Test functions.
+
+Functions used for unit tests of baseline.py.
+"""
+
+import os
+from taucmdr import tests
+from taucmdr.error import ConfigurationError
+from taucmdr.analysis.profile import ProfileData
+from taucmdr.analysis.baseline import (TOTAL, summarize, save_baseline, load_baseline, remove_baseline, 
+                                       check_regressions)
+from taucmdr.analysis.tests import load_test_profiles
+from taucmdr.analysis.tests.test_callpath import callpath_data
+
+
+class BaselineTest(tests.TestCase):
+    """Tests for :any:`baseline`."""
+
+    def test_summarize(self):
+        summary = summarize([load_test_profiles('two', nodes=2), load_test_profiles('four', nodes=4)], [0, 1])
+        self.assertListEqual(summary['trials'], [0, 1])
+        main = summary['metrics']['TIME']['functions']['main']
+        # Per-rank mean exclusive time is 1500 and 2500 in the two trials
+        self.assertEqual(main[0][0], 2000.0)
+        self.assertAlmostEqual(main[0][1], 707.1067811865476)
+        self.assertAlmostEqual(summary['metrics']['TIME']['total'][0], 2017.5)
+
+    def test_summarize_callpath(self):
+        # Callpath timers repeat time counted by flat timers so they are not part of the total
+        summary = summarize([callpath_data()], [0])
+        self.assertEqual(summary['metrics']['TIME']['total'][0], 105.0)
+        self.assertEqual(summary['metrics']['TIME']['functions']['main => solve'][0][0], 45.0)
+
+    def test_save_load(self):
+        prefix = os.path.join(tests.get_test_workdir(), 'expr')
+        self.assertRaises(ConfigurationError, load_baseline, prefix)
+        summary = summarize([load_test_profiles('save', nodes=2)], [3])
+        save_baseline(prefix, summary)
+        self.assertEqual(load_baseline(prefix), summary)
+        remove_baseline(prefix)
+        self.assertRaises(ConfigurationError, load_baseline, prefix)
+
+    def test_check_regressions(self):
+        summary = summarize([load_test_profiles('base', nodes=2)], [0])
+        self.assertListEqual(check_regressions(summary, load_test_profiles('same', nodes=2)), [])
+        regressions = check_regressions(summary, load_test_profiles('slower', nodes=4))
+        self.assertItemsEqual([reg['name'] for reg in regressions], ['main', TOTAL])
+        main = [reg for reg in regressions if reg['name'] == 'main'][0]
+        self.assertEqual(main['baseline'], 1500.0)
+        self.assertEqual(main['value'], 2500.0)
+        self.assertAlmostEqual(main['limit'], 1650.0)
+        self.assertListEqual(check_regressions(summary, load_test_profiles('slower_abs', nodes=4), absolute=5000.0), [])
+        total_only = check_regressions(summary, load_test_profiles('slower_total', nodes=4), functions=False)
+        self.assertListEqual([reg['name'] for reg in total_only], [TOTAL])
+        self.assertRaises(ConfigurationError, check_regressions, summary, load_test_profiles('sigma', nodes=2), 
+                          sigmas=2.0)
+
+    def test_check_sigmas(self):
+        summary = summarize([load_test_profiles('rep0', nodes=2), load_test_profiles('rep1', nodes=3)], [0, 1])
+        self.assertListEqual(check_regressions(summary, load_test_profiles('rep2', nodes=3), sigmas=1.0), [])
+        regressions = check_regressions(summary, load_test_profiles('rep3', nodes=6), sigmas=1.0)
+        self.assertIn('main', [reg['name'] for reg in regressions])
+
+    def test_threads_per_rank(self):
+        def threaded(nthreads):
+            # Each rank does the same work split over its threads
+            data = ProfileData([(rank, 0, tid) for rank in xrange(2) for tid in xrange(nthreads)], ['TIME'])
+            for thread in data.threads:
+                value = 100.0 / nthreads
+                data.add_profile('TIME', thread, {'functions': [('main', 1, 0, value, value, [])], 
+                                                  'user_events': [], 'metadata': []})
+            return data
+        summary = summarize([threaded(4)], [0])
+        self.assertEqual(summary['metrics']['TIME']['functions']['main'][0][0], 100.0)
+        self.assertListEqual(check_regressions(summary, threaded(1)), [])
+        self.assertListEqual(check_regressions(summary, threaded(8)), [])
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2016, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""Test functions.
+
+Functions used for unit tests of cache.py.
+"""
+
+import os
+from taucmdr import tests
+from taucmdr.analysis.profile import load_profiles, FUNCTION_FIELDS, USER_EVENT_FIELDS
+from taucmdr.analysis.cache import save_cache, load_cache
+from taucmdr.analysis.tests import write_test_profiles
+
+
+class AnalysisCacheTest(tests.TestCase):
+    """Tests for :any:`cache.save_cache` and :any:`cache.load_cache`."""
+
+    def _profile_data(self, name):
+        prefix = write_test_profiles(name, ('TIME', 'PAPI_FP_INS'))
+        return prefix, load_profiles(prefix)
+
+    def test_round_trip(self):
+        prefix, data = self._profile_data('round_trip')
+        path = os.path.join(prefix, 'analysis.cache')
+        save_cache(path, data, 'k' * 20)
+        cached = load_cache(path, 'k' * 20)
+        self.assertIsNotNone(cached)
+        self.assertListEqual(cached.threads, data.threads)
+        self.assertListEqual(cached.metrics, data.metrics)
+        self.assertListEqual(cached.functions, data.functions)
+        self.assertListEqual(cached.groups, data.groups)
+        self.assertListEqual(cached.user_events, data.user_events)
+        self.assertListEqual(cached.metadata, data.metadata)
+        self.assertListEqual(list(cached.column('TIME', 'excl', 'main')), [1000.0, 2000.0, 3000.0])
+        self.assertEqual(cached.value('TIME', 'calls', 'MPI_Send()', (1, 0, 0)), 4.0)
+        for metric in data.metrics:
+            for field in FUNCTION_FIELDS:
+                self.assertEqual(cached.function_data[metric][field], data.function_data[metric][field])
+        for field in USER_EVENT_FIELDS:
+            self.assertEqual(cached.user_event_data[field], data.user_event_data[field])
+
+    def test_stale_key(self):
+        prefix, data = self._profile_data('stale')
+        path = os.path.join(prefix, 'analysis.cache')
+        save_cache(path, data, 'a' * 20)
+        self.assertIsNone(load_cache(path, 'b' * 20))
+
+    def test_invalid(self):
+        prefix, data = self._profile_data('invalid')
+        path = os.path.join(prefix, 'analysis.cache')
+        self.assertIsNone(load_cache(path, 'k' * 20))
+        save_cache(path, data, 'k' * 20)
+        with open(path, 'r+b') as fout:
+            fout.truncate(os.path.getsize(path) - 8)
+        self.assertIsNone(load_cache(path, 'k' * 20))
+        with open(path, 'wb') as fout:
+            fout.write('garbage')
+        self.assertIsNone(load_cache(path, 'k' * 20))
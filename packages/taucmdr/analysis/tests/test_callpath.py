@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2016, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""Test functions.
+
+Functions used for unit tests of callpath.py.
+"""
+
+from taucmdr import tests
+from taucmdr.error import ConfigurationError
+from taucmdr.analysis.profile import ProfileData
+from taucmdr.analysis.callpath import CallTree
+
+# name, calls, subrs, excl, incl
+TIMERS = [('main', 1, 2, 10, 100),
+          ('solve', 2, 2, 30, 60),
+          ('MPI_Allreduce()', 3, 0, 30, 30),
+          ('main => solve', 2, 2, 30, 60),
+          ('main => MPI_Allreduce()', 1, 0, 30, 30),
+          ('main => solve => MPI_Allreduce()', 2, 0, 30, 30)]
+
+
+def callpath_data(nodes=2):
+    data = ProfileData([(node, 0, 0) for node in xrange(nodes)], ['TIME'])
+    for node in xrange(nodes):
+        profile = {'functions': [(name, calls, subrs, excl * (node+1), incl * (node+1), ['TAU_DEFAULT'])
+                                 for name, calls, subrs, excl, incl in TIMERS],
+                   'user_events': [],
+                   'metadata': []}
+        data.add_profile('TIME', (node, 0, 0), profile)
+    return data
+
+
+# Call paths truncated to depth 2: a calls b calls c
+TRUNCATED_TIMERS = [('a', 1, 1, 10, 110),
+                    ('b', 1, 1, 50, 100),
+                    ('c', 1, 0, 50, 50),
+                    ('a => b', 1, 1, 50, 100),
+                    ('b => c', 1, 0, 50, 50)]
+
+
+def truncated_callpath_data():
+    data = ProfileData([(0, 0, 0)], ['TIME'])
+    data.add_profile('TIME', (0, 0, 0), {'functions': [timer + (['TAU_DEFAULT'],) for timer in TRUNCATED_TIMERS],
+                                         'user_events': [], 'metadata': []})
+    return data
+
+
+class CallTreeTest(tests.TestCase):
+    """Tests for :any:`callpath.CallTree`."""
+
+    def test_build(self):
+        tree = CallTree(callpath_data())
+        # Root, main, main => solve, main => MPI_Allreduce(), main => solve => MPI_Allreduce()
+        self.assertEqual(len(tree), 5)
+        node = tree.find('main => solve => MPI_Allreduce()')
+        self.assertListEqual(tree.path(node), ['main', 'solve', 'MPI_Allreduce()'])
+        self.assertEqual(tree.find(['main', 'solve', 'MPI_Allreduce()']), node)
+        self.assertEqual(tree.values['excl'][node], 90.0)
+        self.assertListEqual(list(tree.column(node, 'calls')), [2.0, 2.0])
+        self.assertEqual(tree.values['excl'][tree.find('main')], 30.0)
+        self.assertRaises(KeyError, tree.find, 'solve')
+
+    def test_queries(self):
+        tree = CallTree(callpath_data())
+        self.assertEqual(tree.subtree_total(tree.find('main')), 30.0 + 90.0 + 90.0 + 90.0)
+        self.assertEqual(tree.subtree_total(tree.find('main => solve')), 180.0)
+        hottest = tree.hottest_paths(2)
+        self.assertEqual(len(hottest), 2)
+        self.assertEqual(hottest[0][1], 90.0)
+        self.assertItemsEqual(tree.callers('MPI_Allreduce()'), [('main', 90.0), ('solve', 90.0)])
+        self.assertListEqual(tree.callers('main'), [])
+        self.assertListEqual(tree.callees('main'), [('solve', 180.0), ('MPI_Allreduce()', 90.0)])
+        self.assertRaises(ConfigurationError, tree.callers, 'bogus')
+
+    def test_truncated(self):
+        tree = CallTree(truncated_callpath_data())
+        # b is only a root because its caller was truncated so its flat timer is not a separate root
+        self.assertEqual(tree.subtree_total(), 110.0)
+        self.assertEqual(tree.values['excl'][tree.find('b')], 0.0)
+        self.assertEqual(tree.values['excl'][tree.find('a')], 10.0)
+        self.assertEqual(tree.subtree_total(tree.find('a')), 60.0)
+        self.assertEqual(tree.subtree_total(tree.find('b')), 50.0)
+
+    def test_no_callpaths(self):
+        data = ProfileData([(0, 0, 0)], ['TIME'])
+        data.add_profile('TIME', (0, 0, 0), {'functions': [('main', 1, 0, 1, 1, [])], 
+                                             'user_events': [], 'metadata': []})
+        self.assertRaises(ConfigurationError, CallTree, data)
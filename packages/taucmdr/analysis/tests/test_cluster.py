@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2016, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""Test functions.
+
+Functions used for unit tests of cluster.py.
+"""
+
+from taucmdr import tests
+from taucmdr.error import ConfigurationError
+from taucmdr.analysis.profile import ProfileData
+from taucmdr.analysis.cluster import (TOTAL, rank_features, standardize, kmeans, robust_zscores, 
+                                      cluster_ranks, _rank_ranges)
+
+
+def two_group_data(ranks=20, outlier=None):
+    """Even ranks compute and odd ranks communicate.  The outlier rank computes much longer."""
+    data = ProfileData([(rank, 0, 0) for rank in xrange(ranks)], ['TIME'])
+    for rank in xrange(ranks):
+        compute, comm = (100.0 + rank % 3, 10.0) if rank % 2 == 0 else (10.0, 100.0 + rank % 3)
+        if rank == outlier:
+            compute *= 10
+        functions = [('main', 1, 2, 5.0, compute + comm + 5.0, []),
+                     ('compute', 1, 0, compute, compute, []),
+                     ('MPI_Wait()', 1, 0, comm, comm, [])]
+        data.add_profile('TIME', (rank, 0, 0), {'functions': functions, 'user_events': [], 'metadata': []})
+    return data
+
+
+class ClusterTest(tests.TestCase):
+    """Tests for :any:`cluster`."""
+
+    def test_rank_features(self):
+        data = ProfileData([(0, 0, 0), (0, 0, 1), (1, 0, 0)], ['TIME'])
+        for thread in data.threads:
+            data.add_profile('TIME', thread, {'functions': [('main', 1, 0, 2.0, 2.0, []), ('idle', 1, 0, 0.0, 0.0, [])],
+                                              'user_events': [], 'metadata': []})
+        ranks, functions, rows = rank_features(data)
+        self.assertListEqual(ranks, [0, 1])
+        self.assertListEqual(functions, ['main'])
+        self.assertListEqual(rows, [[4.0], [2.0]])
+
+    def test_standardize(self):
+        rows = standardize([[1.0, 5.0], [3.0, 5.0]])
+        self.assertListEqual(rows, [[-1.0, 0.0], [1.0, 0.0]])
+
+    def test_kmeans(self):
+        rows = [[0.0, 0.0], [0.1, 0.0], [10.0, 10.0], [10.1, 10.0], [0.0, 0.1]]
+        assignments, centroids = kmeans(rows, 2)
+        self.assertEqual(len(centroids), 2)
+        self.assertEqual(len(set(assignments[idx] for idx in (0, 1, 4))), 1)
+        self.assertEqual(assignments[2], assignments[3])
+        self.assertNotEqual(assignments[0], assignments[2])
+        # Fewer distinct rows than clusters
+        assignments, centroids = kmeans([[1.0], [1.0]], 3)
+        self.assertEqual(len(centroids), 1)
+
+    def test_robust_zscores(self):
+        median, zscores = robust_zscores([1.0, 2.0, 3.0, 4.0, 100.0])
+        self.assertEqual(median, 3.0)
+        self.assertGreater(zscores[4], 3.5)
+        self.assertLess(abs(zscores[1]), 1.0)
+        self.assertListEqual(robust_zscores([2.0, 2.0])[1], [0.0, 0.0])
+
+    def test_rank_ranges(self):
+        self.assertEqual(_rank_ranges([0, 1, 2, 3, 7, 9, 10]), '0-3,7,9-10')
+        self.assertEqual(_rank_ranges([]), '')
+
+    def test_cluster_ranks(self):
+        result = cluster_ranks(two_group_data(outlier=6), 2)
+        clusters = result['clusters']
+        self.assertEqual(len(clusters), 2)
+        groups = sorted(cluster['ranks'] for cluster in clusters)
+        self.assertIn(range(1, 20, 2), groups)
+        for cluster in clusters:
+            self.assertIn(cluster['representative'], cluster['ranks'])
+        self.assertEqual(result['outliers'][0]['rank'], 6)
+        self.assertIn(result['outliers'][0]['function'], ('compute', 'main', TOTAL))
+        self.assertRaises(ConfigurationError, cluster_ranks, two_group_data(), 0)
+
+    def test_straggler_group(self):
+        # 30 of 1000 ranks compute three times longer and form a cluster of their own
+        data = ProfileData([(rank, 0, 0) for rank in xrange(1000)], ['TIME'])
+        for rank in xrange(1000):
+            compute, comm = 100.0 + rank % 7, 10.0 + rank % 5
+            if rank < 30:
+                compute *= 3
+            functions = [('main', 1, 2, 5.0, compute + comm + 5.0, []),
+                         ('compute', 1, 0, compute, compute, []),
+                         ('MPI_Wait()', 1, 0, comm, comm, [])]
+            data.add_profile('TIME', (rank, 0, 0), {'functions': functions, 'user_events': [], 'metadata': []})
+        result = cluster_ranks(data)
+        self.assertIn(range(30), [cluster['ranks'] for cluster in result['clusters']])
+        self.assertListEqual(sorted(outlier['rank'] for outlier in result['outliers']), range(30))
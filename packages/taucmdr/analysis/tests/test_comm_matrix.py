@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2016, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""Test functions.
+
+Functions used for unit tests of comm_matrix.py.
+"""
+
+import os
+from StringIO import StringIO
+from taucmdr import tests
+from taucmdr.error import ConfigurationError
+from taucmdr.analysis.profile import ProfileData
+from taucmdr.analysis.comm_matrix import CommMatrix
+
+
+def ring_data(ranks=4, qualified=False):
+    """Each rank sends ``rank + 1`` messages of 100 bytes to the next rank and one 8 byte message to rank 0."""
+    threads = [(rank, 0, 0) for rank in xrange(ranks)]
+    data = ProfileData(threads, ['TIME'])
+    suffix = ' : main => MPI_Send()' if qualified else ''
+    for rank in xrange(ranks):
+        count, dest = rank + 1, (rank + 1) % ranks
+        events = [('Message size sent to node %d%s' % (dest, suffix), count, 100, 100, 100.0, 0.0),
+                  ('Message size for reduce', 1, 4, 4, 4.0, 16.0)]
+        if dest:
+            events.append(('Message size sent to node 0%s' % suffix, 1, 8, 8, 8.0, 64.0))
+        data.add_profile('TIME', (rank, 0, 0), {'functions': [('main', 1, 0, 1.0, 1.0, [])], 
+                                               'user_events': events, 'metadata': []})
+    return data
+
+
+class CommMatrixTest(tests.TestCase):
+    """Tests for :any:`comm_matrix`."""
+
+    def test_from_profile(self):
+        matrix = CommMatrix.from_profile(ring_data())
+        self.assertEqual(matrix.nranks, 4)
+        entries = zip(matrix.senders, matrix.receivers, matrix.messages, matrix.bytes)
+        self.assertListEqual(entries, [(0, 0, 1.0, 8.0), (0, 1, 1.0, 100.0), (1, 0, 1.0, 8.0), (1, 2, 2.0, 200.0),
+                                       (2, 0, 1.0, 8.0), (2, 3, 3.0, 300.0), (3, 0, 4.0, 400.0)])
+
+    def test_qualified_events(self):
+        matrix = CommMatrix.from_profile(ring_data(qualified=True))
+        self.assertEqual(len(matrix), 7)
+        self.assertEqual(sum(matrix.bytes), 1024.0)
+
+    def test_no_events(self):
+        data = ProfileData([(0, 0, 0)], ['TIME'])
+        data.add_profile('TIME', (0, 0, 0), {'functions': [('main', 1, 0, 1.0, 1.0, [])], 
+                                             'user_events': [], 'metadata': []})
+        self.assertRaises(ConfigurationError, CommMatrix.from_profile, data)
+
+    def test_from_coo(self):
+        matrix = CommMatrix.from_coo(3, [(2, 1, 1, 10), (0, 2, 1, 5), (2, 1, 2, 20)])
+        self.assertListEqual(list(matrix.senders), [0, 2])
+        self.assertListEqual(list(matrix.receivers), [2, 1])
+        self.assertListEqual(list(matrix.messages), [1.0, 3.0])
+        self.assertListEqual(list(matrix.bytes), [5.0, 30.0])
+
+    def test_to_csr(self):
+        indptr, indices, messages, _ = CommMatrix.from_profile(ring_data()).to_csr()
+        self.assertListEqual(list(indptr), [0, 2, 4, 6, 7])
+        self.assertListEqual(list(indices), [0, 1, 0, 2, 0, 3, 0])
+        self.assertListEqual(list(messages[indptr[3]:indptr[4]]), [4.0])
+
+    def test_totals(self):
+        matrix = CommMatrix.from_profile(ring_data())
+        self.assertListEqual(list(matrix.sent()), [108.0, 208.0, 308.0, 400.0])
+        self.assertListEqual(list(matrix.received('messages')), [7.0, 1.0, 2.0, 3.0])
+
+    def test_top_pairs(self):
+        pairs = CommMatrix.from_profile(ring_data()).top_pairs(2)
+        self.assertListEqual([(pair['sender'], pair['receiver']) for pair in pairs], [(3, 0), (2, 3)])
+        pairs = CommMatrix.from_profile(ring_data()).top_pairs(1, 'messages')
+        self.assertEqual(pairs[0]['messages'], 4.0)
+
+    def test_summary(self):
+        summary = CommMatrix.from_profile(ring_data()).summary()
+        self.assertEqual(summary['ranks'], 4)
+        self.assertEqual(summary['pairs'], 7)
+        self.assertAlmostEqual(summary['density'], 7 / 16.0)
+        self.assertEqual(summary['messages'], 13.0)
+        self.assertEqual(summary['bytes'], 1024.0)
+        self.assertAlmostEqual(summary['send_imbalance'], 400.0 / 256.0)
+
+    def test_write_csv(self):
+        fout = StringIO()
+        CommMatrix.from_coo(2, [(0, 1, 2, 64), (1, 0, 1, 8)]).write_csv(fout)
+        self.assertEqual(fout.getvalue(), 'sender,receiver,messages,bytes\n0,1,2,64\n1,0,1,8\n')
+
+    def test_binary_roundtrip(self):
+        matrix = CommMatrix.from_profile(ring_data())
+        path = os.path.join(tests.get_test_workdir(), 'comm_matrix.bin')
+        with open(path, 'wb') as fout:
+            matrix.write_binary(fout)
+        with open(path, 'rb') as fin:
+            loaded = CommMatrix.read_binary(fin)
+        self.assertEqual(loaded.nranks, matrix.nranks)
+        for attr in 'senders', 'receivers', 'messages', 'bytes':
+            self.assertListEqual(list(getattr(loaded, attr)), list(getattr(matrix, attr)))
+
+    def test_read_binary_invalid(self):
+        self.assertRaises(ConfigurationError, CommMatrix.read_binary, StringIO('not a matrix'))
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2016, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""Test functions.
+
+Functions used for unit tests of compare.py.
+"""
+
+from taucmdr import tests
+from taucmdr.error import ConfigurationError
+from taucmdr.analysis.profile import ProfileData
+from taucmdr.analysis.compare import compare_profiles, sort_comparison
+from taucmdr.analysis.tests import load_test_profiles
+
+
+class CompareProfilesTest(tests.TestCase):
+    """Tests for :any:`compare.compare_profiles`."""
+
+    def test_different_rank_counts(self):
+        base = load_test_profiles('base', nodes=3)
+        other = load_test_profiles('other', nodes=5)
+        rows = dict((row['name'], row) for row in compare_profiles([base, other]))
+        main = rows['main']['excl']
+        self.assertListEqual(main['values'], [2000.0, 3000.0])
+        self.assertListEqual(main['deltas'], [1000.0])
+        self.assertListEqual(main['ratios'], [1.5])
+        self.assertListEqual(rows['MPI_Send()']['calls']['deltas'], [0.0])
+        rows = dict((row['name'], row) for row in compare_profiles([base, other], statistic='max'))
+        self.assertListEqual(rows['main']['excl']['values'], [3000.0, 5000.0])
+
+    def test_threads_per_rank(self):
+        def threaded(nthreads):
+            # Each of two ranks does the same work split over its threads
+            data = ProfileData([(rank, 0, tid) for rank in xrange(2) for tid in xrange(nthreads)], ['TIME'])
+            for thread in data.threads:
+                value = 100.0 * (thread[0] + 1) / nthreads
+                data.add_profile('TIME', thread, {'functions': [('main', 1, 0, value, value, [])], 
+                                                  'user_events': [], 'metadata': []})
+            return data
+        rows = compare_profiles([threaded(1), threaded(4)], fields=('excl',))
+        self.assertListEqual(rows[0]['excl']['values'], [150.0, 150.0])
+        self.assertListEqual(rows[0]['excl']['deltas'], [0.0])
+        rows = compare_profiles([threaded(1), threaded(4)], fields=('excl',), statistic='max')
+        self.assertListEqual(rows[0]['excl']['values'], [200.0, 200.0])
+
+    def test_missing_function(self):
+        base = load_test_profiles('base_missing', nodes=2)
+        other = load_test_profiles('other_missing', nodes=2)
+        other.functions[2] = 'MPI_Recv()'
+        other.function_ids = dict((name, idx) for idx, name in enumerate(other.functions))
+        rows = compare_profiles([base, other])
+        names = [row['name'] for row in rows]
+        self.assertListEqual(names, ['.TAU application', 'main', 'MPI_Send()', 'MPI_Recv()'])
+        recv = rows[3]['excl']
+        self.assertListEqual(recv['values'], [0.0, 7.5])
+        self.assertListEqual(recv['ratios'], [None])
+        ordered = sort_comparison(rows, 'excl', 'ratio')
+        self.assertItemsEqual([row['name'] for row in ordered[:2]], ['MPI_Send()', 'MPI_Recv()'])
+        ordered = sort_comparison(rows, 'excl', 'name')
+        self.assertEqual(ordered[0]['name'], '.TAU application')
+
+    def test_sort_delta(self):
+        rows = compare_profiles([load_test_profiles('base_sort', nodes=2), load_test_profiles('other_sort', nodes=4)])
+        self.assertEqual(sort_comparison(rows, 'excl', 'delta')[0]['name'], 'main')
+        self.assertRaises(ConfigurationError, sort_comparison, rows, 'excl', 'bogus')
+        self.assertRaises(ConfigurationError, compare_profiles, [], None, ('excl',), 'median')
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2016, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""Test functions.
+
+Functions used for unit tests of flamegraph.py.
+"""
+
+from StringIO import StringIO
+from xml.etree import ElementTree
+from taucmdr import tests
+from taucmdr.error import ConfigurationError
+from taucmdr.analysis.profile import ProfileData
+from taucmdr.analysis.callpath import CallTree
+from taucmdr.analysis.flamegraph import folded_stacks, write_folded, write_svg
+from taucmdr.analysis.tests.test_callpath import callpath_data, truncated_callpath_data
+
+
+class FlameGraphTest(tests.TestCase):
+    """Tests for :any:`flamegraph`."""
+
+    def test_folded(self):
+        fout = StringIO()
+        self.assertEqual(write_folded(fout, folded_stacks(callpath_data())), 4)
+        self.assertListEqual(sorted(fout.getvalue().splitlines()), ['main 30', 
+                                                                    'main;MPI_Allreduce() 90',
+                                                                    'main;solve 90',
+                                                                    'main;solve;MPI_Allreduce() 90'])
+
+    def test_folded_per_rank(self):
+        stacks = dict(folded_stacks(callpath_data(), per_rank=True))
+        self.assertEqual(len(stacks), 8)
+        self.assertEqual(stacks['n,c,t 0,0,0;main;solve'], 30.0)
+        self.assertEqual(stacks['n,c,t 1,0,0;main;solve'], 60.0)
+
+    def test_folded_truncated(self):
+        # With callpath depth 2 the flat timer of b, which a calls, must not be counted again as a root
+        stacks = dict(folded_stacks(truncated_callpath_data()))
+        self.assertDictEqual(stacks, {'a': 10.0, 'a;b': 50.0, 'b;c': 50.0})
+        self.assertEqual(sum(stacks.itervalues()), 110.0)
+
+    def test_no_callpaths(self):
+        data = ProfileData([(0, 0, 0)], ['TIME'])
+        self.assertRaises(ConfigurationError, folded_stacks, data)
+
+    def test_svg(self):
+        fout = StringIO()
+        self.assertEqual(write_svg(fout, CallTree(callpath_data()), title='<test>'), 4)
+        root = ElementTree.fromstring(fout.getvalue())
+        titles = [elem.text for elem in root.iter('{http://www.w3.org/2000/svg}title')]
+        self.assertEqual(len(titles), 4)
+        self.assertIn('main (300, 100.00%)', titles)
+        # Frames are main, then main's callees sorted by name, then MPI_Allreduce() called by solve
+        widths = [float(elem.get('width')) for elem in root.iter('{http://www.w3.org/2000/svg}rect') 
+                  if elem.get('width') != '100%']
+        self.assertEqual(widths[0], 1180.0)
+        self.assertAlmostEqual(widths[1] + widths[2], 1180.0 * 270 / 300)
+        self.assertEqual(widths[3], widths[1])
+
+    def test_svg_truncated(self):
+        fout = StringIO()
+        write_svg(fout, CallTree(truncated_callpath_data()))
+        root = ElementTree.fromstring(fout.getvalue())
+        titles = [elem.text for elem in root.iter('{http://www.w3.org/2000/svg}title')]
+        self.assertIn('a (60, 54.55%)', titles)
+        self.assertIn('b (50, 45.45%)', titles)
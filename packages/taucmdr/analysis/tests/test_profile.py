@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2016, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""Test functions.
+
+Functions used for unit tests of profile.py.
+"""
+
+import os
+from taucmdr import tests
+from taucmdr.error import ConfigurationError
+from taucmdr.analysis.profile import load_profiles, FUNCTION_FIELDS, USER_EVENT_FIELDS
+from taucmdr.cf.tests.test_tau_profile import write_profiles
+
+
+class LoadProfilesTest(tests.TestCase):
+    """Tests for :any:`profile.load_profiles`."""
+
+    def test_single_metric(self):
+        prefix = os.path.join(tests.get_test_workdir(), 'single')
+        write_profiles(prefix, ['TIME'], nodes=3)
+        data = load_profiles(prefix)
+        self.assertListEqual(data.metrics, ['TIME'])
+        self.assertListEqual(data.threads, [(0, 0, 0), (1, 0, 0), (2, 0, 0)])
+        self.assertListEqual(data.functions, ['.TAU application', 'main', 'MPI_Send()'])
+        self.assertListEqual(data.groups[2], ['MPI', 'TAU_MESSAGE'])
+        self.assertListEqual(list(data.column('TIME', 'excl', 'main')), [1000.0, 2000.0, 3000.0])
+        self.assertEqual(data.value('TIME', 'calls', 'MPI_Send()', (1, 0, 0)), 4.0)
+        self.assertListEqual(list(data.totals('TIME', 'excl')), [30.0, 6000.0, 22.5])
+        self.assertListEqual(list(data.user_event_column('mean', 'Message size for send')), [8.0, 8.0, 8.0])
+        self.assertEqual(data.metadata[2]['Node Name'], 'node2')
+
+    def test_multiple_metrics(self):
+        prefix = os.path.join(tests.get_test_workdir(), 'multi')
+        write_profiles(prefix, ['TIME', 'PAPI_FP_INS'], nodes=2)
+        data = load_profiles(prefix)
+        self.assertItemsEqual(data.metrics, ['TIME', 'PAPI_FP_INS'])
+        self.assertListEqual(list(data.column('PAPI_FP_INS', 'incl', data.function_id('main'))), [100.0, 200.0])
+        self.assertListEqual(list(data.column('TIME', 'incl', 'main')), [1000.0, 2000.0])
+        self.assertEqual(len(data.user_events), 1)
+        self.assertEqual(len(data.function_data['TIME']['subrs']), len(data.functions) * len(data.threads))
+
+    def test_parallel(self):
+        prefix = os.path.join(tests.get_test_workdir(), 'parallel')
+        write_profiles(prefix, ['TIME', 'PAPI_FP_INS'], nodes=50)
+        # Give some ranks a function no other rank calls
+        for node in 7, 33:
+            path = os.path.join(prefix, 'MULTI__TIME', 'profile.%d.0.0' % node)
+            with open(path) as fin:
+                lines = fin.readlines()
+            lines[0] = lines[0].replace('3', '4', 1)
+            lines.insert(2, '"rank%d_only" 2 0 5 5 0 GROUP="TAU_USER"\n' % node)
+            with open(path, 'w') as fout:
+                fout.writelines(lines)
+        serial = load_profiles(prefix, nprocs=1)
+        parallel = load_profiles(prefix, nprocs=3)
+        self.assertListEqual(parallel.threads, serial.threads)
+        self.assertItemsEqual(parallel.functions, serial.functions)
+        self.assertEqual(len(parallel.functions), 5)
+        for metric in serial.metrics:
+            for field in FUNCTION_FIELDS:
+                for name in serial.functions:
+                    self.assertListEqual(list(parallel.column(metric, field, name)), 
+                                         list(serial.column(metric, field, name)))
+        for field in USER_EVENT_FIELDS:
+            self.assertListEqual(list(parallel.user_event_column(field, 0)), list(serial.user_event_column(field, 0)))
+        self.assertListEqual(parallel.metadata, serial.metadata)
+        self.assertListEqual(list(parallel.column('TIME', 'excl', 'rank33_only')), [5.0 if i == 33 else 0.0 
+                                                                                    for i in xrange(50)])
+
+    def test_no_profiles(self):
+        prefix = os.path.join(tests.get_test_workdir(), 'empty')
+        os.mkdir(prefix)
+        self.assertRaises(ConfigurationError, load_profiles, prefix)
+
+    def test_select_nodes(self):
+        prefix = os.path.join(tests.get_test_workdir(), 'nodes')
+        write_profiles(prefix, ['TIME'], nodes=4)
+        data = load_profiles(prefix, nodes=set([2]))
+        self.assertListEqual(data.threads, [(2, 0, 0)])
+        self.assertListEqual(list(data.column('TIME', 'excl', 'main')), [3000.0])
+        self.assertRaises(ConfigurationError, load_profiles, prefix, None, set([9]))
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2016, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""Test functions.
+
+Functions used for unit tests of statistics.py.
+"""
+
+import os
+import math
+from array import array
+from taucmdr import tests
+from taucmdr.error import ConfigurationError
+from taucmdr.analysis.profile import load_profiles
+from taucmdr.analysis.statistics import (percentile, column_statistics, function_statistics, top_functions,
+                                         top_function_threads)
+from taucmdr.cf.tests.test_tau_profile import write_profiles
+from taucmdr.analysis.tests.test_callpath import callpath_data
+
+
+class StatisticsTest(tests.TestCase):
+    """Tests for :any:`statistics`."""
+
+    def test_percentile(self):
+        ordered = [1.0, 2.0, 3.0, 4.0, 5.0]
+        self.assertEqual(percentile(ordered, 0), 1.0)
+        self.assertEqual(percentile(ordered, 50), 3.0)
+        self.assertEqual(percentile(ordered, 100), 5.0)
+        self.assertAlmostEqual(percentile(ordered, 90), 4.6)
+        self.assertEqual(percentile([], 50), 0.0)
+
+    def test_column_statistics(self):
+        stats = column_statistics(array('d', [2.0, 4.0, 4.0, 4.0, 5.0, 5.0, 7.0, 9.0]), (50,))
+        self.assertEqual(stats['total'], 40.0)
+        self.assertEqual(stats['mean'], 5.0)
+        self.assertEqual(stats['min'], 2.0)
+        self.assertEqual(stats['max'], 9.0)
+        self.assertAlmostEqual(stats['stddev'], 2.0)
+        self.assertAlmostEqual(stats['imbalance'], 1.8)
+        self.assertEqual(stats['p50'], 4.5)
+
+    def test_column_statistics_large_values(self):
+        # Long runs' times in microseconds and hardware counters are large compared to their spread
+        for offset in 1e9, 1e10, 1e12:
+            stats = column_statistics(array('d', [offset + 0.1 * i for i in xrange(1000)]), ())
+            self.assertAlmostEqual(stats['stddev'], 0.1 * math.sqrt((1000**2 - 1) / 12.0), delta=1e-3)
+        self.assertEqual(column_statistics(array('d', [3e10] * 10), ())['stddev'], 0.0)
+
+    def test_function_statistics(self):
+        prefix = os.path.join(tests.get_test_workdir(), 'statistics')
+        write_profiles(prefix, ['TIME'], nodes=3)
+        data = load_profiles(prefix)
+        stats = function_statistics(data, 'TIME', 'excl')
+        self.assertListEqual([func['name'] for func in stats], ['main', '.TAU application', 'MPI_Send()'])
+        main = stats[0]
+        self.assertEqual(main['mean'], 2000.0)
+        self.assertEqual(main['p50'], 2000.0)
+        self.assertAlmostEqual(main['imbalance'], 1.5)
+        self.assertAlmostEqual(sum(func['percent'] for func in stats), 100.0)
+        self.assertRaises(ConfigurationError, function_statistics, data, 'PAPI_FP_INS')
+        self.assertRaises(ConfigurationError, function_statistics, data, 'TIME', 'bogus')
+
+    def test_function_statistics_callpath(self):
+        # Callpath timers repeat time already counted by flat timers so they are not part of the total
+        data = callpath_data()
+        self.assertEqual(data.flat_total('TIME'), 210.0)
+        stats = dict((func['name'], func) for func in function_statistics(data, 'TIME', 'excl'))
+        self.assertAlmostEqual(stats['main']['percent'], 100.0 * 30 / 210)
+        self.assertAlmostEqual(stats['main => solve']['percent'], 100.0 * 90 / 210)
+        self.assertAlmostEqual(sum(stats[name]['percent'] for name in ('main', 'solve', 'MPI_Allreduce()')), 100.0)
+
+    def test_top_functions(self):
+        prefix = os.path.join(tests.get_test_workdir(), 'top')
+        write_profiles(prefix, ['TIME'], nodes=3)
+        data = load_profiles(prefix)
+        top = top_functions(data, 2)
+        self.assertListEqual([func['name'] for func in top], ['main', '.TAU application'])
+        self.assertEqual(top[0]['value'], 6000.0)
+        top = top_functions(data, 1, 'TIME', 'excl', node=1)
+        self.assertEqual(top[0]['value'], 2000.0)
+        self.assertAlmostEqual(top[0]['percent'], 100.0 * 2000 / 2017.5)
+        self.assertRaises(ConfigurationError, top_functions, data, 1, 'TIME', 'excl', 7)
+        self.assertEqual(top_functions(data, 1, 'TIME', 'calls')[0]['name'], 'MPI_Send()')
+
+    def test_top_functions_callpath(self):
+        data = callpath_data()
+        top = top_functions(data, 10)
+        self.assertListEqual(sorted(func['name'] for func in top), ['MPI_Allreduce()', 'main', 'solve'])
+        self.assertAlmostEqual(sum(func['percent'] for func in top), 100.0)
+        top = top_functions(data, 10, node=1)
+        self.assertEqual(len(top), 3)
+        self.assertAlmostEqual(sum(func['percent'] for func in top), 100.0)
+        top = top_functions(data, 10, callpath=True)
+        self.assertEqual(len(top), len(data.functions))
+        self.assertAlmostEqual(top[0]['percent'], 100.0 * 90 / 210)
+        top = top_function_threads(data, 10)
+        self.assertEqual(len(top), 6)
+        self.assertTrue(all(' => ' not in spot['name'] for spot in top))
+        self.assertEqual(len(top_function_threads(data, 20, callpath=True)), 12)
+
+    def test_top_function_threads(self):
+        prefix = os.path.join(tests.get_test_workdir(), 'top_threads')
+        write_profiles(prefix, ['TIME'], nodes=3)
+        top = top_function_threads(load_profiles(prefix), 2)
+        self.assertListEqual([(spot['name'], spot['thread']) for spot in top], 
+                             [('main', (2, 0, 0)), ('main', (1, 0, 0))])
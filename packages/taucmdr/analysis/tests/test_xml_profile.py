@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2016, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""Test functions.
+
+Functions used for unit tests of xml_profile.py.
+"""
+
+import os
+import gzip
+from StringIO import StringIO
+from taucmdr import tests
+from taucmdr.analysis.xml_profile import load_xml_profile, XmlProfileError
+
+
+THREAD = """<thread id="%(node)d.0.0.0" node="%(node)d" context="0" thread="0">
+<metadata><attribute><name>Node Name</name><value>node%(node)d</value></attribute></metadata>
+</thread>
+"""
+
+PROFILE = """<profile thread="%(node)d.0.0.0">
+<name>final</name>
+<interval_data metrics="0 1">
+0 1 1 10 %(total)d 1 %(main)d
+1 1 2 %(main)d %(main)d %(main)d %(main)d
+2 4 0 7.5 7.5 3 3
+</interval_data>
+<atomic_data>
+0 4 8 8 8 256
+</atomic_data>
+</profile>
+"""
+
+DEFINITIONS = """<definitions thread="*">
+<metric id="0"><name>TIME</name><units>microseconds</units></metric>
+<metric id="1"><name>PAPI_FP_INS</name><units>counts</units></metric>
+<event id="0"><name>.TAU application</name><group>TAU_DEFAULT</group></event>
+<event id="1"><name>main</name><group>TAU_DEFAULT</group></event>
+<event id="2"><name>MPI_Send()</name><group>MPI | TAU_MESSAGE</group></event>
+<userevent id="0"><name>Message size for send</name></userevent>
+</definitions>
+"""
+
+
+def merged_profile(nodes):
+    fields = [{'node': node, 'main': 100*(node+1), 'total': 100*(node+1)+10} for node in xrange(nodes)]
+    return ''.join(['<?xml version="1.0" encoding="UTF-8"?>\n<profile_xml>\n'] + 
+                   [THREAD % field for field in fields] + [DEFINITIONS] + 
+                   [PROFILE % field for field in fields] + ['</profile_xml>\n'])
+
+
+class LoadXmlProfileTest(tests.TestCase):
+    """Tests for :any:`xml_profile.load_xml_profile`."""
+
+    def _check(self, data, nodes):
+        self.assertListEqual(data.threads, [(node, 0, 0) for node in xrange(nodes)])
+        self.assertItemsEqual(data.metrics, ['TIME', 'PAPI_FP_INS'])
+        self.assertListEqual(data.functions, ['.TAU application', 'main', 'MPI_Send()'])
+        self.assertListEqual(data.groups[2], ['MPI', 'TAU_MESSAGE'])
+        self.assertListEqual(list(data.column('TIME', 'excl', 'main')), [100.0*(node+1) for node in xrange(nodes)])
+        self.assertListEqual(list(data.column('PAPI_FP_INS', 'incl', 'MPI_Send()')), [3.0] * nodes)
+        self.assertEqual(data.value('TIME', 'calls', 'MPI_Send()', (1, 0, 0)), 4.0)
+        self.assertListEqual(list(data.user_event_column('sumsqr', 'Message size for send')), [256.0] * nodes)
+        self.assertEqual(data.metadata[nodes-1]['Node Name'], 'node%d' % (nodes-1))
+
+    def test_xml(self):
+        path = os.path.join(tests.get_test_workdir(), 'tauprofile.xml')
+        with open(path, 'w') as fout:
+            fout.write(merged_profile(3))
+        self._check(load_xml_profile(path), 3)
+
+    def test_gzip(self):
+        path = os.path.join(tests.get_test_workdir(), 'tauprofile.xml.gz')
+        with gzip.open(path, 'wb') as fout:
+            fout.write(merged_profile(500))
+        self._check(load_xml_profile(path), 500)
+        # Non-seekable streams, e.g. pack members, are read too
+        with open(path, 'rb') as fin:
+            stream = StringIO(fin.read())
+        stream.seek = None
+        self._check(load_xml_profile('member', stream), 500)
+
+    def test_invalid(self):
+        path = os.path.join(tests.get_test_workdir(), 'invalid.xml')
+        with open(path, 'w') as fout:
+            fout.write(merged_profile(2).replace('<event id="2">', '<event id="3">'))
+        self.assertRaises(XmlProfileError, load_xml_profile, path)
+        with open(path, 'w') as fout:
+            fout.write('<profile_xml><thread')
+        self.assertRaises(XmlProfileError, load_xml_profile, path)
@@ -0,0 +1,230 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2016, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""Streaming reader for TAU XML profiles.
+
+TAU writes merged profiles (``TAU_PROFILE_FORMAT=merged``) as a single ``tauprofile.xml`` file that
+can be gigabytes in size at scale.  The file is read with :any:`ElementTree.iterparse` and each 
+top-level element is discarded as soon as it has been copied into the :any:`ProfileData` columns, 
+so memory use doesn't depend on the file size.  Gzip-compressed files (``.xml.gz``), as written 
+by ``tau trial export``, are decompressed while they are read.
+
+The file lists the threads, then event and metric definitions, then one ``profile`` element per 
+thread holding whitespace-separated ``interval_data`` and ``atomic_data`` rows::
+
+    <thread id="0.0.0.0" node="0" context="0" thread="0"><metadata>...</metadata></thread>
+    <definitions thread="*">
+      <metric id="0"><name>TIME</name></metric>
+      <event id="0"><name>main</name><group>TAU_DEFAULT</group></event>
+      <userevent id="0"><name>Message size</name></userevent>
+    </definitions>
+    <profile thread="0.0.0.0">
+      <interval_data metrics="0">0 1 2 1000 1010</interval_data>
+      <atomic_data>0 4 8 8 8 256</atomic_data>
+    </profile>
+"""
+
+import zlib
+from xml.etree import cElementTree as ElementTree
+from taucmdr import logger
+from taucmdr.error import ConfigurationError
+from taucmdr.analysis.profile import ProfileData
+
+
+LOGGER = logger.get_logger(__name__)
+
+_GZIP_MAGIC = '\x1f\x8b'
+
+_CHUNK_SIZE = 1024 * 1024
+
+
+class XmlProfileError(ConfigurationError):
+    """Indicates that a TAU XML profile is invalid."""
+
+    def __init__(self, name, reason):
+        super(XmlProfileError, self).__init__("Invalid TAU XML profile '%s': %s" % (name, reason))
+
+
+class _GzipStream(object):
+    """Decompress a gzip stream from any readable file-like object, e.g. a pack member that can't seek."""
+    # pylint: disable=too-few-public-methods
+
+    def __init__(self, fileobj):
+        self._fileobj = fileobj
+        self._decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        self._pending = ''
+
+    def read(self, size=-1):
+        parts = []
+        remaining = size
+        while size < 0 or remaining > 0:
+            if not self._pending:
+                if self._decompressor.unused_data:
+                    # Start of another gzip member
+                    self._pending = self._decompressor.unused_data
+                    self._decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+                else:
+                    self._pending = self._fileobj.read(_CHUNK_SIZE)
+                    if not self._pending:
+                        break
+            data = self._decompressor.decompress(self._pending, max(remaining, 0))
+            self._pending = self._decompressor.unconsumed_tail
+            parts.append(data)
+            remaining -= len(data)
+        return ''.join(parts)
+
+
+class _Reader(object):
+    """Reads the first bytes of a file to detect gzip compression without seeking."""
+    # pylint: disable=too-few-public-methods
+
+    def __init__(self, fileobj):
+        self._fileobj = fileobj
+        self.head = fileobj.read(len(_GZIP_MAGIC))
+
+    def read(self, size=-1):
+        head, self.head = self.head, ''
+        if size < 0:
+            return head + self._fileobj.read()
+        return head + self._fileobj.read(size - len(head))
+
+
+def _open_stream(fileobj):
+    reader = _Reader(fileobj)
+    if reader.head == _GZIP_MAGIC:
+        return _GzipStream(reader)
+    return reader
+
+
+class _Definitions(object):
+    # pylint: disable=too-few-public-methods
+
+    def __init__(self):
+        self.metrics = {}
+        self.events = {}
+        self.user_events = {}
+
+    def update(self, elem):
+        for metric in elem.iter('metric'):
+            self.metrics[metric.get('id')] = metric.findtext('name', '').strip()
+        for event in elem.iter('event'):
+            groups = [group.strip() for group in event.findtext('group', '').split('|') if group.strip()]
+            self.events[int(event.get('id'))] = (event.findtext('name', '').strip(), groups)
+        for event in elem.iter('userevent'):
+            self.user_events[int(event.get('id'))] = event.findtext('name', '').strip()
+
+
+def _rows(text):
+    for line in (text or '').splitlines():
+        fields = line.split()
+        if fields:
+            yield fields
+
+
+def _add_profile(data, elem, thread, metadata, defs):
+    profiles = dict((metric, {'functions': [], 'user_events': [], 'metadata': []}) for metric in data.metrics)
+    profiles[data.metrics[0]]['metadata'] = metadata
+    for interval in elem.iter('interval_data'):
+        metrics = [defs.metrics[metric_id] for metric_id in interval.get('metrics', '').split()]
+        for fields in _rows(interval.text):
+            name, groups = defs.events[int(fields[0])]
+            calls, subrs = float(fields[1]), float(fields[2])
+            for idx, metric in enumerate(metrics):
+                excl, incl = float(fields[3+2*idx]), float(fields[4+2*idx])
+                profiles[metric]['functions'].append((name, calls, subrs, excl, incl, groups))
+    for atomic in elem.iter('atomic_data'):
+        for fields in _rows(atomic.text):
+            profiles[data.metrics[0]]['user_events'].append(
+                (defs.user_events[int(fields[0])], int(float(fields[1])), float(fields[2]), float(fields[3]), 
+                 float(fields[4]), float(fields[5])))
+    for metric, profile in profiles.iteritems():
+        data.add_profile(metric, thread, profile)
+
+
+def load_xml_profile(path, fileobj=None):
+    """Load a TAU XML profile, e.g. a merged profile.
+    
+    Args:
+        path (str): Path to a ``tauprofile.xml`` or ``tauprofile.xml.gz`` file.
+        fileobj (file): Read the profile from this file-like object instead of opening `path`,
+                        e.g. a member of a trial pack.  `path` is only used in error messages.
+        
+    Returns:
+        ProfileData: The profile data.
+        
+    Raises:
+        ConfigurationError: The file is not a valid TAU XML profile.
+    """
+    # pylint: disable=too-many-locals,too-many-branches
+    threads = {}
+    thread_metadata = {}
+    definitions = {}
+    data = None
+    fin = open(path, 'rb') if fileobj is None else fileobj
+    try:
+        context = ElementTree.iterparse(_open_stream(fin), events=('start', 'end'))
+        _, root = next(context)
+        depth = 0
+        for event, elem in context:
+            if event == 'start':
+                depth += 1
+                continue
+            depth -= 1
+            if depth != 0:
+                continue
+            if elem.tag == 'thread':
+                thread = tuple(int(elem.get(attr)) for attr in ('node', 'context', 'thread'))
+                threads[elem.get('id')] = thread
+                thread_metadata[thread] = [(attr.findtext('name', ''), attr.findtext('value', '')) 
+                                           for attr in elem.iter('attribute')]
+            elif elem.tag == 'definitions':
+                definitions.setdefault(elem.get('thread', '*'), _Definitions()).update(elem)
+            elif elem.tag == 'profile':
+                if data is None:
+                    metrics = set()
+                    for defs in definitions.itervalues():
+                        metrics.update(defs.metrics.itervalues())
+                    data = ProfileData(sorted(threads.itervalues()), sorted(metrics))
+                thread_id = elem.get('thread')
+                defs = definitions.get(thread_id) or definitions.get('*')
+                if thread_id not in threads or defs is None:
+                    raise XmlProfileError(path, "no thread or definitions for profile of thread '%s'" % thread_id)
+                thread = threads[thread_id]
+                _add_profile(data, elem, thread, thread_metadata[thread], defs)
+            # Drop the finished element so memory use stays constant
+            root.clear()
+    except (SyntaxError, IOError, EOFError, zlib.error) as err:
+        raise XmlProfileError(path, err)
+    except (KeyError, IndexError, ValueError, TypeError) as err:
+        raise XmlProfileError(path, "unexpected data: %s" % err)
+    finally:
+        if fin is not fileobj:
+            fin.close()
+    if data is None:
+        raise XmlProfileError(path, "no profiles")
+    LOGGER.debug("Loaded %d functions on %d threads from '%s'", len(data.functions), len(data.threads), path)
+    return data
@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2016, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""Random access to packed trial data.
+
+A trial pack holds all of a trial's data files in a single file so that trials with tens of 
+thousands of profiles don't burden the filesystem's metadata servers.  The pack is a zip archive:
+the central directory at the end of the file is an index mapping each member name to its offset,
+length, and compression method.  The pack is memory-mapped so any one member can be read without
+reading or unpacking the rest of the pack.
+"""
+
+import os
+import mmap
+from zipfile import ZipFile, BadZipfile, ZIP_STORED
+from taucmdr import logger, util
+from taucmdr.error import ConfigurationError
+
+
+LOGGER = logger.get_logger(__name__)
+
+_BUFFER_SIZE = 1024 * 1024
+
+
+class PackError(ConfigurationError):
+    """Indicates that a trial pack is missing or corrupt."""
+
+    def __init__(self, path, reason):
+        super(PackError, self).__init__("Invalid trial pack '%s': %s" % (path, reason))
+
+
+class _MappedFile(object):
+    """File-like read-only view of a memory map, as required by :any:`ZipFile`."""
+
+    def __init__(self, mapped):
+        self._mmap = mapped
+
+    def read(self, size=-1):
+        if size < 0:
+            size = len(self._mmap) - self._mmap.tell()
+        return self._mmap.read(size)
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        self._mmap.seek(offset, whence)
+
+    def tell(self):
+        return self._mmap.tell()
+
+    def close(self):
+        self._mmap.close()
+
+
+class TrialPack(object):
+    """Read-only random access to the members of a trial pack.
+    
+    Members are read through a single memory map so a :any:`TrialPack` should not be shared between threads.
+    
+    Attributes:
+        path (str): Path to the pack file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        try:
+            with open(path, 'rb') as fin:
+                self._mmap = _MappedFile(mmap.mmap(fin.fileno(), 0, access=mmap.ACCESS_READ))
+        except (IOError, OSError, ValueError) as err:
+            raise PackError(path, err)
+        try:
+            self._archive = ZipFile(self._mmap)
+        except (BadZipfile, IOError, ValueError) as err:
+            self._mmap.close()
+            raise PackError(path, err)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    def __contains__(self, name):
+        try:
+            self._archive.getinfo(name)
+        except KeyError:
+            return False
+        return True
+
+    def __len__(self):
+        return len(self._archive.infolist())
+
+    def close(self):
+        """Release the pack's memory map."""
+        self._archive.close()
+        self._mmap.close()
+
+    def names(self):
+        """Returns a list of member names in pack order."""
+        return self._archive.namelist()
+
+    def index(self, name):
+        """Look up a member in the pack index.
+        
+        Args:
+            name (str): Member name, i.e. the file's path relative to the trial directory.
+            
+        Returns:
+            tuple: (offset, length, compressed) where `offset` is the position of the member's local 
+                   header in the pack, `length` is the member's uncompressed size in bytes, and 
+                   `compressed` is True if the member is compressed.
+                   
+        Raises:
+            KeyError: No member named `name`.
+        """
+        info = self._archive.getinfo(name)
+        return info.header_offset, info.file_size, info.compress_type != ZIP_STORED
+
+    def open(self, name):
+        """Open a member of the pack for reading.
+        
+        Args:
+            name (str): Member name.
+            
+        Returns:
+            file: A read-only file-like object.
+            
+        Raises:
+            KeyError: No member named `name`.
+        """
+        return self._archive.open(name)
+
+    def read(self, name):
+        """Returns the contents of a member of the pack.
+        
+        Args:
+            name (str): Member name.
+            
+        Raises:
+            KeyError: No member named `name`.
+        """
+        return self._archive.read(name)
+
+    def extract(self, dest, names=None):
+        """Extract members of the pack to a directory.
+        
+        Args:
+            dest (str): Path to the destination directory.
+            names (list): Names of members to extract, or None to extract all members.
+            
+        Returns:
+            list: Names of the extracted members.
+        """
+        if names is None:
+            names = self.names()
+        for name in names:
+            path = os.path.join(dest, name)
+            if name.endswith('/'):
+                util.mkdirp(path)
+                continue
+            util.mkdirp(os.path.dirname(path))
+            with self._archive.open(name) as fin, open(path, 'wb') as fout:
+                while True:
+                    buf = fin.read(_BUFFER_SIZE)
+                    if not buf:
+                        break
+                    fout.write(buf)
+        LOGGER.debug("Extracted %d members of '%s' to '%s'", len(names), self.path, dest)
+        return names
@@ -44,6 +44,8 @@ import resource
 from subprocess import CalledProcessError
 from taucmdr import logger, util
 from taucmdr.error import ConfigurationError, InternalError
+from taucmdr.progress import progress_spinner
+from taucmdr.cf import tau_trace
 from taucmdr.cf.software import SoftwarePackageError
 from taucmdr.cf.software.installation import Installation, parallel_make_flags
 from taucmdr.cf.compiler import host as host_compilers, InstalledCompilerSet
@@ -133,6 +135,26 @@ PROFILE_ANALYSIS_TOOLS = 'paraprof', 'pprof'
 TRACE_ANALYSIS_TOOLS = 'jumpshot', 'vampir'
 
 
+AUTO_PROFILE_RANKS = {'merged': 1024, 'pack': 128}
+"""Default process counts at which the "auto" profile format merges or packs profiles."""
+
+
+def auto_profile_threshold(layout):
+    """Returns the process count at which the "auto" profile format switches to `layout`.
+    
+    Args:
+        layout (str): "merged" to write a merged profile or "pack" to pack TAU profiles after the run.
+        
+    Returns:
+        int: Process count from the ``trial.auto_<layout>_ranks`` configuration item or :any:`AUTO_PROFILE_RANKS`.
+    """
+    from taucmdr import configuration
+    try:
+        return int(configuration.get('trial.auto_%s_ranks' % layout))
+    except (KeyError, TypeError, ValueError):
+        return AUTO_PROFILE_RANKS[layout]
+
+
 class TauInstallation(Installation):
     """Encapsulates a TAU installation.
 
@@ -217,7 +239,8 @@ class TauInstallation(Installation):
             keep_inst_files (bool): If True then do not remove instrumented source files after compilation.
             reuse_inst_files (bool): If True then reuse instrumented source files for compilation when available.
             select_file (str): Path to selective instrumentation file.
-            profile (str): Format for profile files, one of "tau", "merged", "cubex", or "none".
+            profile (str): Format for profile files, one of "tau", "merged", "cubex", "auto", or "none".
+                           See :any:`resolve_profile_format` for "auto".
             trace (str): Format for trace files, one of "slog2", "otf2", or "none".
             sample (bool): Enable or disable event-based sampling.
             metrics (list): Metrics to measure, e.g. ['TIME', 'PAPI_FP_INS']
@@ -258,7 +281,7 @@ class TauInstallation(Installation):
         assert keep_inst_files in (True, False)
         assert reuse_inst_files in (True, False)
         assert isinstance(select_file, basestring) or select_file is None
-        assert profile in ("tau", "merged", "cubex", "none")
+        assert profile in ("tau", "merged", "cubex", "auto", "none")
         assert trace in ("slog2", "otf2", "none")
         assert profile != "none" or trace != "none"
         assert sample in (True, False)
@@ -330,6 +353,7 @@ class TauInstallation(Installation):
         self.throttle_per_call = throttle_per_call
         self.throttle_num_calls = throttle_num_calls
         self.forced_makefile = forced_makefile
+        self.ranks = None
         if forced_makefile is None:
             for pkg in 'binutils', 'libunwind', 'papi', 'pdt', 'ompt':
                 uses_pkg = getattr(self, '_uses_'+pkg)
@@ -929,6 +953,27 @@ class TauInstallation(Installation):
         return list(set(opts)), env
 
 
+    def resolve_profile_format(self, ranks=None):
+        """Choose the profile format for a run.
+        
+        If the profile format is "auto" then runs with at least ``trial.auto_merged_ranks`` processes 
+        (default: 1024) write a single merged profile instead of one file per process and thread.  
+        Merging requires MPI or SHMEM so other runs write TAU profiles.
+        
+        Args:
+            ranks (int): Number of processes launched, or None to use :any:`ranks` or if unknown.
+            
+        Returns:
+            str: The profile format, one of "tau", "merged", "cubex", or "none".
+        """
+        if self.profile != 'auto':
+            return self.profile
+        if ranks is None:
+            ranks = self.ranks
+        if ranks and (self.mpi_support or self.shmem_support) and ranks >= auto_profile_threshold('merged'):
+            return 'merged'
+        return 'tau'
+
     def runtime_config(self, opts=None, env=None):
         """Configures environment for execution with TAU.
 
@@ -945,12 +990,13 @@ class TauInstallation(Installation):
         opts, env = super(TauInstallation, self).runtime_config(opts, env)
         env = self._sanitize_environment(env)
         env['TAU_VERBOSE'] = str(int(self.verbose))
-        if self.profile == 'tau':
+        profile = self.resolve_profile_format()
+        if profile == 'tau':
             env['TAU_PROFILE'] = '1'
-        elif self.profile == 'merged':
+        elif profile == 'merged':
             env['TAU_PROFILE'] = '1'
             env['TAU_PROFILE_FORMAT'] = 'merged'
-        elif self.profile == 'cubex':
+        elif profile == 'cubex':
             env['SCOREP_ENABLE_PROFILING'] = '1'
         else:
             env['TAU_PROFILE'] = '0'
@@ -1250,13 +1296,14 @@ class TauInstallation(Installation):
                                          "Check Java installation, X11 installation,"
                                          " network connectivity, and file permissions")
 
-    def create_ppk_file(self, dest, src, remove_existing=True):
+    def create_ppk_file(self, dest, src, remove_existing=True, show_progress=True):
         """Write a PPK file at ``dest`` from the data at ``src``.
         
         Args:
             dest (str): Path to the PPK file to create.
             src (str): Directory containing TAU profiles to convert to PPK format.
             remove_existing (bool): If True, delete ``dest`` before writing it.
+            show_progress (bool): If True, show a progress spinner while the file is written.
         """
         self.install()
         _, env = self.runtime_config()
@@ -1265,36 +1312,28 @@ class TauInstallation(Installation):
             os.remove(dest)
         cmd = ['paraprof', '--pack', dest]
         LOGGER.info("Writing '%s'...", dest)
-        if util.create_subprocess(cmd, cwd=src, env=env, stdout=False, show_progress=True):
+        if util.create_subprocess(cmd, cwd=src, env=env, stdout=False, show_progress=show_progress):
             raise ConfigurationError("'%s' failed in '%s'" % (' '.join(cmd), src),
                                      "Make sure Java is installed and working",
                                      "Install the most recent Java from http://java.com")
 
     def merge_tau_trace_files(self, prefix):
-        """Use tau_treemerge.pl to merge multiple TAU trace files into a single edf and a single trc file.
+        """Merge multiple TAU trace files into a single edf and a single trc file.
         
-        The new edf file and trc file are written to ``prefix``.
+        The new edf file and trc file are written to ``prefix``.  The files are merged natively
+        by :any:`tau_trace.merge_trace_files` so TAU need not be installed.
         
         Args: 
             prefix (str): Path to the directory containing *.trc and *.edf files.
         """
-        self.install()
-        trc_files = glob.glob(os.path.join(prefix, '*.trc'))
-        edf_files = glob.glob(os.path.join(prefix, '*.edf'))
-        if not trc_files:
-            raise ConfigurationError("No *.trc files at '%s'" % prefix)
-        if not edf_files:
-            raise ConfigurationError("No *.edf files at '%s'" % prefix)
         merged_trc = os.path.join(prefix, 'tau.trc')
         merged_edf = os.path.join(prefix, 'tau.edf')
         if os.path.isfile(merged_trc):
-            raise ConfigurationError("Remove '%s' before merging *.trc files")
+            raise ConfigurationError("Remove '%s' before merging *.trc files" % merged_trc)
         if os.path.isfile(merged_edf):
-            raise ConfigurationError("Remove '%s' before merging *.edf files")
-        cmd = [os.path.join(self.bin_path, 'tau_treemerge.pl')]
-        LOGGER.info("Merging %d TAU trace files...", len(trc_files) + len(edf_files))
-        if util.create_subprocess(cmd, cwd=prefix, stdout=False, log=True, show_progress=True):
-            raise InternalError("Nonzero return code from tau_treemerge.pl")
+            raise ConfigurationError("Remove '%s' before merging *.edf files" % merged_edf)
+        with progress_spinner():
+            tau_trace.merge_trace_files(prefix, merged_trc, merged_edf)
 
     def tau_trace_to_slog2(self, trc, edf, slog2):
         """Convert a TAU trace file to SLOG2 format.
@@ -31,8 +31,31 @@ Functions used for unit tests of tau_installation.py.
 """
 
 
+from taucmdr import configuration
 from taucmdr.tests import TestCase, not_implemented
+from taucmdr.cf.storage.levels import USER_STORAGE
+from taucmdr.cf.software.tau_installation import TauInstallation, AUTO_PROFILE_RANKS
 
 @not_implemented
 class TauInstallationTest(TestCase):
     pass
+
+
+class ResolveProfileFormatTest(TestCase):
+    """Tests for :any:`TauInstallation.resolve_profile_format`."""
+
+    def test_auto(self):
+        tau = TauInstallation.minimal()
+        self.assertEqual(tau.resolve_profile_format(100000), 'tau')
+        tau.profile = 'auto'
+        self.assertEqual(tau.resolve_profile_format(100000), 'tau')
+        tau.mpi_support = True
+        self.assertEqual(tau.resolve_profile_format(), 'tau')
+        self.assertEqual(tau.resolve_profile_format(AUTO_PROFILE_RANKS['merged'] - 1), 'tau')
+        tau.ranks = AUTO_PROFILE_RANKS['merged']
+        self.assertEqual(tau.resolve_profile_format(), 'merged')
+        try:
+            configuration.put('trial.auto_merged_ranks', 8, storage=USER_STORAGE)
+            self.assertEqual(tau.resolve_profile_format(8), 'merged')
+        finally:
+            configuration.delete('trial.auto_merged_ranks', storage=USER_STORAGE)
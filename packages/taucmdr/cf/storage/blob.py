@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2016, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""Content-addressed blob storage.
+
+Blobs are stored once under a filesystem prefix and identified by the SHA-256 digest of their 
+contents, so records that would otherwise duplicate large values can share a single copy and keep 
+only the digest.  Blobs are zlib compressed on disk and are never modified after they are written.
+"""
+
+import os
+import json
+import zlib
+import errno
+import hashlib
+import tempfile
+from taucmdr import logger, util
+from taucmdr.cf.storage import StorageError
+
+
+LOGGER = logger.get_logger(__name__)
+
+
+class BlobStore(object):
+    """A content-addressed store of immutable blobs.
+    
+    Attributes:
+        prefix (str): Filesystem prefix of the blob store.
+    """
+
+    def __init__(self, prefix):
+        self.prefix = prefix
+
+    def _path(self, digest):
+        return os.path.join(self.prefix, digest[:2], digest[2:])
+
+    def __contains__(self, digest):
+        return os.path.isfile(self._path(digest))
+
+    def put(self, data):
+        """Add a blob to the store.
+        
+        Adding a blob that is already in the store does not modify the store.
+        
+        Args:
+            data (str): Blob contents.
+        
+        Returns:
+            str: Hex digest identifying the blob.
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._path(digest)
+        if os.path.isfile(path):
+            LOGGER.debug("Blob %s already stored", digest)
+            return digest
+        dir_path = os.path.dirname(path)
+        util.mkdirp(dir_path)
+        fd, tmp_path = tempfile.mkstemp(dir=dir_path)
+        try:
+            with os.fdopen(fd, 'wb') as fout:
+                fout.write(zlib.compress(data))
+            # rename is atomic so concurrent writers of the same blob can't leave a partial file
+            os.rename(tmp_path, path)
+        except (IOError, OSError) as err:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise StorageError("Failed to write blob '%s': %s" % (path, err))
+        LOGGER.debug("Stored blob %s", digest)
+        return digest
+
+    def get(self, digest):
+        """Retrieve a blob from the store.
+        
+        Args:
+            digest (str): Hex digest identifying the blob.
+            
+        Returns:
+            str: Blob contents.
+            
+        Raises:
+            KeyError: No blob has the given digest.
+            StorageError: The blob is corrupt.
+        """
+        path = self._path(digest)
+        try:
+            with open(path, 'rb') as fin:
+                data = zlib.decompress(fin.read())
+        except IOError as err:
+            if err.errno == errno.ENOENT:
+                raise KeyError(digest)
+            raise StorageError("Failed to read blob '%s': %s" % (path, err))
+        except zlib.error as err:
+            raise StorageError("Blob '%s' is corrupt: %s" % (path, err))
+        if hashlib.sha256(data).hexdigest() != digest:
+            raise StorageError("Blob '%s' is corrupt: digest mismatch" % path)
+        return data
+
+    def put_json(self, obj):
+        """Add a JSON-serializable object to the store.
+        
+        The object is serialized with sorted keys so equal objects always have the same digest.
+        
+        Args:
+            obj: JSON-serializable object.
+            
+        Returns:
+            str: Hex digest identifying the blob.
+        """
+        return self.put(json.dumps(obj, sort_keys=True, separators=(',', ':')))
+
+    def get_json(self, digest):
+        """Retrieve an object stored by :any:`put_json`.
+        
+        Args:
+            digest (str): Hex digest identifying the blob.
+            
+        Returns:
+            The deserialized object.
+        """
+        return json.loads(self.get(digest))
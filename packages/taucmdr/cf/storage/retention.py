@@ -0,0 +1,265 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2016, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""Project data retention policies.
+
+Retention policies are configuration items (see ``tau configure``) that limit how much trial data
+a project keeps:
+
+* ``retention.keep_trials``: Keep only the newest N trials of each experiment.
+* ``retention.compact_after_days``: Compact trials that ended more than X days ago.
+* ``retention.drop_traces_after_days``: Delete trace data, but keep profiles, from trials that ended more 
+  than X days ago.
+* ``retention.max_project_size``: Delete the oldest trials until the project's data fits in this size, 
+  e.g. "50GiB".  The newest trial of each experiment is never deleted by this policy.
+* ``retention.gc_threshold``: Enforce the policies automatically after a trial if the project's data 
+  is larger than this size.
+
+Trials are ordered by when they began, not by trial number, since trial numbers can be reused after 
+a trial is deleted.  Trials in an experiment's performance baseline (see ``tau trial baseline``) are 
+never deleted by any policy.
+
+Policies are enforced by ``tau project gc``.  Plans are made from the sizes and times recorded in the
+trial records so the project's data directories are never walked.  Each trial is updated in its own
+transaction so enforcement can be interrupted and resumed.
+"""
+
+from taucmdr import logger, util, configuration
+from taucmdr.error import ConfigurationError, Error
+from taucmdr.cf.storage.trash import start_background_purge
+
+
+LOGGER = logger.get_logger(__name__)
+
+SECONDS_PER_DAY = 86400
+
+RETENTION_KEYS = {'keep_trials': 'retention.keep_trials',
+                  'compact_after_days': 'retention.compact_after_days',
+                  'drop_traces_after_days': 'retention.drop_traces_after_days',
+                  'max_project_size': 'retention.max_project_size',
+                  'gc_threshold': 'retention.gc_threshold'}
+"""Configuration keys of the retention policy settings, mapped by :any:`RetentionPolicy` attribute."""
+
+
+def _trial_order(trial):
+    # Trial numbers are reused after deletion so order by time, using the number only to break ties
+    return (trial.get('begin_time') or trial.get('end_time') or '', trial['number'])
+
+
+def project_data_size(project):
+    """Returns the size in bytes of all trial data in a project as recorded in the trial records."""
+    return sum(trial.stored_size() for expr in project.populate('experiments') for trial in expr.populate('trials'))
+
+
+class RetentionPolicy(object):
+    """Limits on the trial data kept by a project.
+    
+    Attributes:
+        keep_trials (int): Number of trials to keep per experiment, or None for no limit.
+        compact_after_days (float): Age in days after which trials are compacted, or None.
+        drop_traces_after_days (float): Age in days after which trace data is deleted, or None.
+        max_project_size (int): Maximum size in bytes of a project's trial data, or None for no limit.
+        gc_threshold (int): Project data size in bytes that triggers automatic enforcement, or None.
+    """
+    # pylint: disable=too-many-arguments
+    def __init__(self, keep_trials=None, compact_after_days=None, drop_traces_after_days=None, 
+                 max_project_size=None, gc_threshold=None):
+        self.keep_trials = keep_trials
+        self.compact_after_days = compact_after_days
+        self.drop_traces_after_days = drop_traces_after_days
+        self.max_project_size = max_project_size
+        self.gc_threshold = gc_threshold
+
+    def __nonzero__(self):
+        return any(getattr(self, attr) is not None for attr in RETENTION_KEYS if attr != 'gc_threshold')
+
+    @classmethod
+    def configured(cls):
+        """Creates a retention policy from the configuration.
+        
+        Returns:
+            RetentionPolicy: The configured policy.
+            
+        Raises:
+            ConfigurationError: A retention policy setting is invalid.
+        """
+        settings = {}
+        for attr, key in RETENTION_KEYS.iteritems():
+            try:
+                value = configuration.get(key)
+            except KeyError:
+                continue
+            if value is None:
+                continue
+            try:
+                if attr == 'keep_trials':
+                    value = int(value)
+                    valid = value > 0
+                elif attr.endswith('_days'):
+                    value = float(value)
+                    valid = value >= 0
+                else:
+                    value = util.parse_size(value)
+                    valid = value >= 0
+            except ValueError:
+                valid = False
+            if not valid:
+                raise ConfigurationError("Invalid value for '%s': %r" % (key, configuration.get(key)),
+                                         "Use `tau configure %s <value>` to fix the setting." % key)
+            settings[attr] = value
+        return cls(**settings)
+
+    def _plan_trials(self, project, now):
+        actions = []
+        for expr in project.populate('experiments'):
+            trials = sorted(expr.populate('trials'), key=_trial_order)
+            if self.keep_trials is not None and len(trials) > self.keep_trials:
+                baseline = set(expr.get('baseline_trials') or [])
+                expired = set(trial.eid for trial in trials[:-self.keep_trials] if trial['number'] not in baseline)
+                for trial in trials:
+                    if trial.eid in expired:
+                        actions.append(('delete', trial, "keeping only the newest %d trials" % self.keep_trials))
+                trials = [trial for trial in trials if trial.eid not in expired]
+            for trial in trials:
+                age = trial.age(now)
+                if age is None:
+                    continue
+                if (self.drop_traces_after_days is not None and 
+                        age > self.drop_traces_after_days * SECONDS_PER_DAY and trial.has_traces()):
+                    actions.append(('drop_traces', trial, 
+                                    "trace data older than %g days" % self.drop_traces_after_days))
+                if (self.compact_after_days is not None and age > self.compact_after_days * SECONDS_PER_DAY and 
+                        not trial.is_compact() and trial.get('data_size')):
+                    actions.append(('compact', trial, "trial older than %g days" % self.compact_after_days))
+        return actions
+
+    def _plan_size(self, project, deleted):
+        if self.max_project_size is None:
+            return []
+        candidates = []
+        total_size = 0
+        for expr in project.populate('experiments'):
+            trials = [trial for trial in expr.populate('trials') if trial.eid not in deleted]
+            total_size += sum(trial.stored_size() for trial in trials)
+            # Never delete an experiment's newest trial, a baseline trial, or a trial that may still be running
+            newest = max(trials, key=_trial_order) if trials else None
+            baseline = set(expr.get('baseline_trials') or [])
+            candidates.extend(trial for trial in trials 
+                              if trial is not newest and trial['number'] not in baseline and trial.get('end_time'))
+        actions = []
+        reason = "project data larger than %s" % util.human_size(self.max_project_size)
+        for trial in sorted(candidates, key=lambda trial: trial['end_time']):
+            if total_size <= self.max_project_size:
+                break
+            actions.append(('delete', trial, reason))
+            total_size -= trial.stored_size()
+        return actions
+
+    def plan(self, project, now=None):
+        """List the actions needed to enforce the policy on a project.
+        
+        Args:
+            project (Project): The project.
+            now (datetime): Current UTC time, or None to use the current time.
+            
+        Returns:
+            list: (action, trial, reason) tuples where `action` is one of "delete", "drop_traces", or "compact".
+        """
+        actions = self._plan_trials(project, now)
+        deleted = set(trial.eid for action, trial, _ in actions if action == 'delete')
+        return actions + self._plan_size(project, deleted)
+
+    def enforce(self, project, dry_run=False, now=None):
+        """Enforce the policy on a project.
+        
+        Age and count limits are enforced first so that the size limit is checked against the 
+        trial data sizes recorded after trace data has been dropped and trials have been compacted.
+        A trial that can't be updated is skipped with a warning.
+        
+        Args:
+            project (Project): The project.
+            dry_run (bool): If True, only list the actions that would be taken.
+            now (datetime): Current UTC time, or None to use the current time.
+            
+        Returns:
+            list: (action, trial, reason) tuples for the actions taken.
+        """
+        if dry_run:
+            return self.plan(project, now)
+        taken = self._apply(self._plan_trials(project, now))
+        # Reload the project so the size limit sees the updated trial records
+        project = project.controller(project.storage).one(project.eid)
+        taken.extend(self._apply(self._plan_size(project, set())))
+        if any(action == 'delete' for action, _, _ in taken):
+            start_background_purge(project.storage)
+        return taken
+
+    def _apply(self, actions):
+        taken = []
+        deleted = set()
+        for action, trial, reason in actions:
+            if trial.eid in deleted:
+                continue
+            LOGGER.info("Trial %s of experiment '%s': %s (%s)", trial['number'], 
+                        trial.populate('experiment')['name'], action.replace('_', ' '), reason)
+            try:
+                if action == 'delete':
+                    trial.controller(trial.storage).delete(trial.eid)
+                    deleted.add(trial.eid)
+                else:
+                    # Reload the trial record since an earlier action may have changed it
+                    trial = trial.controller(trial.storage).one(trial.eid)
+                    getattr(trial, action)()
+            except Error as err:
+                LOGGER.warning("Could not %s trial %s: %s", action.replace('_', ' '), trial['number'], err)
+                continue
+            taken.append((action, trial, reason))
+        return taken
+
+
+def enforce_if_needed(project):
+    """Enforce the configured retention policy if the project's data is larger than ``retention.gc_threshold``.
+    
+    Args:
+        project (Project): The project.
+        
+    Returns:
+        list: (action, trial, reason) tuples for the actions taken.
+    """
+    try:
+        policy = RetentionPolicy.configured()
+    except ConfigurationError as err:
+        LOGGER.warning("Retention policies not enforced: %s", err.value)
+        return []
+    if policy.gc_threshold is None or not policy:
+        return []
+    data_size = project_data_size(project)
+    if data_size <= policy.gc_threshold:
+        return []
+    LOGGER.info("Project data size %s exceeds %s, enforcing retention policies...", 
+                util.human_size(data_size), util.human_size(policy.gc_threshold))
+    return policy.enforce(project)
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2016, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""Test functions.
+
+Functions used for unit tests of blob.py.
+"""
+
+import os
+from taucmdr import tests
+from taucmdr.cf.storage import StorageError
+from taucmdr.cf.storage.blob import BlobStore
+
+
+class BlobStoreTest(tests.TestCase):
+    """Tests for :any:`BlobStore`."""
+
+    def test_put_get(self):
+        blobs = BlobStore(os.path.join(tests.get_test_workdir(), 'blobs'))
+        digest = blobs.put('hello world')
+        self.assertIn(digest, blobs)
+        self.assertEqual(blobs.put('hello world'), digest)
+        self.assertEqual(blobs.get(digest), 'hello world')
+        self.assertNotEqual(blobs.put('goodbye world'), digest)
+        self.assertRaises(KeyError, blobs.get, '0' * 64)
+
+    def test_json(self):
+        blobs = BlobStore(os.path.join(tests.get_test_workdir(), 'blobs'))
+        digest = blobs.put_json({'A': '1', 'B': '2'})
+        self.assertEqual(blobs.put_json({'B': '2', 'A': '1'}), digest)
+        self.assertDictEqual(blobs.get_json(digest), {'A': '1', 'B': '2'})
+
+    def test_corrupt(self):
+        blobs = BlobStore(os.path.join(tests.get_test_workdir(), 'blobs'))
+        digest = blobs.put('corrupt me')
+        with open(os.path.join(blobs.prefix, digest[:2], digest[2:]), 'wb') as fout:
+            fout.write('garbage')
+        self.assertRaises(StorageError, blobs.get, digest)
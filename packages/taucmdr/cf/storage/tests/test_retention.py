@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2016, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""Test functions.
+
+Functions used for unit tests of retention.py.
+"""
+
+from datetime import datetime, timedelta
+from taucmdr import tests, configuration
+from taucmdr.error import ConfigurationError
+from taucmdr.cf.storage.levels import USER_STORAGE
+from taucmdr.cf.storage.retention import RetentionPolicy, RETENTION_KEYS
+
+NOW = datetime(2017, 6, 1)
+
+
+class _Record(dict):
+    def __init__(self, eid, records, **kwargs):
+        super(_Record, self).__init__(**kwargs)
+        self.eid = eid
+        self._records = records
+
+    def populate(self, attr):
+        return self._records
+
+
+class _Trial(_Record):
+    # pylint: disable=missing-docstring
+    def __init__(self, eid, number, days_old, size, traces=False, compact=False):
+        end_time = NOW - timedelta(days=days_old)
+        begin_time = end_time - timedelta(hours=1)
+        super(_Trial, self).__init__(eid, None, number=number, begin_time=str(begin_time), 
+                                     end_time=str(end_time), data_size=size)
+        self.traces = traces
+        self.compact = compact
+
+    def age(self, now):
+        return (now - datetime.strptime(self['end_time'], '%Y-%m-%d %H:%M:%S')).total_seconds()
+
+    def has_traces(self):
+        return self.traces
+
+    def is_compact(self):
+        return self.compact
+
+    def stored_size(self):
+        return self['data_size']
+
+
+def _project(*experiments, **kwargs):
+    baseline_trials = kwargs.get('baseline_trials', [])
+    return _Record(0, [_Record(i, trials, baseline_trials=baseline_trials) for i, trials in enumerate(experiments)])
+
+
+class RetentionPolicyTest(tests.TestCase):
+    """Tests for :any:`retention.RetentionPolicy`."""
+
+    def _actions(self, policy, project):
+        return [(action, trial['number']) for action, trial, _ in policy.plan(project, NOW)]
+
+    def test_empty(self):
+        policy = RetentionPolicy()
+        self.assertFalse(policy)
+        self.assertListEqual(policy.plan(_project([_Trial(1, 0, 100, 10)]), NOW), [])
+
+    def test_keep_trials(self):
+        trials = [_Trial(i, i, 10 - i, 100) for i in xrange(5)]
+        actions = self._actions(RetentionPolicy(keep_trials=2), _project(trials))
+        self.assertListEqual(actions, [('delete', 0), ('delete', 1), ('delete', 2)])
+
+    def test_reused_numbers(self):
+        # Trial 0 was deleted and its number reused by the newest trial
+        trials = [_Trial(1, 1, 5, 400), _Trial(2, 2, 3, 400), _Trial(3, 0, 0, 400)]
+        actions = self._actions(RetentionPolicy(keep_trials=2), _project(trials))
+        self.assertListEqual(actions, [('delete', 1)])
+        actions = self._actions(RetentionPolicy(max_project_size=0), _project(trials))
+        self.assertListEqual(actions, [('delete', 1), ('delete', 2)])
+
+    def test_age(self):
+        trials = [_Trial(1, 0, 30, 100, traces=True), 
+                  _Trial(2, 1, 10, 100, traces=True, compact=True), 
+                  _Trial(3, 2, 1, 100, traces=True)]
+        actions = self._actions(RetentionPolicy(compact_after_days=7, drop_traces_after_days=20), _project(trials))
+        self.assertListEqual(actions, [('drop_traces', 0), ('compact', 0)])
+
+    def test_max_project_size(self):
+        first = [_Trial(1, 0, 30, 400), _Trial(2, 1, 5, 400)]
+        second = [_Trial(3, 0, 20, 400), _Trial(4, 1, 10, 400), _Trial(5, 2, 1, 400)]
+        actions = self._actions(RetentionPolicy(max_project_size=1000), _project(first, second))
+        self.assertListEqual(actions, [('delete', 0), ('delete', 0), ('delete', 1)])
+        # The newest trial of each experiment is never deleted
+        actions = self._actions(RetentionPolicy(max_project_size=0), _project(first, second))
+        self.assertEqual(len(actions), 3)
+
+    def test_baseline_trials(self):
+        trials = [_Trial(i, i, 10 - i, 400, traces=True) for i in xrange(5)]
+        actions = self._actions(RetentionPolicy(keep_trials=2, drop_traces_after_days=7), 
+                                _project(trials, baseline_trials=[1]))
+        self.assertListEqual(actions, [('delete', 0), ('delete', 2), ('drop_traces', 1)])
+        actions = self._actions(RetentionPolicy(max_project_size=0), _project(trials, baseline_trials=[0, 2]))
+        self.assertListEqual(actions, [('delete', 1), ('delete', 3)])
+
+    def test_configured(self):
+        try:
+            configuration.put(RETENTION_KEYS['keep_trials'], '3', storage=USER_STORAGE)
+            configuration.put(RETENTION_KEYS['max_project_size'], '2GiB', storage=USER_STORAGE)
+            policy = RetentionPolicy.configured()
+            self.assertEqual(policy.keep_trials, 3)
+            self.assertEqual(policy.max_project_size, 2 * 1024**3)
+            self.assertIsNone(policy.compact_after_days)
+            configuration.put(RETENTION_KEYS['keep_trials'], '0', storage=USER_STORAGE)
+            self.assertRaises(ConfigurationError, RetentionPolicy.configured)
+        finally:
+            for key in RETENTION_KEYS.itervalues():
+                try:
+                    configuration.delete(key, storage=USER_STORAGE)
+                except KeyError:
+                    pass
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2016, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""Test functions.
+
+Functions used for unit tests of trash.py.
+"""
+
+import os
+from taucmdr import tests, util
+from taucmdr.cf.storage import trash
+
+
+class _Storage(object):
+    # pylint: disable=too-few-public-methods
+    name = 'test'
+
+    def __init__(self, prefix):
+        self.prefix = prefix
+
+
+class TrashTest(tests.TestCase):
+    """Tests for :any:`trash`."""
+
+    def _make_tree(self, path):
+        util.mkdirp(os.path.join(path, 'sub'))
+        for i in xrange(10):
+            with open(os.path.join(path, 'sub' if i % 2 else '', 'file%d' % i), 'w') as fout:
+                fout.write('x' * i)
+        os.symlink(os.path.join(path, 'sub'), os.path.join(path, 'link'))
+
+    def test_move_and_purge(self):
+        storage = _Storage(os.path.join(tests.get_test_workdir(), 'storage'))
+        data = os.path.join(storage.prefix, 'data')
+        self._make_tree(data)
+        self.assertTrue(trash.move_to_trash(data, storage))
+        self.assertFalse(os.path.exists(data))
+        self.assertEqual(len(os.listdir(trash.trash_prefix(storage))), 1)
+        self.assertFalse(trash.move_to_trash(data, storage))
+        self.assertEqual(trash.purge_trash(storage, nthreads=4, show_progress=False), 11)
+        self.assertListEqual(os.listdir(trash.trash_prefix(storage)), [])
+        self.assertEqual(trash.purge_trash(storage, show_progress=False), 0)
+
+    def test_resume(self):
+        storage = _Storage(os.path.join(tests.get_test_workdir(), 'resume'))
+        data = os.path.join(storage.prefix, 'data')
+        self._make_tree(data)
+        trash.move_to_trash(data, storage)
+        # Simulate a purge that was interrupted after removing some files
+        trashed = os.path.join(trash.trash_prefix(storage), os.listdir(trash.trash_prefix(storage))[0], 'data')
+        os.remove(os.path.join(trashed, 'file0'))
+        os.remove(os.path.join(trashed, 'sub', 'file1'))
+        trash.purge_trash(storage, show_progress=False)
+        self.assertListEqual(os.listdir(trash.trash_prefix(storage)), [])
+
+    def test_concurrent_move(self):
+        storage = _Storage(os.path.join(tests.get_test_workdir(), 'concurrent'))
+        data = os.path.join(storage.prefix, 'data')
+        self._make_tree(data)
+        trash.move_to_trash(data, storage)
+        # Simulate data moved into a directory after the purge listed the trash but before it was removed
+        trashed = os.path.join(trash.trash_prefix(storage), os.listdir(trash.trash_prefix(storage))[0])
+        trash._remove_dir(trashed)  # pylint: disable=protected-access
+        self.assertTrue(os.path.isdir(trashed))
+        trash.purge_trash(storage, show_progress=False)
+        self.assertListEqual(os.listdir(trash.trash_prefix(storage)), [])
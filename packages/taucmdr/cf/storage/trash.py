@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2016, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""Deferred deletion of storage container data.
+
+Removing a large directory tree from a parallel filesystem can take a long time.  Instead of removing
+data while a storage transaction is open, :any:`move_to_trash` atomically renames the data into the
+``.trash`` directory in the storage container's filesystem prefix.  :any:`purge_trash` removes the 
+contents of the trash directory later, either in a detached background process started by 
+:any:`start_background_purge` or on demand via ``tau gc``.
+
+Purging is safe to interrupt and to run concurrently: files that have already been removed are 
+skipped so a new purge resumes wherever a previous purge stopped, and directories that receive new
+data while they are purged are left for the next purge.
+"""
+
+import os
+import sys
+import errno
+import tempfile
+import multiprocessing
+from multiprocessing.pool import ThreadPool
+from taucmdr import logger, util
+from taucmdr.progress import ProgressIndicator
+
+
+LOGGER = logger.get_logger(__name__)
+
+TRASH_DIR = '.trash'
+"""Name of the trash directory in a storage container's filesystem prefix."""
+
+
+def trash_prefix(storage):
+    """Returns the path to a storage container's trash directory."""
+    return os.path.join(storage.prefix, TRASH_DIR)
+
+
+def move_to_trash(path, storage):
+    """Atomically move a file or directory into a storage container's trash directory.
+    
+    If `path` cannot be renamed into the trash, e.g. because it is on a different filesystem, 
+    then it is removed immediately.
+    
+    Args:
+        path (str): Path to the file or directory to delete.
+        storage (AbstractStorage): Storage container whose trash directory will hold the data.
+        
+    Returns:
+        bool: True if `path` was moved to the trash, False if it was removed immediately or did not exist.
+    """
+    if not os.path.lexists(path):
+        return False
+    prefix = trash_prefix(storage)
+    try:
+        util.mkdirp(prefix)
+        dest = tempfile.mkdtemp(prefix=os.path.basename(path) + '.', dir=prefix)
+        os.rename(path, os.path.join(dest, os.path.basename(path)))
+    except OSError as err:
+        LOGGER.debug("Cannot move '%s' to trash: %s", path, err)
+        if os.path.isdir(path) and not os.path.islink(path):
+            util.rmtree(path)
+        else:
+            os.remove(path)
+        return False
+    LOGGER.debug("Moved '%s' to '%s'", path, dest)
+    return True
+
+
+def _ignore_missing(func, path):
+    try:
+        func(path)
+    except OSError as err:
+        if err.errno != errno.ENOENT:
+            raise
+
+
+def _remove_dir(path):
+    # Another process may move data into the trash while it is purged, e.g. a concurrent 
+    # `tau trial delete`, so leave directories that aren't empty for the next purge
+    try:
+        os.rmdir(path)
+    except OSError as err:
+        if err.errno not in (errno.ENOENT, errno.ENOTEMPTY, errno.EEXIST):
+            raise
+        if err.errno != errno.ENOENT:
+            LOGGER.debug("Leaving '%s' for the next purge: %s", path, err)
+
+
+def purge_trash(storage, nthreads=None, show_progress=True):
+    """Remove everything in a storage container's trash directory.
+    
+    Files are unlinked by a pool of threads since file removal on parallel filesystems is
+    dominated by metadata server latency.
+    
+    Args:
+        storage (AbstractStorage): Storage container to purge.
+        nthreads (int): Number of unlink threads.  Default is twice the number of CPU cores.
+        show_progress (bool): If True, show a progress bar.
+        
+    Returns:
+        int: Number of files removed.
+    """
+    prefix = trash_prefix(storage)
+    if not os.path.isdir(prefix):
+        return 0
+    files, dirs = [], []
+    for dir_path, dir_names, file_names in os.walk(prefix):
+        dirs.append(dir_path)
+        files.extend(os.path.join(dir_path, name) for name in file_names)
+        # os.walk doesn't descend into symbolic links to directories but lists them as directories
+        files.extend(os.path.join(dir_path, name) for name in dir_names 
+                     if os.path.islink(os.path.join(dir_path, name)))
+    if show_progress:
+        LOGGER.info("Purging %d files from '%s'...", len(files), prefix)
+    pool = ThreadPool(nthreads or 2*multiprocessing.cpu_count())
+    try:
+        removed = pool.imap_unordered(lambda path: _ignore_missing(os.remove, path), files, chunksize=64)
+        with ProgressIndicator(len(files), mode=None if show_progress else 'disabled') as progress_bar:
+            for count, _ in enumerate(removed, 1):
+                if count % 64 == 0 or count == len(files):
+                    progress_bar.update(count)
+    finally:
+        pool.terminate()
+        pool.join()
+    for path in reversed(dirs):
+        if path != prefix:
+            _remove_dir(path)
+    return len(files)
+
+
+def start_background_purge(storage):
+    """Purge a storage container's trash directory in a detached background process.
+    
+    The background process outlives the current process and does not write to the terminal.
+    Does nothing if the ``trash.background_purge`` configuration key is False.
+    
+    Args:
+        storage (AbstractStorage): Storage container to purge.
+    """
+    from taucmdr import configuration
+    prefix = trash_prefix(storage)
+    if not os.path.isdir(prefix):
+        return
+    try:
+        if not configuration.get('trash.background_purge'):
+            return
+    except KeyError:
+        pass
+    try:
+        pid = os.fork()
+    except (OSError, AttributeError) as err:
+        LOGGER.debug("Cannot start background purge of '%s': %s", prefix, err)
+        return
+    if pid:
+        # Reap the intermediate child; the grandchild is adopted by init
+        os.waitpid(pid, 0)
+        return
+    try:
+        os.setsid()
+        if os.fork():
+            os._exit(0)    # pylint: disable=protected-access
+        devnull = os.open(os.devnull, os.O_RDWR)
+        for fd in 0, 1, 2:
+            os.dup2(devnull, fd)
+        purge_trash(storage, show_progress=False)
+    except:     # pylint: disable=bare-except
+        pass
+    finally:
+        sys.stdout.flush()
+        os._exit(0)    # pylint: disable=protected-access
@@ -0,0 +1,342 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2016, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""TAU profile files and ParaProf packed profiles.
+
+TAU writes one profile file (``profile.<node>.<context>.<thread>``) per thread.  If more than one
+metric is measured then the profiles for each metric are in a ``MULTI__<metric>`` directory.  
+:any:`write_ppk` packs a directory of profile files into ParaProf's packed profile (PPK) format 
+without starting ParaProf.
+
+A PPK file is a gzip-compressed stream of big-endian values as written by Java's ``DataOutputStream``:
+
+1. The characters 'PPK', the format version (2) and the lowest compatible version (2).
+2. The size of the metadata header followed by the header: trial metadata name/value pairs then
+   each thread's (node, context, thread) and metadata name/value pairs.
+3. Metric names, group names, function names with their group indices, and user event names.
+4. For each thread: its (node, context, thread), its function profiles as (function index, calls, 
+   subroutines, then exclusive and inclusive values for each metric), and its user event profiles as 
+   (event index, sample count, max, min, mean, sum of squares).
+"""
+
+import os
+import re
+import glob
+import struct
+from cStringIO import StringIO
+from xml.etree import ElementTree
+from taucmdr import logger, util
+from taucmdr.error import ConfigurationError
+
+
+LOGGER = logger.get_logger(__name__)
+
+PPK_VERSION = 2
+"""Version of the PPK format written by :any:`write_ppk`."""
+
+_PROFILE_NAME = re.compile(r'profile\.(\d+)\.(\d+)\.(\d+)$')
+
+_FUNCTION_LINE = re.compile(r'^"(.*)"\s+(\S+)\s+(\S+)\s+(\S+)\s+(\S+)\s+(\S+)\s+GROUP="(.*)"\s*$')
+
+_USER_EVENT_LINE = re.compile(r'^"(.*)"\s+(\S+)\s+(\S+)\s+(\S+)\s+(\S+)\s+(\S+)\s*$')
+
+
+class ProfileParseError(ConfigurationError):
+    """Indicates that a TAU profile file is invalid."""
+
+    def __init__(self, path, lineno, line):
+        super(ProfileParseError, self).__init__("Invalid TAU profile at %s:%d: %r" % (path, lineno, line))
+
+
+def find_profiles(prefix):
+    """Find TAU profile files.
+    
+    Args:
+        prefix (str): Directory containing ``profile.*.*.*`` files or ``MULTI__*`` directories.
+        
+    Returns:
+        tuple: (metrics, threads) where `metrics` is a list of (metric name, directory) tuples and 
+               `threads` is a sorted list of (node, context, thread) tuples.
+               
+    Raises:
+        ConfigurationError: No profiles were found.
+    """
+    metric_dirs = sorted(glob.glob(os.path.join(prefix, 'MULTI__*')))
+    if metric_dirs:
+        metrics = [(os.path.basename(path)[len('MULTI__'):], path) for path in metric_dirs]
+    else:
+        metrics = [('TIME', prefix)]
+    threads = set()
+    for _, path in metrics:
+        for name in os.listdir(path):
+            match = _PROFILE_NAME.match(name)
+            if match:
+                threads.add(tuple(int(x) for x in match.groups()))
+    if not threads:
+        raise ConfigurationError("No TAU profiles at '%s'" % prefix)
+    return metrics, sorted(threads)
+
+
+def _parse_metadata(header):
+    start = header.find('<metadata>')
+    end = header.find('</metadata>')
+    if start < 0 or end < 0:
+        return []
+    try:
+        root = ElementTree.fromstring(header[start:end+len('</metadata>')])
+    except ElementTree.ParseError as err:
+        LOGGER.debug("Ignoring invalid profile metadata: %s", err)
+        return []
+    return [(attr.findtext('name', ''), attr.findtext('value', '')) for attr in root.findall('attribute')]
+
+
+def profile_members(names):
+    """Find TAU profile files in a list of relative paths, e.g. the members of a trial pack.
+    
+    Args:
+        names (list): Paths relative to the directory containing ``profile.*.*.*`` files or 
+                      ``MULTI__*`` directories.
+        
+    Returns:
+        tuple: (metrics, threads) as returned by :any:`find_profiles` except the metric directories 
+               are relative paths.
+               
+    Raises:
+        ConfigurationError: No profiles were found.
+    """
+    found = {}
+    for name in names:
+        dir_name, base_name = os.path.split(name)
+        match = _PROFILE_NAME.match(base_name)
+        if match and (not dir_name or (dir_name.startswith('MULTI__') and not os.path.dirname(dir_name))):
+            found.setdefault(dir_name, set()).add(tuple(int(x) for x in match.groups()))
+    metric_dirs = sorted(dir_name for dir_name in found if dir_name)
+    if metric_dirs:
+        metrics = [(dir_name[len('MULTI__'):], dir_name) for dir_name in metric_dirs]
+    elif found:
+        metrics = [('TIME', '')]
+    else:
+        raise ConfigurationError("No TAU profiles found")
+    threads = set()
+    for _, dir_name in metrics:
+        threads.update(found[dir_name])
+    return metrics, sorted(threads)
+
+
+def parse_profile(path, fileobj=None):
+    """Parse a TAU profile file.
+    
+    Args:
+        path (str): Path to the profile file.
+        fileobj (file): Read the profile from this file-like object instead of opening `path`,
+                        e.g. a member of a trial pack.  `path` is only used in error messages.
+        
+    Returns:
+        dict: The profile with keys 'metric' (str), 'metadata' (list of (name, value) tuples), 
+              'functions' (list of (name, calls, subrs, exclusive, inclusive, groups) tuples), and
+              'user_events' (list of (name, count, max, min, mean, sumsqr) tuples).
+              
+    Raises:
+        ConfigurationError: The file is not a valid TAU profile.
+    """
+    if fileobj is not None:
+        return _parse_profile(path, fileobj)
+    with open(path) as fin:
+        return _parse_profile(path, fin)
+
+
+def _parse_profile(path, fin):
+    # pylint: disable=too-many-locals
+    lineno, line = 0, ''
+    lines = iter(enumerate(fin, 1))
+    try:
+        lineno, line = next(lines)
+        count, kind = line.split(None, 1)
+        count = int(count)
+        kind = kind.strip()
+        metric = kind.split('_MULTI_', 1)[1] if '_MULTI_' in kind else 'TIME'
+        lineno, line = next(lines)
+        metadata = _parse_metadata(line)
+        functions = []
+        for _ in xrange(count):
+            lineno, line = next(lines)
+            match = _FUNCTION_LINE.match(line)
+            if not match:
+                raise ProfileParseError(path, lineno, line)
+            name, calls, subrs, excl, incl, _, groups = match.groups()
+            groups = [group.strip() for group in groups.split('|') if group.strip()]
+            functions.append((name, float(calls), float(subrs), float(excl), float(incl), groups))
+        user_events = []
+        for lineno, line in lines:
+            fields = line.split()
+            if len(fields) == 2 and fields[1] == 'aggregates':
+                for _ in xrange(int(fields[0])):
+                    next(lines)
+            elif len(fields) == 2 and fields[1] == 'userevents':
+                next(lines)
+                for _ in xrange(int(fields[0])):
+                    lineno, line = next(lines)
+                    match = _USER_EVENT_LINE.match(line)
+                    if not match:
+                        raise ProfileParseError(path, lineno, line)
+                    name, numevents, vmax, vmin, mean, sumsqr = match.groups()
+                    user_events.append((name, int(float(numevents)), float(vmax), float(vmin), 
+                                        float(mean), float(sumsqr)))
+    except (StopIteration, ValueError):
+        raise ProfileParseError(path, lineno, line)
+    return {'metric': metric, 'metadata': metadata, 'functions': functions, 'user_events': user_events}
+
+
+class _DataOutput(object):
+    """Buffers values encoded like Java's ``DataOutputStream``."""
+
+    def __init__(self):
+        self.buffer = StringIO()
+
+    def write_int(self, value):
+        self.buffer.write(struct.pack('>i', value))
+
+    def write_double(self, value):
+        self.buffer.write(struct.pack('>d', value))
+
+    def write_char(self, value):
+        self.buffer.write(struct.pack('>H', ord(value)))
+
+    def write_utf(self, value):
+        # Java's modified UTF-8 encodes NUL as two bytes
+        data = value.decode('utf-8', 'replace').encode('utf-8').replace('\0', '\xc0\x80')[:0xFFFF]
+        self.buffer.write(struct.pack('>H', len(data)) + data)
+
+    def getvalue(self):
+        return self.buffer.getvalue()
+
+    def drain(self, fileobj):
+        """Write the buffered values to `fileobj` and empty the buffer."""
+        fileobj.write(self.buffer.getvalue())
+        self.buffer = StringIO()
+
+
+def _profile_path(metric_dir, thread):
+    return os.path.join(metric_dir, 'profile.%d.%d.%d' % thread)
+
+
+def write_ppk(dest, src, nthreads=None):
+    """Write a ParaProf packed profile (PPK) file from TAU profile files.
+    
+    Profile files are read twice: once to collect the function, group, and user event names that 
+    head the PPK file, and once to write each thread's data.  Only one thread's profiles are held 
+    in memory at a time.
+    
+    Args:
+        dest (str): Path to the PPK file to create.
+        src (str): Directory containing TAU profiles.
+        nthreads (int): Number of compression threads, see :any:`util.ParallelGzipFile`.
+    """
+    # pylint: disable=too-many-locals
+    metrics, threads = find_profiles(src)
+    LOGGER.info("Writing '%s'...", dest)
+    functions, groups, user_events = {}, {}, {}
+    thread_metadata = []
+    for thread in threads:
+        for i, (_, metric_dir) in enumerate(metrics):
+            path = _profile_path(metric_dir, thread)
+            if not os.path.exists(path):
+                continue
+            profile = parse_profile(path)
+            if i == 0:
+                thread_metadata.append((thread, profile['metadata']))
+            for name, _, _, _, _, func_groups in profile['functions']:
+                for group in func_groups:
+                    groups.setdefault(group, len(groups))
+                functions.setdefault(name, (len(functions), func_groups))
+            for event in profile['user_events']:
+                user_events.setdefault(event[0], len(user_events))
+    with util.ParallelGzipFile(dest, nthreads=nthreads) as fout:
+        out = _DataOutput()
+        for char in 'PPK':
+            out.write_char(char)
+        out.write_int(PPK_VERSION)
+        out.write_int(PPK_VERSION)
+        header_out = _DataOutput()
+        header_out.write_int(0)
+        header_out.write_int(len(thread_metadata))
+        for thread, metadata in thread_metadata:
+            for part in thread:
+                header_out.write_int(part)
+            header_out.write_int(len(metadata))
+            for name, value in metadata:
+                header_out.write_utf(name)
+                header_out.write_utf(value)
+        header = header_out.getvalue()
+        out.write_int(len(header))
+        out.buffer.write(header)
+        out.write_int(len(metrics))
+        for metric, _ in metrics:
+            out.write_utf(metric)
+        out.write_int(len(groups))
+        for group in sorted(groups, key=groups.get):
+            out.write_utf(group)
+        out.write_int(len(functions))
+        for name in sorted(functions, key=lambda name: functions[name][0]):
+            func_groups = functions[name][1]
+            out.write_utf(name)
+            out.write_int(len(func_groups))
+            for group in func_groups:
+                out.write_int(groups[group])
+        out.write_int(len(user_events))
+        for name in sorted(user_events, key=user_events.get):
+            out.write_utf(name)
+        out.write_int(len(threads))
+        out.drain(fout)
+        for thread in threads:
+            for part in thread:
+                out.write_int(part)
+            values = {}
+            events = []
+            for i, (_, metric_dir) in enumerate(metrics):
+                path = _profile_path(metric_dir, thread)
+                if not os.path.exists(path):
+                    continue
+                profile = parse_profile(path)
+                for name, calls, subrs, excl, incl, _ in profile['functions']:
+                    row = values.setdefault(name, [calls, subrs] + [0.0, 0.0]*len(metrics))
+                    row[2+2*i] = excl
+                    row[3+2*i] = incl
+                if not events:
+                    events = profile['user_events']
+            out.write_int(len(values))
+            for name, row in sorted(values.iteritems(), key=lambda item: functions[item[0]][0]):
+                out.write_int(functions[name][0])
+                for value in row:
+                    out.write_double(value)
+            out.write_int(len(events))
+            for name, count, vmax, vmin, mean, sumsqr in events:
+                out.write_int(user_events[name])
+                out.write_int(count)
+                for value in vmax, vmin, mean, sumsqr:
+                    out.write_double(value)
+            out.drain(fout)
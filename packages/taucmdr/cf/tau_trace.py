@@ -0,0 +1,342 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2016, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""TAU trace file merging.
+
+TAU writes one binary event file (``tautrace.<node>.<context>.<thread>.trc``) per thread and one
+event definition file (``events.<node>.edf``) per node.  Event IDs are assigned dynamically so the 
+same ID may name different events on different nodes.  :any:`merge_trace_files` merges the event 
+files into a single time-ordered ``tau.trc`` and writes a matching ``tau.edf`` with a unified set of 
+event IDs, replacing TAU's ``tau_treemerge.pl`` script.
+
+Event files are memory-mapped and merged with a heap so memory use does not grow with trace size.
+Like ``tau_treemerge.pl``, at most :any:`MAX_FAN_IN` files are merged at once so that traces of
+thousands of threads don't exhaust file descriptors or memory maps.  Larger traces are merged in 
+rounds through intermediate files.
+"""
+
+import os
+import re
+import sys
+import mmap
+import glob
+import heapq
+import struct
+import tempfile
+import multiprocessing
+from taucmdr import logger
+from taucmdr.error import ConfigurationError
+
+
+LOGGER = logger.get_logger(__name__)
+
+EVENT_FORMAT = 'iHHqQ'
+"""Layout of a TAU trace event record: event ID, node ID, thread ID, parameter, timestamp."""
+
+EVENT_SIZE = struct.calcsize('=' + EVENT_FORMAT)
+"""Size in bytes of a TAU trace event record."""
+
+_TRC_NAME = re.compile(r'tautrace\.(\d+)\.(\d+)\.(\d+)\.trc$')
+
+_EDF_NAME = re.compile(r'events\.(\d+)\.edf$')
+
+_EDF_LINE = re.compile(r'^(-?\d+)\s+(.*?)\s+(-?\d+)\s+"(.*)"\s*(.*)$')
+
+_WRITE_BATCH = 4096
+
+MAX_FAN_IN = 255
+"""Maximum number of files merged at once."""
+
+
+class EventDefinition(object):
+    """A TAU trace event definition, i.e. one line of an edf file.
+    
+    Attributes:
+        event_id (int): Event ID.
+        group (str): Event group, e.g. ``TAU_DEFAULT``.
+        tag (int): Event tag.
+        name (str): Event name.
+        param (str): Event parameter kind, e.g. ``EntryExit``.
+    """
+    # pylint: disable=too-few-public-methods
+
+    def __init__(self, event_id, group, tag, name, param):
+        self.event_id = event_id
+        self.group = group
+        self.tag = tag
+        self.name = name
+        self.param = param
+
+    def __str__(self):
+        return '%d %s %d "%s" %s' % (self.event_id, self.group, self.tag, self.name, self.param)
+
+
+def parse_edf(path):
+    """Parse a TAU event definition file.
+    
+    Args:
+        path (str): Path to the edf file.
+        
+    Returns:
+        list: :any:`EventDefinition` objects in file order.
+        
+    Raises:
+        ConfigurationError: The file is not a valid edf file.
+    """
+    events = []
+    with open(path) as fin:
+        for lineno, line in enumerate(fin, 1):
+            line = line.strip()
+            if not line or line.startswith('#') or line.endswith('dynamic_trace_events'):
+                continue
+            match = _EDF_LINE.match(line)
+            if not match:
+                raise ConfigurationError("Invalid event definition at %s:%d: %s" % (path, lineno, line))
+            event_id, group, tag, name, param = match.groups()
+            events.append(EventDefinition(int(event_id), group, int(tag), name, param))
+    return events
+
+
+def write_edf(path, events):
+    """Write a TAU event definition file.
+    
+    Args:
+        path (str): Path to the edf file.
+        events (list): :any:`EventDefinition` objects.
+    """
+    with open(path, 'w') as fout:
+        fout.write('%d dynamic_trace_events\n' % len(events))
+        fout.write('# FunctionId Group Tag "Name Type" Parameters\n')
+        for event in sorted(events, key=lambda event: event.event_id):
+            fout.write('%s\n' % event)
+
+
+def unify_event_definitions(edf_files):
+    """Assign one event ID to each distinctly named event across several edf files.
+    
+    An event keeps its original ID unless that ID already names a different event.
+    
+    Args:
+        edf_files (dict): Paths to edf files keyed by node number.
+        
+    Returns:
+        tuple: (events, remaps) where `events` is a list of unified :any:`EventDefinition` objects and
+               `remaps` maps node numbers to dictionaries mapping node event IDs to unified event IDs.
+    """
+    by_name = {}
+    by_id = {}
+    remaps = {}
+    for node in sorted(edf_files):
+        remap = remaps[node] = {}
+        for event in parse_edf(edf_files[node]):
+            unified = by_name.get(event.name)
+            if unified is None:
+                event_id = event.event_id
+                if event_id in by_id:
+                    event_id = max(by_id) + 1
+                unified = EventDefinition(event_id, event.group, event.tag, event.name, event.param)
+                by_name[event.name] = by_id[event_id] = unified
+            if unified.event_id != event.event_id:
+                remap[event.event_id] = unified.event_id
+    return by_id.values(), remaps
+
+
+def _byte_order(path, node, thread):
+    """Guess the byte order of a trc file from the node and thread IDs in its first record."""
+    with open(path, 'rb') as fin:
+        head = fin.read(EVENT_SIZE)
+    native = '<' if sys.byteorder == 'little' else '>'
+    if len(head) == EVENT_SIZE:
+        for order in native, '>' if native == '<' else '<':
+            _, nid, tid, _, _ = struct.unpack(order + EVENT_FORMAT, head)
+            if (nid, tid) == (node, thread):
+                return order
+    return native
+
+
+def _read_events(path, byte_order, remap):
+    record = struct.Struct(byte_order + EVENT_FORMAT)
+    with open(path, 'rb') as fin:
+        size = os.fstat(fin.fileno()).st_size
+        size -= size % EVENT_SIZE
+        if not size:
+            return
+        buf = mmap.mmap(fin.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            for offset in xrange(0, size, EVENT_SIZE):
+                event_id, nid, tid, par, timestamp = record.unpack_from(buf, offset)
+                yield timestamp, remap.get(event_id, event_id), nid, tid, par
+        finally:
+            buf.close()
+
+
+def _merge_streams(streams, dest, byte_order):
+    """Merge trc files in timestamp order.
+    
+    Args:
+        streams (list): (path, byte_order, remap) tuples.
+        dest (str): Path to the merged trc file.
+        byte_order (str): :any:`struct` byte order character for the merged file.
+        
+    Returns:
+        int: Number of events written.
+    """
+    record = struct.Struct(byte_order + EVENT_FORMAT)
+    count = 0
+    batch = []
+    with open(dest, 'wb') as fout:
+        for timestamp, event_id, nid, tid, par in heapq.merge(*[_read_events(*stream) for stream in streams]):
+            batch.append(record.pack(event_id, nid, tid, par, timestamp))
+            if len(batch) >= _WRITE_BATCH:
+                fout.write(''.join(batch))
+                count += len(batch)
+                batch = []
+        fout.write(''.join(batch))
+        count += len(batch)
+    return count
+
+
+def _merge_streams_worker(args):
+    return _merge_streams(*args)
+
+
+def _max_fan_in():
+    """Returns the number of files that may be merged at once without exceeding the open file limit."""
+    try:
+        import resource
+        soft_limit, _ = resource.getrlimit(resource.RLIMIT_NOFILE)
+    except (ImportError, ValueError):
+        return MAX_FAN_IN
+    if soft_limit == resource.RLIM_INFINITY:
+        return MAX_FAN_IN
+    # Each merged file holds a descriptor and a memory map, which duplicates the descriptor.
+    # Leave some descriptors for the rest of the process.
+    return max(2, min(MAX_FAN_IN, (soft_limit - 32) // 2))
+
+
+def _merge_groups(groups, dest_dir, byte_order, nprocs):
+    """Merge each group of streams into its own intermediate trc file.
+    
+    Returns:
+        list: Paths to the intermediate files, one per group.
+    """
+    parts = []
+    try:
+        for _ in groups:
+            fd, path = tempfile.mkstemp(dir=dest_dir, suffix='.trc.part')
+            os.close(fd)
+            parts.append(path)
+        jobs = [(group, part, byte_order) for group, part in zip(groups, parts)]
+        nprocs = min(nprocs, len(jobs))
+        if nprocs < 2:
+            for job in jobs:
+                _merge_streams(*job)
+        else:
+            pool = multiprocessing.Pool(nprocs)
+            try:
+                pool.map(_merge_streams_worker, jobs)
+            finally:
+                pool.terminate()
+                pool.join()
+    except:
+        for path in parts:
+            os.remove(path)
+        raise
+    return parts
+
+
+def merge_trace_files(prefix, dest_trc=None, dest_edf=None, nprocs=None, fan_in=None):
+    """Merge TAU trace files into a single trc file and a single edf file.
+    
+    If there are many trace files then groups of files are merged by a pool of processes and the 
+    intermediate files are merged in a final pass.  No merge reads more than `fan_in` files at once
+    so if there are more groups than that the intermediate files are merged in further rounds.
+    
+    Args:
+        prefix (str): Path to the directory containing ``tautrace.*.trc`` and ``events.*.edf`` files.
+        dest_trc (str): Path to the merged trc file.  Default is ``tau.trc`` in `prefix`.
+        dest_edf (str): Path to the merged edf file.  Default is ``tau.edf`` in `prefix`.
+        nprocs (int): Number of merge processes.  Default is the number of CPU cores.
+        fan_in (int): Maximum number of files merged at once.  Default is :any:`MAX_FAN_IN` or less
+                      if the open file limit is low.
+    
+    Returns:
+        int: Number of events in the merged trace.
+        
+    Raises:
+        ConfigurationError: Trace files are missing or invalid.
+    """
+    dest_trc = dest_trc or os.path.join(prefix, 'tau.trc')
+    dest_edf = dest_edf or os.path.join(prefix, 'tau.edf')
+    edf_files = {}
+    for path in glob.glob(os.path.join(prefix, 'events.*.edf')):
+        match = _EDF_NAME.search(path)
+        if match:
+            edf_files[int(match.group(1))] = path
+    trc_files = []
+    for path in glob.glob(os.path.join(prefix, 'tautrace.*.trc')):
+        match = _TRC_NAME.search(path)
+        if match:
+            node, _, thread = (int(x) for x in match.groups())
+            trc_files.append((path, node, thread))
+    if not trc_files:
+        raise ConfigurationError("No tautrace.*.trc files at '%s'" % prefix)
+    if not edf_files:
+        raise ConfigurationError("No events.*.edf files at '%s'" % prefix)
+    events, remaps = unify_event_definitions(edf_files)
+    streams = []
+    for path, node, thread in sorted(trc_files):
+        if node not in remaps:
+            raise ConfigurationError("No event definitions for '%s'" % path, 
+                                     "Check that '%s' exists" % os.path.join(prefix, 'events.%d.edf' % node))
+        streams.append((path, _byte_order(path, node, thread), remaps[node]))
+    byte_order = streams[0][1]
+    LOGGER.info("Merging %d TAU trace files...", len(trc_files) + len(edf_files))
+    nprocs = min(nprocs or multiprocessing.cpu_count(), len(streams))
+    fan_in = max(fan_in or _max_fan_in(), 2)
+    dest_dir = os.path.dirname(dest_trc)
+    intermediates = []
+    try:
+        # The first round splits the work among the merge processes, later rounds only bound the fan-in
+        while len(streams) > fan_in or (nprocs > 1 and not intermediates):
+            ngroups = -(-len(streams) // fan_in)
+            if not intermediates:
+                ngroups = max(ngroups, nprocs)
+            size = -(-len(streams) // ngroups)
+            parts = _merge_groups([streams[i:i+size] for i in xrange(0, len(streams), size)], 
+                                  dest_dir, byte_order, nprocs)
+            for path in intermediates:
+                os.remove(path)
+            intermediates = parts
+            streams = [(part, byte_order, {}) for part in parts]
+        count = _merge_streams(streams, dest_trc, byte_order)
+    finally:
+        for path in intermediates:
+            os.remove(path)
+    write_edf(dest_edf, events)
+    LOGGER.debug("Merged %d events into '%s'", count, dest_trc)
+    return count
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2016, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""Test functions.
+
+Functions used for unit tests of pack.py.
+"""
+
+import os
+from taucmdr import tests, util
+from taucmdr.cf.pack import TrialPack, PackError
+
+
+class TrialPackTest(tests.TestCase):
+    """Tests for :any:`pack.TrialPack`."""
+
+    def _make_pack(self, name):
+        workdir = tests.get_test_workdir()
+        data_dir = os.path.join(workdir, name)
+        util.mkdirp(os.path.join(data_dir, 'MULTI__TIME'))
+        contents = {}
+        for rank in xrange(200):
+            member = os.path.join('MULTI__TIME', 'profile.%d.0.0' % rank)
+            contents[member] = ('rank %d\n' % rank) * (rank + 1)
+            with open(os.path.join(data_dir, member), 'wb') as fout:
+                fout.write(contents[member])
+        path = os.path.join(workdir, name + '.zip')
+        util.create_archive('zip', path, sorted(contents), data_dir, show_progress=False, nthreads=2)
+        return path, contents
+
+    def test_random_access(self):
+        path, contents = self._make_pack('random')
+        with TrialPack(path) as pack:
+            self.assertEqual(len(pack), len(contents))
+            self.assertItemsEqual(pack.names(), contents.keys())
+            member = os.path.join('MULTI__TIME', 'profile.137.0.0')
+            self.assertIn(member, pack)
+            self.assertNotIn('profile.999.0.0', pack)
+            self.assertEqual(pack.read(member), contents[member])
+            with pack.open(member) as fin:
+                self.assertEqual(fin.readline(), 'rank 137\n')
+            offset, length, _ = pack.index(member)
+            self.assertEqual(length, len(contents[member]))
+            self.assertGreater(offset, 0)
+            self.assertRaises(KeyError, pack.read, 'missing')
+
+    def test_extract(self):
+        path, contents = self._make_pack('extract')
+        dest = os.path.join(tests.get_test_workdir(), 'extracted')
+        member = os.path.join('MULTI__TIME', 'profile.5.0.0')
+        with TrialPack(path) as pack:
+            self.assertListEqual(pack.extract(dest, [member]), [member])
+            self.assertListEqual(os.listdir(os.path.join(dest, 'MULTI__TIME')), ['profile.5.0.0'])
+            pack.extract(dest)
+        for name, data in contents.iteritems():
+            with open(os.path.join(dest, name), 'rb') as fin:
+                self.assertEqual(fin.read(), data)
+
+    def test_invalid(self):
+        path = os.path.join(tests.get_test_workdir(), 'invalid.zip')
+        with open(path, 'wb') as fout:
+            fout.write('not a pack')
+        self.assertRaises(PackError, TrialPack, path)
+        self.assertRaises(PackError, TrialPack, path + '.missing')
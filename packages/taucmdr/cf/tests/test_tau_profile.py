@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2016, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""Test functions.
+
+Functions used for unit tests of tau_profile.py.
+"""
+
+import os
+import gzip
+import struct
+from taucmdr import tests, util
+from taucmdr.error import ConfigurationError
+from taucmdr.cf import tau_profile
+
+
+PROFILE = """3 templated_functions_MULTI_%(metric)s
+# Name Calls Subrs Excl Incl ProfileCalls # <metadata><attribute><name>Node Name</name><value>node%(node)d</value></attribute></metadata>
+".TAU application" 1 1 %(scale)d %(total)d 0 GROUP="TAU_DEFAULT"
+"main" 1 2 %(main)d %(main)d 0 GROUP="TAU_DEFAULT"
+"MPI_Send()" 4 0 7.5 7.5 0 GROUP="MPI | TAU_MESSAGE"
+0 aggregates
+1 userevents
+# eventname numevents max min mean sumsqr
+"Message size for send" 4 8 8 8 256
+"""
+
+
+def write_profiles(prefix, metrics, nodes=2):
+    for metric in metrics:
+        metric_dir = os.path.join(prefix, 'MULTI__' + metric) if len(metrics) > 1 else prefix
+        util.mkdirp(metric_dir)
+        for node in xrange(nodes):
+            scale = 10 if metric == 'TIME' else 1
+            fields = {'metric': metric, 'node': node, 'scale': scale, 
+                      'main': 100*scale*(node+1), 'total': 100*scale*(node+1)+scale}
+            with open(os.path.join(metric_dir, 'profile.%d.0.0' % node), 'w') as fout:
+                fout.write(PROFILE % fields)
+
+
+class _DataInput(object):
+
+    def __init__(self, data):
+        self.data = data
+        self.offset = 0
+
+    def read(self, fmt):
+        values = struct.unpack_from('>' + fmt, self.data, self.offset)
+        self.offset += struct.calcsize('>' + fmt)
+        return values[0] if len(values) == 1 else values
+
+    def read_utf(self):
+        size = self.read('H')
+        value = self.data[self.offset:self.offset+size]
+        self.offset += size
+        return value
+
+
+class ParseProfileTest(tests.TestCase):
+    """Tests for :any:`tau_profile.parse_profile`."""
+
+    def test_parse(self):
+        prefix = os.path.join(tests.get_test_workdir(), 'parse')
+        write_profiles(prefix, ['TIME'], nodes=1)
+        profile = tau_profile.parse_profile(os.path.join(prefix, 'profile.0.0.0'))
+        self.assertEqual(profile['metric'], 'TIME')
+        self.assertListEqual(profile['metadata'], [('Node Name', 'node0')])
+        self.assertEqual(len(profile['functions']), 3)
+        self.assertTupleEqual(profile['functions'][2], ('MPI_Send()', 4.0, 0.0, 7.5, 7.5, ['MPI', 'TAU_MESSAGE']))
+        self.assertListEqual(profile['user_events'], [('Message size for send', 4, 8.0, 8.0, 8.0, 256.0)])
+
+    def test_parse_fileobj(self):
+        prefix = os.path.join(tests.get_test_workdir(), 'fileobj')
+        write_profiles(prefix, ['TIME'], nodes=1)
+        path = os.path.join(prefix, 'profile.0.0.0')
+        with open(path) as fin:
+            self.assertDictEqual(tau_profile.parse_profile('member', fin), tau_profile.parse_profile(path))
+
+    def test_profile_members(self):
+        names = ['MULTI__TIME/profile.0.0.0', 'MULTI__TIME/profile.1.0.0', 'MULTI__PAPI_FP_INS/profile.1.0.0', 
+                 'MULTI__TIME/other', 'tau.trc']
+        metrics, threads = tau_profile.profile_members(names)
+        self.assertListEqual(metrics, [('PAPI_FP_INS', 'MULTI__PAPI_FP_INS'), ('TIME', 'MULTI__TIME')])
+        self.assertListEqual(threads, [(0, 0, 0), (1, 0, 0)])
+        self.assertEqual(tau_profile.profile_members(['profile.0.0.1'])[0], [('TIME', '')])
+        self.assertRaises(ConfigurationError, tau_profile.profile_members, ['tau.trc'])
+
+    def test_invalid(self):
+        path = os.path.join(tests.get_test_workdir(), 'profile.0.0.0')
+        with open(path, 'w') as fout:
+            fout.write('1 templated_functions_MULTI_TIME\n# Name\n"main" 1 2\n')
+        self.assertRaises(tau_profile.ProfileParseError, tau_profile.parse_profile, path)
+
+
+class WritePpkTest(tests.TestCase):
+    """Tests for :any:`tau_profile.write_ppk`."""
+
+    def _read_ppk(self, path):
+        with gzip.open(path) as fin:
+            data = _DataInput(fin.read())
+        self.assertEqual(data.read('HHH'), tuple(ord(c) for c in 'PPK'))
+        self.assertEqual(data.read('ii'), (2, 2))
+        header_end = data.read('i') + data.offset
+        self.assertEqual(data.read('i'), 0)
+        thread_metadata = {}
+        for _ in xrange(data.read('i')):
+            thread = data.read('iii')
+            thread_metadata[thread] = [(data.read_utf(), data.read_utf()) for _ in xrange(data.read('i'))]
+        self.assertEqual(data.offset, header_end)
+        metrics = [data.read_utf() for _ in xrange(data.read('i'))]
+        groups = [data.read_utf() for _ in xrange(data.read('i'))]
+        functions = []
+        for _ in xrange(data.read('i')):
+            name = data.read_utf()
+            functions.append((name, [groups[data.read('i')] for _ in xrange(data.read('i'))]))
+        user_events = [data.read_utf() for _ in xrange(data.read('i'))]
+        threads = {}
+        for _ in xrange(data.read('i')):
+            thread = data.read('iii')
+            profiles = {}
+            for _ in xrange(data.read('i')):
+                name = functions[data.read('i')][0]
+                profiles[name] = [data.read('d') for _ in xrange(2 + 2*len(metrics))]
+            events = {}
+            for _ in xrange(data.read('i')):
+                name = user_events[data.read('i')]
+                events[name] = (data.read('i'), data.read('dddd'))
+            threads[thread] = (profiles, events)
+        self.assertEqual(data.offset, len(data.data))
+        return metrics, dict(functions), thread_metadata, threads
+
+    def test_single_metric(self):
+        prefix = os.path.join(tests.get_test_workdir(), 'single')
+        write_profiles(prefix, ['TIME'])
+        dest = os.path.join(tests.get_test_workdir(), 'single.ppk')
+        tau_profile.write_ppk(dest, prefix)
+        metrics, functions, thread_metadata, threads = self._read_ppk(dest)
+        self.assertListEqual(metrics, ['TIME'])
+        self.assertListEqual(functions['MPI_Send()'], ['MPI', 'TAU_MESSAGE'])
+        self.assertListEqual(thread_metadata[(1, 0, 0)], [('Node Name', 'node1')])
+        profiles, events = threads[(1, 0, 0)]
+        self.assertListEqual(profiles['main'], [1.0, 2.0, 2000.0, 2000.0])
+        self.assertEqual(events['Message size for send'], (4, (8.0, 8.0, 8.0, 256.0)))
+
+    def test_multi_metric(self):
+        prefix = os.path.join(tests.get_test_workdir(), 'multi')
+        write_profiles(prefix, ['PAPI_TOT_CYC', 'TIME'])
+        dest = os.path.join(tests.get_test_workdir(), 'multi.ppk')
+        tau_profile.write_ppk(dest, prefix)
+        metrics, _, _, threads = self._read_ppk(dest)
+        self.assertListEqual(metrics, ['PAPI_TOT_CYC', 'TIME'])
+        profiles, _ = threads[(0, 0, 0)]
+        self.assertListEqual(profiles['main'], [1.0, 2.0, 100.0, 100.0, 1000.0, 1000.0])
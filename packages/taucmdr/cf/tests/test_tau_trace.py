@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2016, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""Test functions.
+
+Functions used for unit tests of tau_trace.py.
+"""
+
+import os
+import struct
+from taucmdr import tests
+from taucmdr.cf import tau_trace
+
+
+class MergeTraceFilesTest(tests.TestCase):
+    """Tests for :any:`tau_trace.merge_trace_files`."""
+
+    def _write_trace(self, prefix, node, thread, events, byte_order='<'):
+        path = os.path.join(prefix, 'tautrace.%d.0.%d.trc' % (node, thread))
+        with open(path, 'wb') as fout:
+            for event_id, par, timestamp in events:
+                fout.write(struct.pack(byte_order + tau_trace.EVENT_FORMAT, event_id, node, thread, par, timestamp))
+
+    def _write_edf(self, prefix, node, names):
+        events = [tau_trace.EventDefinition(event_id, 'TAU_DEFAULT', 0, name, 'EntryExit') 
+                  for event_id, name in names]
+        tau_trace.write_edf(os.path.join(prefix, 'events.%d.edf' % node), events)
+
+    def _read_trace(self, path):
+        with open(path, 'rb') as fin:
+            data = fin.read()
+        return [struct.unpack_from('<' + tau_trace.EVENT_FORMAT, data, offset) 
+                for offset in xrange(0, len(data), tau_trace.EVENT_SIZE)]
+
+    def _make_trace(self):
+        prefix = os.path.join(tests.get_test_workdir(), 'traces')
+        if os.path.isdir(prefix):
+            return prefix
+        os.mkdir(prefix)
+        self._write_edf(prefix, 0, [(1, 'main'), (2, 'foo')])
+        self._write_edf(prefix, 1, [(1, 'main'), (2, 'bar'), (3, 'foo')])
+        self._write_trace(prefix, 0, 0, [(1, 1, 10), (2, 1, 20), (2, -1, 30), (1, -1, 60)])
+        self._write_trace(prefix, 0, 1, [(2, 1, 15), (2, -1, 25)])
+        self._write_trace(prefix, 1, 0, [(1, 1, 5), (3, 1, 22), (2, 1, 23), (2, -1, 24), (3, -1, 40), (1, -1, 70)],
+                          byte_order='>')
+        return prefix
+
+    def _check_merged(self, trc, edf):
+        events = {event.event_id: event.name for event in tau_trace.parse_edf(edf)}
+        self.assertItemsEqual(events.values(), ['main', 'foo', 'bar'])
+        merged = self._read_trace(trc)
+        self.assertEqual(len(merged), 12)
+        timestamps = [event[4] for event in merged]
+        self.assertListEqual(timestamps, sorted(timestamps))
+        names = [(events[event[0]], event[1], event[3]) for event in merged]
+        self.assertListEqual(names[:5], [('main', 1, 1), ('main', 0, 1), ('foo', 0, 1), ('foo', 0, 1), ('foo', 1, 1)])
+        self.assertIn(('foo', 1, 1), names)
+        self.assertIn(('bar', 1, 1), names)
+
+    def test_merge(self):
+        prefix = self._make_trace()
+        trc, edf = os.path.join(prefix, 'serial.trc'), os.path.join(prefix, 'serial.edf')
+        self.assertEqual(tau_trace.merge_trace_files(prefix, trc, edf, nprocs=1), 12)
+        self._check_merged(trc, edf)
+
+    def test_merge_parallel(self):
+        prefix = self._make_trace()
+        trc, edf = os.path.join(prefix, 'parallel.trc'), os.path.join(prefix, 'parallel.edf')
+        self.assertEqual(tau_trace.merge_trace_files(prefix, trc, edf, nprocs=4), 12)
+        self._check_merged(trc, edf)
+        self.assertFalse([name for name in os.listdir(prefix) if name.endswith('.part')])
+
+    def test_merge_bounded_fan_in(self):
+        prefix = os.path.join(tests.get_test_workdir(), 'wide_traces')
+        os.mkdir(prefix)
+        nthreads = 20
+        self._write_edf(prefix, 0, [(1, 'main')])
+        for thread in xrange(nthreads):
+            self._write_trace(prefix, 0, thread, [(1, 1, thread), (1, -1, 100 + thread)])
+        for nprocs in 1, 4:
+            trc = os.path.join(prefix, 'merged%d.trc' % nprocs)
+            edf = os.path.join(prefix, 'merged%d.edf' % nprocs)
+            self.assertEqual(tau_trace.merge_trace_files(prefix, trc, edf, nprocs=nprocs, fan_in=3), 2 * nthreads)
+            merged = self._read_trace(trc)
+            self.assertListEqual([event[4] for event in merged], 
+                                 range(nthreads) + range(100, 100 + nthreads))
+            self.assertListEqual([event[2] for event in merged], range(nthreads) * 2)
+            self.assertFalse([name for name in os.listdir(prefix) if name.endswith('.part')])
+
+    def test_max_fan_in(self):
+        fan_in = tau_trace._max_fan_in()  # pylint: disable=protected-access
+        self.assertGreaterEqual(fan_in, 2)
+        self.assertLessEqual(fan_in, tau_trace.MAX_FAN_IN)
@@ -79,6 +79,8 @@ def _command_as_list(module_name):
     
     Maps command module names to their command line equivilants, e.g.
     'taucmdr.cli.commands.target.create' => ['tau', 'target', 'create']
+    Underscores in module names become hyphens in command names, e.g.
+    'taucmdr.cli.commands.trial.diff_env' => ['tau', 'trial', 'diff-env']
 
     Args:
         module_name (str): Name of a module.
@@ -90,7 +92,7 @@ def _command_as_list(module_name):
     for part in COMMANDS_PACKAGE_NAME.split('.'):
         if parts[0] == part:
             parts = parts[1:]
-    return [SCRIPT_COMMAND] + parts
+    return [SCRIPT_COMMAND] + [part.replace('_', '-') for part in parts]
 
 
 def _get_commands(package_name):
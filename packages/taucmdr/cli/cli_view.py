@@ -36,6 +36,7 @@ from taucmdr import logger, util, cli
 from taucmdr.error import UniqueAttributeError, InternalError, ModelError, ProjectSelectionError
 from taucmdr.cf.storage import StorageError
 from taucmdr.cf.storage.levels import SYSTEM_STORAGE, USER_STORAGE, PROJECT_STORAGE
+from taucmdr.cf.storage.trash import start_background_purge
 from taucmdr.model.project import Project
 from taucmdr.cli import arguments
 from taucmdr.cli.command import AbstractCommand
@@ -171,6 +172,7 @@ class DeleteCommand(AbstractCliView):
         if not ctrl.exists({key_attr: key}):
             self.parser.error("No %s-level %s with %s='%s'." % (store.name, self.model_name, key_attr, key))
         ctrl.delete({key_attr: key})
+        start_background_purge(store)
         self.logger.info("Deleted %s '%s'", self.model_name, key)
         return EXIT_SUCCESS
     
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2016, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""``gc`` subcommand."""
+
+from taucmdr import EXIT_SUCCESS
+from taucmdr.cli import arguments
+from taucmdr.cli.command import AbstractCommand
+from taucmdr.cf.storage.trash import purge_trash
+
+
+class GcCommand(AbstractCommand):
+    """``gc`` subcommand."""
+    
+    def _construct_parser(self):
+        usage = "%s [arguments]" % self.command
+        parser = arguments.get_parser(prog=self.command, usage=usage, description=self.summary)
+        parser.add_argument('--threads', 
+                            help="number of threads removing files (default: twice the number of CPU cores)",
+                            metavar='<count>',
+                            type=int,
+                            default=arguments.SUPPRESS)
+        arguments.add_storage_flag(parser, "purge", "deleted data", exclusive=False)
+        return parser
+
+    def main(self, argv):
+        args = self._parse_args(argv)
+        nthreads = getattr(args, 'threads', None)
+        if nthreads is not None and nthreads < 1:
+            self.parser.error("Invalid thread count: %s" % nthreads)
+        for storage in arguments.parse_storage_flag(args):
+            count = purge_trash(storage, nthreads)
+            self.logger.info("Purged %d deleted files from %s storage", count, storage.name)
+        return EXIT_SUCCESS
+
+
+COMMAND = GcCommand(__name__, summary_fmt="Remove deleted trial and experiment data.")
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2016, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""``project gc`` subcommand."""
+
+from taucmdr import EXIT_SUCCESS, util
+from taucmdr.cli import arguments
+from taucmdr.cli.command import AbstractCommand
+from taucmdr.model.project import Project
+from taucmdr.cf.storage.retention import RetentionPolicy, project_data_size
+
+
+class ProjectGcCommand(AbstractCommand):
+    """``project gc`` subcommand."""
+    
+    def _construct_parser(self):
+        usage = "%s [arguments]" % self.command
+        parser = arguments.get_parser(prog=self.command, usage=usage, description=self.summary)
+        parser.add_argument('--dry-run', 
+                            help="list the actions that would be taken without changing any data",
+                            action='store_const',
+                            const=True,
+                            default=arguments.SUPPRESS)
+        return parser
+
+    def main(self, argv):
+        args = self._parse_args(argv)
+        dry_run = getattr(args, 'dry_run', False)
+        proj = Project.selected()
+        policy = RetentionPolicy.configured()
+        if not policy:
+            self.logger.info("No retention policies are configured.  "
+                             "Use `tau configure retention.<policy> <value>` to set a policy.")
+            return EXIT_SUCCESS
+        before = project_data_size(proj)
+        actions = policy.enforce(proj, dry_run=dry_run)
+        if dry_run:
+            for action, trial, reason in actions:
+                self.logger.info("Would %s trial %s of experiment '%s' (%s)", action.replace('_', ' '), 
+                                 trial['number'], trial.populate('experiment')['name'], reason)
+            self.logger.info("%d actions planned", len(actions))
+        else:
+            after = project_data_size(Project.selected())
+            self.logger.info("%d actions taken, project data reduced from %s to %s", 
+                             len(actions), util.human_size(before), util.human_size(after))
+        return EXIT_SUCCESS
+
+
+COMMAND = ProjectGcCommand(__name__, summary_fmt="Enforce project data retention policies.")
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2016, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""Test functions.
+
+Functions used for unit tests of gc.py.
+"""
+
+from taucmdr import tests, configuration, EXIT_SUCCESS
+from taucmdr.cf.compiler.host import CC
+from taucmdr.cf.storage.levels import PROJECT_STORAGE
+from taucmdr.cli.commands.project.gc import COMMAND as gc_cmd
+from taucmdr.cli.commands.trial.create import COMMAND as trial_create_cmd
+from taucmdr.model.project import Project
+
+
+class GcTest(tests.TestCase):
+    """Tests for :any:`project.gc`."""
+
+    def test_no_policy(self):
+        self.reset_project_storage()
+        stdout, stderr = self.assertCommandReturnValue(EXIT_SUCCESS, gc_cmd, [])
+        self.assertIn('No retention policies are configured', stdout)
+        self.assertFalse(stderr)
+
+    def test_keep_trials(self):
+        self.reset_project_storage()
+        expr = Project.selected().experiment()
+        self.assertManagedBuild(0, CC, [], 'hello.c')
+        for _ in xrange(3):
+            self.assertCommandReturnValue(EXIT_SUCCESS, trial_create_cmd, ['./a.out'])
+        configuration.put('retention.keep_trials', 1, storage=PROJECT_STORAGE)
+        stdout, _ = self.assertCommandReturnValue(EXIT_SUCCESS, gc_cmd, ['--dry-run'])
+        self.assertIn('2 actions planned', stdout)
+        self.assertEqual(len(expr.trials()), 3)
+        self.assertCommandReturnValue(EXIT_SUCCESS, gc_cmd, [])
+        self.assertListEqual([trial['number'] for trial in expr.trials()], [2])
@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2016, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""``trial analyze`` subcommand."""
+
+import json
+from texttable import Texttable
+from taucmdr import EXIT_SUCCESS
+from taucmdr import logger, util
+from taucmdr.cli import arguments
+from taucmdr.cli.command import AbstractCommand
+from taucmdr.model.project import Project
+from taucmdr.analysis import cache
+from taucmdr.analysis.profile import FUNCTION_FIELDS
+from taucmdr.analysis.statistics import DEFAULT_PERCENTILES, function_statistics
+from taucmdr.analysis.cluster import DEFAULT_CLUSTERS, OUTLIER_THRESHOLD, cluster_ranks
+
+
+def draw_function_table(rows):
+    """Draw a table of per-function values.
+    
+    Numeric columns are kept on one line and long function names in the first column are wrapped.
+    
+    Args:
+        rows (list): Header row followed by data rows of formatted strings, function name first.
+        
+    Returns:
+        str: The drawn table.
+    """
+    ncols = len(rows[0])
+    widths = [max(len(row[col]) for row in rows) for col in xrange(ncols)]
+    widths[0] = min(widths[0], max(logger.LINE_WIDTH - sum(widths[1:]) - 3*ncols, 16))
+    table = Texttable(0)
+    table.set_cols_width(widths)
+    table.set_cols_align(['l'] + ['r'] * (ncols - 1))
+    table.set_cols_dtype(['t'] * ncols)
+    table.set_deco(Texttable.HEADER | Texttable.VLINES)
+    table.add_rows(rows)
+    return table.draw()
+
+
+class TrialAnalyzeCommand(AbstractCommand):
+    """``trial analyze`` subcommand."""
+    
+    def _construct_parser(self):
+        usage = "%s [trial_number...] [arguments]" % self.command
+        parser = arguments.get_parser(prog=self.command, usage=usage, description=self.summary)
+        parser.add_argument('--metric', 
+                            help="analyze this metric (default: first metric in the profile)",
+                            metavar='<metric>',
+                            default=arguments.SUPPRESS)
+        parser.add_argument('--field', 
+                            help="analyze this per-function value",
+                            metavar='<field>',
+                            choices=FUNCTION_FIELDS,
+                            default='excl')
+        parser.add_argument('--percentiles', 
+                            help="report these percentiles across ranks (default: %s)" % 
+                            ' '.join(str(pct) for pct in DEFAULT_PERCENTILES),
+                            metavar='<percent>',
+                            nargs='+',
+                            type=int,
+                            default=arguments.SUPPRESS)
+        parser.add_argument('--limit', 
+                            help="show only this many functions with the largest totals",
+                            metavar='<count>',
+                            type=int,
+                            default=arguments.SUPPRESS)
+        parser.add_argument('--cluster', 
+                            help="group ranks with similar behavior into clusters and flag outlier ranks",
+                            metavar='<count>',
+                            nargs='?',
+                            type=int,
+                            const=DEFAULT_CLUSTERS,
+                            default=arguments.SUPPRESS)
+        parser.add_argument('--outlier-threshold', 
+                            help="robust z-score above which a rank is an outlier",
+                            metavar='<zscore>',
+                            type=float,
+                            default=OUTLIER_THRESHOLD)
+        parser.add_argument('--jobs', 
+                            help="number of processes parsing profiles (default: number of CPU cores)",
+                            metavar='<count>',
+                            type=int,
+                            default=arguments.SUPPRESS)
+        parser.add_argument('--json', 
+                            help="write statistics as JSON",
+                            action='store_const',
+                            const=True,
+                            default=arguments.SUPPRESS)
+        parser.add_argument('trial_numbers', 
+                            help="analyze specified trials",
+                            metavar='trial_number',
+                            nargs='*',
+                            default=arguments.SUPPRESS)
+        return parser
+
+    @staticmethod
+    def _format_table(trial, metric, field, nthreads, percentiles, stats):
+        title = "Trial %s: %s %s across %d threads" % (trial['number'], metric, field, nthreads)
+        headers = ['Function', '%Total', 'Mean', 'Min', 'Max', 'Stddev'] 
+        headers.extend('P%d' % pct for pct in percentiles)
+        headers.append('Max/Mean')
+        keys = ['mean', 'min', 'max', 'stddev'] + ['p%d' % pct for pct in percentiles] + ['imbalance']
+        rows = [headers]
+        for func in stats:
+            row = [func['name'], '%.1f' % func['percent']]
+            row.extend('%.4g' % func[key] for key in keys)
+            rows.append(row)
+        return [util.hline(title, 'cyan'), draw_function_table(rows), '']
+
+    @staticmethod
+    def _format_clusters(trial, metric, field, result):
+        title = "Trial %s: rank clusters by %s %s" % (trial['number'], metric, field)
+        rows = [['Ranks', 'Size', 'Representative']]
+        for cluster in result['clusters']:
+            ranges = cluster['rank_ranges']
+            if len(ranges) > 60:
+                ranges = ranges[:ranges.rfind(',', 0, 57)] + ',...'
+            rows.append([ranges, str(cluster['size']), str(cluster['representative'])])
+        parts = [util.hline(title, 'cyan'), draw_function_table(rows), '']
+        if result['outliers']:
+            rows = [['Function', 'Rank', 'Value', 'Median', 'Robust Z']]
+            rows.extend([outlier['function'], str(outlier['rank']), '%.4g' % outlier['value'], 
+                         '%.4g' % outlier['median'], '%+.1f' % outlier['zscore']] for outlier in result['outliers'])
+            parts.extend([util.hline("Trial %s: outlier ranks" % trial['number'], 'cyan'), 
+                          draw_function_table(rows), ''])
+        else:
+            parts.extend(["No outlier ranks.", ''])
+        return parts
+
+    def main(self, argv):
+        args = self._parse_args(argv)
+        trial_numbers = []
+        for num in getattr(args, 'trial_numbers', []):
+            try:
+                trial_numbers.append(int(num))
+            except ValueError:
+                self.parser.error("Invalid trial number: %s" % num)
+        percentiles = getattr(args, 'percentiles', DEFAULT_PERCENTILES)
+        for pct in percentiles:
+            if not 0 <= pct <= 100:
+                self.parser.error("Invalid percentile: %s" % pct)
+        limit = getattr(args, 'limit', None)
+        if limit is not None and limit < 1:
+            self.parser.error("Invalid function count: %s" % limit)
+        jobs = getattr(args, 'jobs', None)
+        if jobs is not None and jobs < 1:
+            self.parser.error("Invalid job count: %s" % jobs)
+        clusters = getattr(args, 'cluster', None)
+        if clusters is not None and clusters < 1:
+            self.parser.error("Invalid cluster count: %s" % clusters)
+        expr = Project.selected().experiment()
+        results = []
+        parts = []
+        for trial in expr.trials(trial_numbers):
+            data = cache.load_trial(trial, jobs)
+            metric = getattr(args, 'metric', data.metrics[0])
+            stats = function_statistics(data, metric, args.field, percentiles)[:limit]
+            clustered = None
+            if clusters is not None:
+                clustered = cluster_ranks(data, clusters, metric, args.field, threshold=args.outlier_threshold)
+            if getattr(args, 'json', False):
+                result = {'trial': trial['number'], 'metric': metric, 'field': args.field,
+                          'threads': len(data.threads), 'functions': stats}
+                if clustered:
+                    result.update(clustered_functions=clustered['functions'], clusters=clustered['clusters'],
+                                  outliers=clustered['outliers'])
+                results.append(result)
+            else:
+                parts.extend(self._format_table(trial, metric, args.field, len(data.threads), percentiles, stats))
+                if clustered:
+                    parts.extend(self._format_clusters(trial, metric, args.field, clustered))
+        if getattr(args, 'json', False):
+            print json.dumps(results, indent=2, sort_keys=True)
+        else:
+            print '\n'.join(parts)
+        return EXIT_SUCCESS
+
+
+COMMAND = TrialAnalyzeCommand(__name__, summary_fmt="Compute summary statistics of trial profiles across ranks.")
@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2016, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""``trial check`` subcommand."""
+
+import json
+from taucmdr import EXIT_SUCCESS, EXIT_FAILURE
+from taucmdr import util
+from taucmdr.cli import arguments
+from taucmdr.cli.command import AbstractCommand
+from taucmdr.model.project import Project
+from taucmdr.analysis import cache
+from taucmdr.analysis.baseline import BASELINE_FIELDS, load_baseline, check_regressions
+from taucmdr.cli.commands.trial.analyze import draw_function_table
+
+
+class TrialCheckCommand(AbstractCommand):
+    """``trial check`` subcommand."""
+    
+    def _construct_parser(self):
+        usage = "%s [trial_number] [arguments]" % self.command
+        parser = arguments.get_parser(prog=self.command, usage=usage, description=self.summary)
+        parser.add_argument('--metric', 
+                            help="check this metric (default: first metric in the trial profile)",
+                            metavar='<metric>',
+                            default=arguments.SUPPRESS)
+        parser.add_argument('--field', 
+                            help="check this per-function value",
+                            metavar='<field>',
+                            choices=BASELINE_FIELDS,
+                            default='excl')
+        parser.add_argument('--absolute', 
+                            help="allowed increase per rank in the metric's units",
+                            metavar='<value>',
+                            type=float,
+                            default=arguments.SUPPRESS)
+        parser.add_argument('--relative', 
+                            help="allowed increase as a percentage of the baseline (default: 10 if no other threshold)",
+                            metavar='<percent>',
+                            type=float,
+                            default=arguments.SUPPRESS)
+        parser.add_argument('--sigma', 
+                            help="allowed increase in standard deviations of repeated baseline trials",
+                            metavar='<count>',
+                            type=float,
+                            default=arguments.SUPPRESS)
+        parser.add_argument('--min-percent', 
+                            help="skip functions taking less than this percentage of the baseline total",
+                            metavar='<percent>',
+                            type=float,
+                            default=1.0)
+        parser.add_argument('--total-only', 
+                            help="only check the program's total, not individual functions",
+                            action='store_const',
+                            const=True,
+                            default=arguments.SUPPRESS)
+        parser.add_argument('--jobs', 
+                            help="number of processes parsing profiles (default: number of CPU cores)",
+                            metavar='<count>',
+                            type=int,
+                            default=arguments.SUPPRESS)
+        parser.add_argument('--json', 
+                            help="write regressions as JSON",
+                            action='store_const',
+                            const=True,
+                            default=arguments.SUPPRESS)
+        parser.add_argument('trial_number', 
+                            help="check specified trial (default: most recent trial)",
+                            metavar='trial_number',
+                            nargs='?',
+                            default=arguments.SUPPRESS)
+        return parser
+
+    def main(self, argv):
+        args = self._parse_args(argv)
+        trial_numbers = []
+        if hasattr(args, 'trial_number'):
+            try:
+                trial_numbers.append(int(args.trial_number))
+            except ValueError:
+                self.parser.error("Invalid trial number: %s" % args.trial_number)
+        for name in 'absolute', 'relative', 'sigma':
+            if getattr(args, name, 0) < 0:
+                self.parser.error("Invalid %s threshold: %s" % (name, getattr(args, name)))
+        jobs = getattr(args, 'jobs', None)
+        if jobs is not None and jobs < 1:
+            self.parser.error("Invalid job count: %s" % jobs)
+        relative = getattr(args, 'relative', None)
+        expr = Project.selected().experiment()
+        summary = load_baseline(expr.prefix)
+        trial = expr.trials(trial_numbers)[0]
+        data = cache.load_trial(trial, jobs)
+        metric = getattr(args, 'metric', data.metrics[0])
+        regressions = check_regressions(summary, data, metric, args.field, 
+                                        absolute=getattr(args, 'absolute', None),
+                                        relative=relative / 100.0 if relative is not None else None,
+                                        sigmas=getattr(args, 'sigma', None),
+                                        min_percent=args.min_percent,
+                                        functions=not getattr(args, 'total_only', False))
+        baseline_trials = ', '.join(str(num) for num in summary['trials'])
+        if getattr(args, 'json', False):
+            print json.dumps({'trial': trial['number'], 'baseline_trials': summary['trials'], 'metric': metric,
+                              'field': args.field, 'regressions': regressions}, indent=2, sort_keys=True)
+        elif regressions:
+            title = "Trial %s %s %s regressions from baseline trial(s) %s" % (trial['number'], metric, args.field, 
+                                                                              baseline_trials)
+            rows = [['Function', 'Baseline', 'Limit', 'Trial %s' % trial['number'], 'Delta', 'Ratio']]
+            for reg in regressions:
+                rows.append([reg['name'], '%.4g' % reg['baseline'], '%.4g' % reg['limit'], '%.4g' % reg['value'],
+                             '%+.4g' % reg['delta'], 'N/A' if reg['ratio'] is None else '%.3f' % reg['ratio']])
+            print '\n'.join([util.hline(title, 'red'), draw_function_table(rows), ''])
+        if regressions:
+            if not getattr(args, 'json', False):
+                self.logger.error("Trial %s regressed from baseline trial(s) %s", trial['number'], baseline_trials)
+            return EXIT_FAILURE
+        if not getattr(args, 'json', False):
+            self.logger.info("Trial %s has no regressions from baseline trial(s) %s", trial['number'], baseline_trials)
+        return EXIT_SUCCESS
+
+
+COMMAND = TrialCheckCommand(__name__, 
+                            summary_fmt="Check a trial for performance regressions from the experiment's baseline.")
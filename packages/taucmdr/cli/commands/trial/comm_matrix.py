@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2016, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""``trial comm-matrix`` subcommand."""
+
+import json
+from taucmdr import EXIT_SUCCESS
+from taucmdr import util
+from taucmdr.cli import arguments
+from taucmdr.cli.command import AbstractCommand
+from taucmdr.model.project import Project
+from taucmdr.analysis import cache
+from taucmdr.analysis.comm_matrix import CommMatrix
+from taucmdr.cli.commands.trial.analyze import draw_function_table
+
+
+class TrialCommMatrixCommand(AbstractCommand):
+    """``trial comm-matrix`` subcommand."""
+    
+    def _construct_parser(self):
+        usage = "%s [trial_number] [arguments]" % self.command
+        parser = arguments.get_parser(prog=self.command, usage=usage, description=self.summary)
+        parser.add_argument('-n', '--count', 
+                            help="number of communicating rank pairs to show",
+                            metavar='<count>',
+                            type=int,
+                            default=10)
+        parser.add_argument('--sort', 
+                            help="rank pairs by bytes or messages sent",
+                            choices=('bytes', 'messages'),
+                            default='bytes')
+        parser.add_argument('--csv', 
+                            help="write the matrix as 'sender,receiver,messages,bytes' CSV",
+                            metavar='<path>',
+                            default=arguments.SUPPRESS)
+        parser.add_argument('--binary', 
+                            help="write the matrix in compact binary form",
+                            metavar='<path>',
+                            default=arguments.SUPPRESS)
+        parser.add_argument('--jobs', 
+                            help="number of processes parsing profiles (default: number of CPU cores)",
+                            metavar='<count>',
+                            type=int,
+                            default=arguments.SUPPRESS)
+        parser.add_argument('--json', 
+                            help="write the matrix summary as JSON",
+                            action='store_const',
+                            const=True,
+                            default=arguments.SUPPRESS)
+        parser.add_argument('trial_number', 
+                            help="show communication matrix of specified trial (default: most recent trial)",
+                            metavar='trial_number',
+                            nargs='?',
+                            default=arguments.SUPPRESS)
+        return parser
+
+    def main(self, argv):
+        args = self._parse_args(argv)
+        trial_numbers = []
+        if hasattr(args, 'trial_number'):
+            try:
+                trial_numbers.append(int(args.trial_number))
+            except ValueError:
+                self.parser.error("Invalid trial number: %s" % args.trial_number)
+        if args.count < 0:
+            self.parser.error("Invalid pair count: %s" % args.count)
+        jobs = getattr(args, 'jobs', None)
+        if jobs is not None and jobs < 1:
+            self.parser.error("Invalid job count: %s" % jobs)
+        expr = Project.selected().experiment()
+        trial = expr.trials(trial_numbers)[0]
+        matrix = CommMatrix.from_profile(cache.load_trial(trial, jobs))
+        if hasattr(args, 'csv'):
+            with open(args.csv, 'w') as fout:
+                matrix.write_csv(fout)
+            self.logger.info("Wrote communication matrix to '%s'", args.csv)
+        if hasattr(args, 'binary'):
+            with open(args.binary, 'wb') as fout:
+                matrix.write_binary(fout)
+            self.logger.info("Wrote communication matrix to '%s'", args.binary)
+        summary = matrix.summary()
+        pairs = matrix.top_pairs(args.count, args.sort)
+        if getattr(args, 'json', False):
+            print json.dumps({'trial': trial['number'], 'summary': summary, 'pairs': pairs}, 
+                             indent=2, sort_keys=True)
+            return EXIT_SUCCESS
+        rows = [['Statistic', 'Value'],
+                ['Ranks', str(summary['ranks'])],
+                ['Communicating pairs', '%d (%.1f%% dense)' % (summary['pairs'], 100 * summary['density'])],
+                ['Messages', '%d' % summary['messages']],
+                ['Bytes', '%.4g' % summary['bytes']],
+                ['Mean message size', '%.4g' % summary['mean_message_size']],
+                ['Max bytes sent by a rank', '%.4g' % summary['max_sent_bytes']],
+                ['Mean bytes sent by a rank', '%.4g' % summary['mean_sent_bytes']],
+                ['Send imbalance (max/mean)', '%.2f' % summary['send_imbalance']]]
+        parts = [util.hline("Trial %s: communication matrix" % trial['number'], 'cyan'), draw_function_table(rows)]
+        if pairs:
+            rows = [['Sender', 'Receiver', 'Messages', 'Bytes']]
+            rows.extend([str(pair['sender']), str(pair['receiver']), '%d' % pair['messages'], '%.4g' % pair['bytes']]
+                        for pair in pairs)
+            parts.extend([util.hline("Top %d pairs by %s" % (len(pairs), args.sort), 'cyan'),
+                          draw_function_table(rows)])
+        print '\n'.join(parts + [''])
+        return EXIT_SUCCESS
+
+
+COMMAND = TrialCommMatrixCommand(__name__, summary_fmt="Show a trial's point-to-point communication matrix.")
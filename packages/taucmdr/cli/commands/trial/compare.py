@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2016, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""``trial compare`` subcommand."""
+
+import json
+from taucmdr import EXIT_SUCCESS
+from taucmdr import util
+from taucmdr.cli import arguments
+from taucmdr.cli.command import AbstractCommand
+from taucmdr.model.project import Project
+from taucmdr.analysis import cache
+from taucmdr.analysis.compare import COMPARE_FIELDS, STATISTICS, SORT_KEYS, compare_profiles, sort_comparison
+from taucmdr.cli.commands.trial.analyze import draw_function_table
+
+
+class TrialCompareCommand(AbstractCommand):
+    """``trial compare`` subcommand."""
+    
+    def _construct_parser(self):
+        usage = "%s <baseline_trial> <trial_number> [trial_number...] [arguments]" % self.command
+        parser = arguments.get_parser(prog=self.command, usage=usage, description=self.summary)
+        parser.add_argument('--metric', 
+                            help="compare this metric (default: first metric in the baseline profile)",
+                            metavar='<metric>',
+                            default=arguments.SUPPRESS)
+        parser.add_argument('--field', 
+                            help="show and sort by this per-function value",
+                            metavar='<field>',
+                            choices=COMPARE_FIELDS,
+                            default='excl')
+        parser.add_argument('--statistic', 
+                            help="compare this statistic of each function's per-rank values",
+                            metavar='<statistic>',
+                            choices=STATISTICS,
+                            default='mean')
+        parser.add_argument('--sort', 
+                            help="sort functions by absolute change, relative change, baseline value, or name",
+                            metavar='<key>',
+                            choices=SORT_KEYS,
+                            default='delta')
+        parser.add_argument('--limit', 
+                            help="show only this many functions",
+                            metavar='<count>',
+                            type=int,
+                            default=arguments.SUPPRESS)
+        parser.add_argument('--jobs', 
+                            help="number of processes parsing profiles (default: number of CPU cores)",
+                            metavar='<count>',
+                            type=int,
+                            default=arguments.SUPPRESS)
+        parser.add_argument('--json', 
+                            help="write the comparison as JSON",
+                            action='store_const',
+                            const=True,
+                            default=arguments.SUPPRESS)
+        parser.add_argument('trial_numbers', 
+                            help="compare specified trials to the first specified trial",
+                            metavar='trial_number',
+                            nargs='+')
+        return parser
+
+    @staticmethod
+    def _format_table(trials, metric, field, statistic, rows):
+        numbers = [str(trial['number']) for trial in trials]
+        title = "%s %s %s compared to trial %s" % (metric, field, statistic, numbers[0])
+        headers = ['Function'] + ['Trial %s' % num for num in numbers]
+        for num in numbers[1:]:
+            headers.extend(['Delta %s' % num, 'Ratio %s' % num])
+        table_rows = [headers]
+        for row in rows:
+            comparison = row[field]
+            cells = [row['name']] + ['%.4g' % value for value in comparison['values']]
+            for delta, ratio in zip(comparison['deltas'], comparison['ratios']):
+                cells.extend(['%+.4g' % delta, 'N/A' if ratio is None else '%.3f' % ratio])
+            table_rows.append(cells)
+        return [util.hline(title, 'cyan'), draw_function_table(table_rows), '']
+
+    def main(self, argv):
+        args = self._parse_args(argv)
+        trial_numbers = []
+        for num in args.trial_numbers:
+            try:
+                trial_numbers.append(int(num))
+            except ValueError:
+                self.parser.error("Invalid trial number: %s" % num)
+        if len(trial_numbers) < 2:
+            self.parser.error("Specify a baseline trial and at least one trial to compare to it")
+        limit = getattr(args, 'limit', None)
+        if limit is not None and limit < 1:
+            self.parser.error("Invalid function count: %s" % limit)
+        jobs = getattr(args, 'jobs', None)
+        if jobs is not None and jobs < 1:
+            self.parser.error("Invalid job count: %s" % jobs)
+        expr = Project.selected().experiment()
+        trials = expr.trials(trial_numbers)
+        datasets = [cache.load_trial(trial, jobs) for trial in trials]
+        metric = getattr(args, 'metric', datasets[0].metrics[0])
+        rows = compare_profiles(datasets, metric, statistic=args.statistic)
+        rows = sort_comparison(rows, args.field, args.sort)[:limit]
+        if getattr(args, 'json', False):
+            print json.dumps({'trials': [trial['number'] for trial in trials], 'metric': metric, 
+                              'statistic': args.statistic, 'functions': rows}, indent=2, sort_keys=True)
+        else:
+            print '\n'.join(self._format_table(trials, metric, args.field, args.statistic, rows))
+        return EXIT_SUCCESS
+
+
+COMMAND = TrialCompareCommand(__name__, summary_fmt="Compare profiles of two or more trials.")
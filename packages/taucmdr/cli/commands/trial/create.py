@@ -27,6 +27,7 @@
 #
 """``trial create`` subcommand."""
 
+import os
 from taucmdr import util
 from taucmdr.error import ConfigurationError
 from taucmdr.cli import arguments
@@ -35,7 +36,16 @@ from taucmdr.model.trial import Trial
 from taucmdr.model.project import Project
 
 
-_LAUNCHERS = 'mpirun', 'mpiexec', 'ibrun', 'aprun', 'qsub', 'srun', 'oshrun'
+_LAUNCHERS = 'mpirun', 'mpiexec', 'ibrun', 'aprun', 'qsub', 'srun', 'oshrun', 'jsrun'
+
+# Flags that set the number of processes, by launcher.  Flags like srun's -c (CPUs per task) or 
+# aprun's -N (processes per node) mean something else to another launcher.  jsrun is handled separately.
+_RANK_FLAGS = {'mpirun': ('-np', '--np', '-n', '-c'),
+               'mpiexec': ('-np', '--np', '-n', '-c'),
+               'oshrun': ('-np', '--np', '-n'),
+               'ibrun': ('-np', '-n'),
+               'srun': ('-n', '--ntasks'),
+               'aprun': ('-n', '--pes')}
 
 
 class TrialCreateCommand(CreateCommand):
@@ -69,6 +79,11 @@ class TrialCreateCommand(CreateCommand):
                             metavar='<command>',
                             nargs=arguments.REMAINDER,
                             default=arguments.SUPPRESS)
+        parser.add_argument('--monitor',
+                            help="report how quickly trial data is written while the command runs",
+                            action='store_const',
+                            const=True,
+                            default=arguments.SUPPRESS)
         return parser
     
     def _detect_launcher(self, application_cmd):
@@ -98,16 +113,53 @@ class TrialCreateCommand(CreateCommand):
         self.logger.debug('Application: %s', application_cmd)
         return launcher_cmd, application_cmd
 
+    @staticmethod
+    def _flag_value(launcher_cmd, flags):
+        """Returns the integer value of the first of `flags` on the launcher command line, or None."""
+        for idx, arg in enumerate(launcher_cmd[1:], 1):
+            flag, _, value = arg.partition('=')
+            if flag not in flags:
+                continue
+            if not value and idx + 1 < len(launcher_cmd):
+                value = launcher_cmd[idx+1]
+            try:
+                return int(value)
+            except ValueError:
+                continue
+        return None
+
+    def _launcher_ranks(self, launcher_cmd):
+        """Returns the number of processes the launcher will start, or None if unknown."""
+        if not launcher_cmd:
+            return None
+        launcher = os.path.basename(launcher_cmd[0])
+        # Versioned launchers like mpirun.openmpi or mpiexec.hydra take the same flags
+        launcher = launcher if launcher in _RANK_FLAGS else launcher.split('.')[0]
+        if launcher == 'jsrun':
+            # jsrun starts a number of tasks in each of a number of resource sets unless told the total
+            ranks = self._flag_value(launcher_cmd, ('-p', '--np'))
+            if ranks is None:
+                resource_sets = self._flag_value(launcher_cmd, ('-n', '--nrs'))
+                if resource_sets is not None:
+                    ranks = resource_sets * (self._flag_value(launcher_cmd, ('-a', '--tasks_per_rs')) or 1)
+        else:
+            ranks = self._flag_value(launcher_cmd, _RANK_FLAGS.get(launcher, ()))
+        if ranks is not None:
+            self.logger.debug('Launcher ranks: %d', ranks)
+        return ranks
+
     def main(self, argv):
         args = self._parse_args(argv)
         description = getattr(args, 'description', None)
+        monitor = getattr(args, 'monitor', False)
         application_cmd = [args.cmd] + args.cmd_args
         try:
             launcher_cmd = args.launcher
         except AttributeError:
             launcher_cmd, application_cmd = self._detect_launcher(application_cmd)
+        ranks = self._launcher_ranks(launcher_cmd)
         expr = Project.selected().experiment()
-        return expr.managed_run(launcher_cmd, application_cmd, description)
+        return expr.managed_run(launcher_cmd, application_cmd, description, monitor, ranks)
 
 
 COMMAND = TrialCreateCommand(Trial, __name__, summary_fmt="Create new trial of the selected experiment.")
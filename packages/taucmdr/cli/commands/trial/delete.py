@@ -32,6 +32,7 @@ from taucmdr.cli import arguments
 from taucmdr.cli.cli_view import DeleteCommand
 from taucmdr.model.trial import Trial
 from taucmdr.model.project import Project
+from taucmdr.cf.storage.trash import start_background_purge
 
 
 class TrialDeleteCommand(DeleteCommand):
@@ -60,6 +61,7 @@ class TrialDeleteCommand(DeleteCommand):
             self.parser.error("No trial number %s in the current experiment.  "
                               "See `trial list` to see all trial numbers." % number)
         trial_ctrl.delete(fields)
+        start_background_purge(trial_ctrl.storage)
         self.logger.info('Deleted trial %s', number)
         return EXIT_SUCCESS
 
@@ -32,6 +32,8 @@ from taucmdr import EXIT_SUCCESS
 from taucmdr.cli import arguments
 from taucmdr.cli.command import AbstractCommand
 from taucmdr.model.project import Project
+from taucmdr.model.trial import export_trials, DEFAULT_EXPORT_JOBS
+from taucmdr.analysis import flamegraph
 
 
 class TrialExportCommand(AbstractCommand):
@@ -44,6 +46,27 @@ class TrialExportCommand(AbstractCommand):
                             help="location to store exported trial data",
                             metavar='<path>',
                             default=os.getcwd())
+        parser.add_argument('--jobs', 
+                            help="number of concurrent export jobs (default: at most %d)" % DEFAULT_EXPORT_JOBS,
+                            metavar='<count>',
+                            type=int,
+                            default=arguments.SUPPRESS)
+        parser.add_argument('--native', 
+                            help="write PPK files without ParaProf (faster, does not require Java)",
+                            action='store_const',
+                            const=True,
+                            default=arguments.SUPPRESS)
+        parser.add_argument('--format', 
+                            help=("export the trial data files, callpath profiles as folded stacks, "
+                                  "or callpath profiles as an SVG flame graph"),
+                            metavar='<format>',
+                            choices=('data',) + flamegraph.FLAMEGRAPH_FORMATS,
+                            default='data')
+        parser.add_argument('--per-rank', 
+                            help="write folded stacks for each rank instead of summing over ranks",
+                            action='store_const',
+                            const=True,
+                            default=arguments.SUPPRESS)
         parser.add_argument('trial_numbers', 
                             help="show details for specified trials",
                             metavar='trial_number',
@@ -59,9 +82,19 @@ class TrialExportCommand(AbstractCommand):
                 trial_numbers.append(int(num))
             except ValueError:
                 self.parser.error("Invalid trial number: %s" % num)
+        jobs = getattr(args, 'jobs', None)
+        if jobs is not None and jobs < 1:
+            self.parser.error("Invalid job count: %s" % jobs)
+        per_rank = getattr(args, 'per_rank', False)
+        if per_rank and args.format != 'folded':
+            self.parser.error("--per-rank requires --format folded")
         expr = Project.selected().experiment()
-        for trial in expr.trials(trial_numbers):
-            trial.export(args.destination)
+        trials = expr.trials(trial_numbers)
+        if args.format == 'data':
+            export_trials(trials, args.destination, jobs, getattr(args, 'native', False))
+        else:
+            for trial in trials:
+                flamegraph.export_trial(trial, args.destination, args.format, per_rank, jobs)
         return EXIT_SUCCESS
 
 
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2017, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""Test functions.
+
+Functions used for unit tests of analyze.py.
+"""
+
+import json
+from taucmdr import tests, EXIT_SUCCESS
+from taucmdr.cf.compiler.host import CC
+from taucmdr.cli.commands.trial.create import COMMAND as trial_create_cmd
+from taucmdr.cli.commands.trial.analyze import COMMAND as trial_analyze_cmd
+
+
+class AnalyzeTest(tests.TestCase):
+    """Tests for :any:`trial.analyze`."""
+
+    def test_analyze(self):
+        self.reset_project_storage(['--profile', 'tau', '--trace', 'none'])
+        self.assertManagedBuild(0, CC, [], 'hello.c')
+        self.assertCommandReturnValue(EXIT_SUCCESS, trial_create_cmd, ['./a.out'])
+        stdout, _ = self.assertCommandReturnValue(EXIT_SUCCESS, trial_analyze_cmd, ['0'])
+        self.assertIn('Max/Mean', stdout)
+        self.assertIn('main', stdout)
+
+    def test_analyze_json(self):
+        self.reset_project_storage(['--profile', 'tau', '--trace', 'none'])
+        self.assertManagedBuild(0, CC, [], 'hello.c')
+        self.assertCommandReturnValue(EXIT_SUCCESS, trial_create_cmd, ['./a.out'])
+        stdout, _ = self.assertCommandReturnValue(EXIT_SUCCESS, trial_analyze_cmd, 
+                                                  ['--json', '--percentiles', '25', '75'])
+        results = json.loads(stdout)
+        self.assertEqual(len(results), 1)
+        self.assertEqual(results[0]['field'], 'excl')
+        self.assertIn('p75', results[0]['functions'][0])
+
+    def test_analyze_cluster(self):
+        self.reset_project_storage(['--profile', 'tau', '--trace', 'none'])
+        self.assertManagedBuild(0, CC, [], 'hello.c')
+        self.assertCommandReturnValue(EXIT_SUCCESS, trial_create_cmd, ['./a.out'])
+        stdout, _ = self.assertCommandReturnValue(EXIT_SUCCESS, trial_analyze_cmd, ['--cluster', '--json'])
+        results = json.loads(stdout)
+        self.assertEqual(results[0]['clusters'][0]['ranks'], [0])
+        self.assertListEqual(results[0]['outliers'], [])
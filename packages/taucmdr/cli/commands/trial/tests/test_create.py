@@ -30,13 +30,15 @@
 Functions used for unit tests of create.py.
 """
 
-from taucmdr import tests
+import os
+from taucmdr import tests, configuration
 from taucmdr.cf.platforms import HOST_ARCH
 from taucmdr.cf.compiler.host import CC
 from taucmdr.cli.commands.trial.create import COMMAND as create_cmd
 from taucmdr.cli.commands.measurement.create import COMMAND as measurement_create_cmd
 from taucmdr.cli.commands.experiment.create import COMMAND as experiment_create_cmd
 from taucmdr.cli.commands.experiment.select import COMMAND as SELECT_COMMAND
+from taucmdr.model.project import Project
 
 class CreateTest(tests.TestCase):
     """Tests for :any:`trial.create`."""
@@ -64,6 +66,39 @@ class CreateTest(tests.TestCase):
         self.assertIn('profile files', stdout)
         self.assertFalse(stderr)
         
+    @tests.skipIf(HOST_ARCH.is_bluegene(), "Test skipped on BlueGene")
+    def test_create_staged(self):
+        self.reset_project_storage()
+        self.assertManagedBuild(0, CC, [], 'hello.c')
+        stage_prefix = os.path.join(tests.get_test_workdir(), 'stage')
+        configuration.put('trial.staging_prefix', stage_prefix)
+        try:
+            stdout, stderr = self.assertCommandReturnValue(0, create_cmd, ['./a.out'])
+        finally:
+            configuration.delete('trial.staging_prefix')
+        self.assertIn('Draining', stdout)
+        self.assertIn('Trial 0 produced', stdout)
+        self.assertFalse(stderr)
+        trial = Project.selected().experiment().trials([0])[0]
+        self.assertTrue(os.path.isfile(os.path.join(trial.prefix, 'profile.0.0.0')))
+        self.assertListEqual(os.listdir(stage_prefix), [])
+
+    def test_launcher_ranks(self):
+        # pylint: disable=protected-access
+        self.assertEqual(create_cmd._launcher_ranks(['mpirun', '-np', '4']), 4)
+        self.assertEqual(create_cmd._launcher_ranks(['srun', '-N', '2', '--ntasks=64']), 64)
+        self.assertEqual(create_cmd._launcher_ranks(['aprun', '-d', '2', '-n', '16']), 16)
+        self.assertEqual(create_cmd._launcher_ranks(['/usr/bin/mpiexec.hydra', '-n', '8']), 8)
+        self.assertEqual(create_cmd._launcher_ranks(['mpirun', '-c', '12']), 12)
+        # srun's -c is CPUs per task, not a process count
+        self.assertEqual(create_cmd._launcher_ranks(['srun', '-c', '8', '-n', '2048']), 2048)
+        self.assertIsNone(create_cmd._launcher_ranks(['srun', '-c', '8']))
+        self.assertEqual(create_cmd._launcher_ranks(['jsrun', '--nrs', '6', '-c', '7']), 6)
+        self.assertEqual(create_cmd._launcher_ranks(['jsrun', '-n', '4', '-a', '6', '-c', '6']), 24)
+        self.assertEqual(create_cmd._launcher_ranks(['jsrun', '--np=96', '-n', '4']), 96)
+        self.assertIsNone(create_cmd._launcher_ranks(['qsub', 'job.sh']))
+        self.assertIsNone(create_cmd._launcher_ranks([]))
+
     def test_h_arg(self):
         self.reset_project_storage()
         stdout, _ = self.assertCommandReturnValue(0, create_cmd, ['-h'])
@@ -103,3 +103,25 @@ class ExportTest(tests.TestCase):
         self.assertCommandReturnValue(EXIT_SUCCESS, trial_export_cmd, [])
         export_file = expr['name'] + '.trial0.tgz'
         self.assertTrue(os.path.exists(export_file))
+
+    def test_export_parallel(self):
+        self.reset_project_storage(['--profile', 'tau', '--trace', 'none'])
+        expr = Project.selected().experiment()
+        self.assertManagedBuild(0, CC, [], 'hello.c')
+        self.assertCommandReturnValue(EXIT_SUCCESS, trial_create_cmd, ['./a.out'])
+        self.assertCommandReturnValue(EXIT_SUCCESS, trial_create_cmd, ['./a.out'])
+        self.assertCommandReturnValue(EXIT_SUCCESS, trial_export_cmd, ['--jobs', '2', '0', '1'])
+        for num in 0, 1:
+            self.assertTrue(os.path.exists(expr['name'] + '.trial%d.ppk' % num))
+
+    def test_export_folded(self):
+        self.reset_project_storage(['--profile', 'tau', '--trace', 'none', '--callpath', '100'])
+        expr = Project.selected().experiment()
+        self.assertManagedBuild(0, CC, [], 'hello.c')
+        self.assertCommandReturnValue(EXIT_SUCCESS, trial_create_cmd, ['./a.out'])
+        self.assertCommandReturnValue(EXIT_SUCCESS, trial_export_cmd, ['--format', 'folded'])
+        export_file = expr['name'] + '.trial0.folded'
+        with open(export_file) as fin:
+            self.assertIn('main', fin.read())
+        self.assertCommandReturnValue(EXIT_SUCCESS, trial_export_cmd, ['--format', 'svg'])
+        self.assertTrue(os.path.exists(expr['name'] + '.trial0.svg'))
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2016, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""Test functions.
+
+Functions used for unit tests of unpack.py.
+"""
+
+import os
+from taucmdr import tests, EXIT_SUCCESS
+from taucmdr.cf.compiler.host import CC
+from taucmdr.cli.commands.trial.create import COMMAND as trial_create_cmd
+from taucmdr.cli.commands.trial.pack import COMMAND as trial_pack_cmd
+from taucmdr.cli.commands.trial.unpack import COMMAND as trial_unpack_cmd
+from taucmdr.model.project import Project
+from taucmdr.model.trial import CONTAINER_FILENAME
+
+
+class UnpackTest(tests.TestCase):
+    """Tests for :any:`trial.unpack`."""
+
+    def test_pack_unpack(self):
+        self.reset_project_storage(['--profile', 'tau', '--trace', 'none'])
+        expr = Project.selected().experiment()
+        self.assertManagedBuild(0, CC, [], 'hello.c')
+        self.assertCommandReturnValue(EXIT_SUCCESS, trial_create_cmd, ['./a.out'])
+        self.assertCommandReturnValue(EXIT_SUCCESS, trial_pack_cmd, ['0'])
+        trial = expr.trials([0])[0]
+        self.assertTrue(trial.is_compact())
+        self.assertIn('profile.0.0.0', trial.data_members())
+        with trial.open_data_file('profile.0.0.0') as fin:
+            self.assertIn('templated_functions', fin.readline())
+        self.assertCommandReturnValue(EXIT_SUCCESS, trial_unpack_cmd, ['0'])
+        trial = expr.trials([0])[0]
+        self.assertFalse(trial.is_compact())
+        self.assertNotIn(CONTAINER_FILENAME, os.listdir(trial.prefix))
+        self.assertTrue(os.path.isfile(os.path.join(trial.prefix, 'profile.0.0.0')))
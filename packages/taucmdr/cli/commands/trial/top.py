@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2016, ParaTools, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# (1) Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# (2) Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# (3) Neither the name of ParaTools, Inc. nor the names of its contributors may
+#     be used to endorse or promote products derived from this software without
+#     specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+"""``trial top`` subcommand."""
+
+import json
+from taucmdr import EXIT_SUCCESS
+from taucmdr import util
+from taucmdr.cli import arguments
+from taucmdr.cli.command import AbstractCommand
+from taucmdr.model.project import Project
+from taucmdr.analysis import cache
+from taucmdr.analysis.profile import FUNCTION_FIELDS
+from taucmdr.analysis.statistics import top_functions, top_function_threads
+from taucmdr.cli.commands.trial.analyze import draw_function_table
+
+
+class TrialTopCommand(AbstractCommand):
+    """``trial top`` subcommand."""
+    
+    def _construct_parser(self):
+        usage = "%s [trial_number] [arguments]" % self.command
+        parser = arguments.get_parser(prog=self.command, usage=usage, description=self.summary)
+        parser.add_argument('-n', '--count', 
+                            help="number of hotspots to show",
+                            metavar='<count>',
+                            type=int,
+                            default=20)
+        parser.add_argument('--metric', 
+                            help="rank hotspots by this metric (default: first metric in the profile)",
+                            metavar='<metric>',
+                            default=arguments.SUPPRESS)
+        parser.add_argument('--field', 
+                            help="rank hotspots by this per-function value",
+                            metavar='<field>',
+                            choices=FUNCTION_FIELDS,
+                            default='excl')
+        group = parser.add_mutually_exclusive_group()
+        group.add_argument('--rank', 
+                           help="only show hotspots on this rank",
+                           metavar='<rank>',
+                           type=int,
+                           default=arguments.SUPPRESS)
+        group.add_argument('--per-rank', 
+                           help="show the hottest functions on individual ranks instead of summing over ranks",
+                           action='store_const',
+                           const=True,
+                           default=arguments.SUPPRESS)
+        parser.add_argument('--callpath', 
+                            help="also rank callpath timers, which repeat time counted by flat timers",
+                            action='store_const',
+                            const=True,
+                            default=arguments.SUPPRESS)
+        parser.add_argument('--jobs', 
+                            help="number of processes parsing profiles (default: number of CPU cores)",
+                            metavar='<count>',
+                            type=int,
+                            default=arguments.SUPPRESS)
+        parser.add_argument('--json', 
+                            help="write hotspots as JSON",
+                            action='store_const',
+                            const=True,
+                            default=arguments.SUPPRESS)
+        parser.add_argument('trial_number', 
+                            help="show hotspots of specified trial (default: most recent trial)",
+                            metavar='trial_number',
+                            nargs='?',
+                            default=arguments.SUPPRESS)
+        return parser
+
+    def main(self, argv):
+        args = self._parse_args(argv)
+        trial_numbers = []
+        if hasattr(args, 'trial_number'):
+            try:
+                trial_numbers.append(int(args.trial_number))
+            except ValueError:
+                self.parser.error("Invalid trial number: %s" % args.trial_number)
+        if args.count < 1:
+            self.parser.error("Invalid hotspot count: %s" % args.count)
+        jobs = getattr(args, 'jobs', None)
+        if jobs is not None and jobs < 1:
+            self.parser.error("Invalid job count: %s" % jobs)
+        rank = getattr(args, 'rank', None)
+        per_rank = getattr(args, 'per_rank', False)
+        expr = Project.selected().experiment()
+        trial = expr.trials(trial_numbers)[0]
+        # Without a cache only the selected rank's profiles are parsed
+        data = cache.load_trial(trial, jobs, nodes=None if rank is None else set([rank]))
+        metric = getattr(args, 'metric', data.metrics[0])
+        callpath = getattr(args, 'callpath', False)
+        if per_rank:
+            hotspots = top_function_threads(data, args.count, metric, args.field, callpath)
+            rows = [['Function', 'Rank', 'Thread', 'Value']]
+            rows.extend([spot['name'], str(spot['thread'][0]), '%d.%d' % spot['thread'][1:], '%.4g' % spot['value']] 
+                        for spot in hotspots)
+        else:
+            hotspots = top_functions(data, args.count, metric, args.field, rank, callpath)
+            rows = [['Function', 'Value', '%Total']]
+            rows.extend([spot['name'], '%.4g' % spot['value'], '%.1f' % spot['percent']] for spot in hotspots)
+        if getattr(args, 'json', False):
+            print json.dumps({'trial': trial['number'], 'metric': metric, 'field': args.field, 'rank': rank,
+                              'hotspots': hotspots}, indent=2, sort_keys=True)
+        else:
+            where = 'on rank %d' % rank if rank is not None else 'per rank' if per_rank else 'on all ranks'
+            title = "Trial %s: top %d %s %s %s" % (trial['number'], args.count, metric, args.field, where)
+            print '\n'.join([util.hline(title, 'cyan'), draw_function_table(rows), ''])
+        return EXIT_SUCCESS
+
+
+COMMAND = TrialTopCommand(__name__, summary_fmt="Show the functions where a trial spent the most time.")
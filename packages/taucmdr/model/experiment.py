@@ -40,6 +40,7 @@ from taucmdr.mvc.model import Model
 from taucmdr.model.trial import Trial
 from taucmdr.model.project import Project
 from taucmdr.cf.storage.levels import PROJECT_STORAGE, highest_writable_storage
+from taucmdr.cf.storage.trash import move_to_trash
 
 
 LOGGER = logger.get_logger(__name__)
@@ -90,6 +91,10 @@ def attributes():
         'tau_makefile': {
             'type': 'string',
             'description': 'TAU Makefile used during this experiment, if any.'
+        },
+        'baseline_trials': {
+            'type': 'array',
+            'description': "numbers of the trials summarized in this experiment's performance baseline"
         }
     }
 
@@ -185,8 +190,9 @@ class Experiment(Model):
                                      'Check that you have `write` access')
 
     def on_delete(self):
+        # Data is removed later by the trash purger so the storage transaction isn't held open
         try:
-            util.rmtree(self.prefix)
+            move_to_trash(self.prefix, self.storage)
         except Exception as err:  # pylint: disable=broad-except
             if os.path.exists(self.prefix):
                 LOGGER.error("Could not remove experiment data at '%s': %s", self.prefix, err)
@@ -194,6 +200,31 @@ class Experiment(Model):
     def data_size(self):
         return sum([int(trial.get('data_size', 0)) for trial in self.populate('trials')])
 
+    def set_baseline(self, trials, nprocs=None):
+        """Summarize trials as the experiment's performance baseline.
+        
+        The summary is stored in the experiment directory, see :any:`taucmdr.analysis.baseline`.
+        
+        Args:
+            trials (list): Baseline trials.
+            nprocs (int): Number of processes parsing profiles.
+            
+        Returns:
+            dict: The baseline summary.
+        """
+        from taucmdr.analysis import baseline, cache
+        numbers = sorted(trial['number'] for trial in trials)
+        summary = baseline.summarize([cache.load_trial(trial, nprocs) for trial in trials], numbers)
+        baseline.save_baseline(self.prefix, summary)
+        self.controller(self.storage).update({'baseline_trials': numbers}, self.eid)
+        return summary
+
+    def unset_baseline(self):
+        """Remove the experiment's performance baseline."""
+        from taucmdr.analysis import baseline
+        baseline.remove_baseline(self.prefix)
+        self.controller(self.storage).unset(['baseline_trials'], self.eid)
+
     def next_trial_number(self):
         trials = self.populate('trials')
         for i, j in enumerate(sorted([trial['number'] for trial in trials])):
@@ -310,7 +341,7 @@ class Experiment(Model):
                         proj['name'], ' '.join(tau.force_tau_options))
         return tau.compile(installed_compiler, compiler_args)
 
-    def managed_run(self, launcher_cmd, application_cmd, description):
+    def managed_run(self, launcher_cmd, application_cmd, description, monitor=False, ranks=None):
         """Uses this experiment to run an application command.
 
         Performs all relevent system preparation tasks to run the user's application
@@ -320,6 +351,8 @@ class Experiment(Model):
             launcher_cmd (list): Application launcher with command line arguments.
             application_cmd (list): Application executable with command line arguments.
             description (str): If not None, a description of the run.
+            monitor (bool): If True, report the trial data write rate while the application runs.
+            ranks (int): Number of processes started by the launcher, or None if unknown.
 
         Raises:
             ConfigurationError: The experiment is not configured to perform the desired run.
@@ -331,8 +364,10 @@ class Experiment(Model):
         if not command:
             raise ConfigurationError("Cannot find executable: %s" % application_cmd[0])
         tau = self.configure()
+        tau.ranks = ranks
         cmd, env = tau.get_application_command(launcher_cmd, application_cmd)
-        return Trial.controller(self.storage).perform(self, cmd, os.getcwd(), env, description)
+        return Trial.controller(self.storage).perform(self, cmd, os.getcwd(), env, description, monitor, 
+                                                      tau.resolve_profile_format(), ranks, bool(launcher_cmd))
 
     def trials(self, trial_numbers=None):
         """Get a list of modeled trial records.
@@ -350,8 +385,8 @@ class Experiment(Model):
             ConfigurationError: Invalid trial number or no trials in selected experiment.
         """
         if trial_numbers:
+            trials = []
             for num in trial_numbers:
-                trials = []
                 found = Trial.controller(self.storage).one({'experiment': self.eid, 'number': num})
                 if not found:
                     raise ConfigurationError("Experiment '%s' has no trial with number %s" % (self.name, num))
@@ -94,7 +94,7 @@ def attributes():
                          'group': 'output format',
                          'metavar': '<format>',
                          'nargs': '?',
-                         'choices': ('tau', 'merged', 'cubex', 'none'),
+                         'choices': ('tau', 'merged', 'cubex', 'auto', 'none'),
                          'const': 'tau'},
             'compat': {'cubex': (Target.exclude('scorep_source', None),
                                  Application.require('mpi', True),
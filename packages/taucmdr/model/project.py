@@ -39,6 +39,7 @@ from taucmdr.error import InternalError, ProjectSelectionError, ExperimentSelect
 from taucmdr.mvc.model import Model
 from taucmdr.mvc.controller import Controller
 from taucmdr.cf.storage.levels import PROJECT_STORAGE
+from taucmdr.cf.storage.blob import BlobStore
 
 
 LOGGER = logger.get_logger(__name__)
@@ -187,6 +188,14 @@ class Project(Model):
     @property
     def prefix(self):
         return os.path.join(self.storage.prefix, self['name'])
+
+    def blob_store(self):
+        """Gets the project's content-addressed blob store.
+        
+        Returns:
+            BlobStore: Blob store in the project prefix.
+        """
+        return BlobStore(os.path.join(self.prefix, 'blobs'))
         
     def experiment(self):
         """Gets the currently selected experiment configuration.
@@ -31,8 +31,68 @@ Functions used for unit tests of trial.py.
 """
 
 
+import os
 from taucmdr import tests
+from taucmdr.cf.storage import StorageRecord
+from taucmdr.model.trial import Trial, TrialDataMonitor, TrialError, _export_worker
 
 @tests.not_implemented
 class TrialTest(tests.TestCase):
     pass
+
+
+class TrialDataMonitorTest(tests.TestCase):
+    """Tests for :any:`trial.TrialDataMonitor`."""
+
+    def test_scan(self):
+        prefix = os.path.join(tests.get_test_workdir(), 'monitor')
+        os.makedirs(os.path.join(prefix, 'MULTI__TIME'))
+        monitor = TrialDataMonitor(prefix, expected_duration=3600)
+        self.assertEqual(monitor.scan(), (0, 0))
+        with open(os.path.join(prefix, 'tautrace.0.0.0.trc'), 'w') as fout:
+            fout.write('x'*100)
+        with open(os.path.join(prefix, 'MULTI__TIME', 'profile.0.0.0'), 'w') as fout:
+            fout.write('x'*10)
+        self.assertEqual(monitor.scan(), (2, 110))
+        with open(os.path.join(prefix, 'tautrace.0.0.0.trc'), 'a') as fout:
+            fout.write('x'*50)
+        self.assertEqual(monitor.scan(), (2, 160))
+        self.assertGreaterEqual(monitor.estimated_size(), 160)
+        self.assertIn('2 files', monitor.status())
+
+    def test_no_estimate(self):
+        monitor = TrialDataMonitor(tests.get_test_workdir())
+        monitor.scan()
+        self.assertIsNone(monitor.estimated_size())
+
+
+class DrainedRanksTest(tests.TestCase):
+    """Tests for :any:`Trial._check_drained_ranks`."""
+    # pylint: disable=protected-access
+
+    def test_all_ranks(self):
+        trial = Trial(StorageRecord(None, 1, {'number': 0, 'ranks': 2}))
+        trial._check_drained_ranks({'profile.0.0.0': 10, 'profile.1.0.0': 10, 'profile.1.0.1': 10}, None)
+        trial._check_drained_ranks({os.path.join('MULTI__TIME', 'profile.0.0.0'): 10, 
+                                    'tautrace.1.0.0.trc': 10, 'events.1.edf': 10}, None)
+
+    def test_missing_ranks(self):
+        # Ranks on other nodes wrote to their own node-local staging directory
+        trial = Trial(StorageRecord(None, 1, {'number': 0, 'ranks': 4}))
+        self.assertRaises(TrialError, trial._check_drained_ranks, {'profile.0.0.0': 10, 'profile.1.0.0': 10}, None)
+
+    def test_unchecked(self):
+        Trial(StorageRecord(None, 1, {'number': 0}))._check_drained_ranks({'profile.0.0.0': 10}, None)
+        Trial(StorageRecord(None, 1, {'number': 0, 'ranks': 4}))._check_drained_ranks({'tauprofile.xml': 10}, None)
+
+
+class ExportWorkerTest(tests.TestCase):
+    """Tests for :any:`trial._export_worker`."""
+
+    def test_error(self):
+        export_file = os.path.join(tests.get_test_workdir(), 'bogus')
+        result, error = _export_worker((('bogus', tests.get_test_workdir(), export_file), 1, True))
+        self.assertIsNone(result)
+        value, hints = error
+        self.assertIn('bogus', value)
+        self.assertIsInstance(hints, (list, tuple))
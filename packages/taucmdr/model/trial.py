@@ -32,20 +32,56 @@ record completely describes the hardware and software environment that produced
 the performance data.
 """
 
+import re
 import os
 import glob
+import fnmatch
 import errno
+import time
+import shutil
+import tempfile
+import threading
+import multiprocessing
+from multiprocessing.pool import ThreadPool
 from datetime import datetime
-from taucmdr import logger, util
-from taucmdr.error import ConfigurationError, InternalError
+from zipfile import ZipFile
+from taucmdr import logger, util, configuration
+from taucmdr.error import Error, ConfigurationError, InternalError
 from taucmdr.progress import ProgressIndicator
 from taucmdr.mvc.controller import Controller
 from taucmdr.mvc.model import Model
-from taucmdr.cf.software.tau_installation import TauInstallation
+from taucmdr.cf.software.tau_installation import TauInstallation, auto_profile_threshold
+from taucmdr.cf.software.installation import tmpfs_prefix
+from taucmdr.cf import tau_profile
+from taucmdr.cf.pack import TrialPack
+from taucmdr.cf.storage.trash import move_to_trash
+from taucmdr.cf.storage.retention import enforce_if_needed
 
 
 LOGGER = logger.get_logger(__name__)
 
+CONTAINER_FILENAME = 'trial.zip'
+
+_PARTIAL_SUFFIX = '.partial'
+
+ANALYSIS_CACHE_FILENAME = 'analysis.cache'
+
+DEFAULT_EXPORT_JOBS = 4
+
+_UNPACKED_PREFIXES = {}
+
+_OPEN_PACKS = {}
+
+# Filesystems that every node of a cluster can see.  Data staged anywhere else by a multi-node run
+# would be written to each node's own filesystem where the launch node can't drain it.
+_SHARED_FILESYSTEMS = frozenset(['nfs', 'nfs4', 'lustre', 'gpfs', 'beegfs', 'fhgfs', 'cephfs', 'ceph', 'panfs', 
+                                 'glusterfs', 'fuse.glusterfs', 'cifs', 'smb3', 'dvs', 'wekafs', 'pvfs2', 'orangefs'])
+
+# Per-rank profile and trace file names, e.g. profile.3.0.0 or tautrace.3.0.0.trc
+_RANK_FILE_RE = re.compile(r'(?:^|/)(?:profile|tautrace)\.(\d+)\.\d+\.\d+(?:\.trc)?$')
+
+TRACE_PATTERNS = ('*.trc', '*.edf', 'tau.slog2', 'traces', 'traces.def', 'traces.otf2')
+
 
 def attributes():
     from taucmdr.model.experiment import Experiment
@@ -74,7 +110,7 @@ def attributes():
         'environment': {
             'type': 'string',
             'required': True,
-            'description': "shell environment the trial was performed in"
+            'description': "digest of the shell environment the trial was performed in"
         },
         'begin_time': {
             'type': 'datetime',
@@ -92,6 +128,26 @@ def attributes():
             'type': 'integer',
             'description': "the size in bytes of the trial data"
         },
+        'ranks': {
+            'type': 'integer',
+            'description': "number of processes started by the application launcher"
+        },
+        'profile_format': {
+            'type': 'string',
+            'description': "format of the profiles written by the trial"
+        },
+        'container': {
+            'type': 'string',
+            'description': "compressed file holding the trial data, relative to the trial directory"
+        },
+        'container_size': {
+            'type': 'integer',
+            'description': "the size in bytes of the compressed file holding the trial data"
+        },
+        'traces_dropped': {
+            'type': 'boolean',
+            'description': "trace data was removed by a retention policy"
+        },
         'description': {
             'type': 'string',
             'argparse': {'flags': ('--description',),
@@ -111,6 +167,158 @@ class TrialError(ConfigurationError):
                    " send '%(logfile)s' to  %(contact)s for assistance.")
 
 
+def _parse_time(value):
+    """Parse a timestamp recorded by :any:`TrialController.perform`, i.e. ``str(datetime.utcnow())``."""
+    for fmt in '%Y-%m-%d %H:%M:%S.%f', '%Y-%m-%d %H:%M:%S':
+        try:
+            return datetime.strptime(value, fmt)
+        except (TypeError, ValueError):
+            continue
+    return None
+
+
+class TrialDataMonitor(object):
+    """Report how quickly a trial's data directory grows while the trial is running.
+
+    The trial prefix is scanned incrementally: a directory is only listed if its modification time 
+    changed since the last scan and only new files or files that grew during the previous scan are 
+    checked again.  Every `full_scan_period` scans all known files are checked so that files which 
+    start growing again after a pause are still counted.
+    
+    Attributes:
+        prefix (str): Directory to monitor, i.e. PROFILEDIR and TRACEDIR.
+        interval (float): Seconds between scans.
+        expected_duration (float): Expected length of the run in seconds, or None if unknown.
+        file_count (int): Number of files found by the most recent scan.
+        data_size (int): Total size in bytes of the files found by the most recent scan.
+        rate (float): Bytes per second written between the two most recent scans.
+    """
+    
+    def __init__(self, prefix, interval=5, expected_duration=None, full_scan_period=10):
+        self.prefix = prefix
+        self.interval = interval
+        self.expected_duration = expected_duration
+        self.full_scan_period = full_scan_period
+        self.file_count = 0
+        self.data_size = 0
+        self.rate = 0.0
+        self._dir_mtimes = {}
+        self._subdirs = {}
+        self._file_sizes = {}
+        self._active = set()
+        self._scan_count = 0
+        self._start_time = None
+        self._last_scan_time = None
+        self._flag = threading.Event()
+        self._thread = None
+
+    def _scan_dir(self, path, new_files):
+        try:
+            mtime = os.stat(path).st_mtime
+        except OSError:
+            return
+        if self._dir_mtimes.get(path) != mtime:
+            self._dir_mtimes[path] = mtime
+            subdirs = []
+            try:
+                names = os.listdir(path)
+            except OSError:
+                names = []
+            for name in names:
+                child = os.path.join(path, name)
+                if child in self._file_sizes:
+                    continue
+                if os.path.isdir(child):
+                    subdirs.append(child)
+                else:
+                    new_files.append(child)
+            self._subdirs[path] = subdirs
+        for child in self._subdirs.get(path, []):
+            self._scan_dir(child, new_files)
+
+    def scan(self):
+        """Update file count, data size, and write rate.
+        
+        Returns:
+            tuple: (file_count, data_size) after the scan.
+        """
+        now = time.time()
+        if self._start_time is None:
+            self._start_time = now
+        self._scan_count += 1
+        new_files = []
+        self._scan_dir(self.prefix, new_files)
+        if self._scan_count % self.full_scan_period == 0:
+            check = set(self._file_sizes)
+        else:
+            check = self._active
+        check.update(new_files)
+        active = set()
+        for path in check:
+            try:
+                size = os.path.getsize(path)
+            except OSError:
+                # File was removed or renamed, e.g. a profile with a negative node number
+                self._file_sizes.pop(path, None)
+                continue
+            if size != self._file_sizes.get(path):
+                self._file_sizes[path] = size
+                active.add(path)
+        self._active = active
+        data_size = sum(self._file_sizes.itervalues())
+        if self._last_scan_time is not None and now > self._last_scan_time:
+            self.rate = (data_size - self.data_size) / (now - self._last_scan_time)
+        self._last_scan_time = now
+        self.file_count = len(self._file_sizes)
+        self.data_size = data_size
+        return self.file_count, self.data_size
+
+    def estimated_size(self):
+        """Estimate the final size of the trial data.
+        
+        Assumes the current write rate continues until `expected_duration` seconds have elapsed.
+        
+        Returns:
+            int: Estimated final data size in bytes, or None if `expected_duration` is unknown.
+        """
+        if not self.expected_duration or self._start_time is None:
+            return None
+        remaining = max(self.expected_duration - (time.time() - self._start_time), 0)
+        return int(self.data_size + max(self.rate, 0) * remaining)
+
+    def status(self):
+        """Return a short human readable description of the data written so far."""
+        parts = ["%d files" % self.file_count, 
+                 util.human_size(self.data_size), 
+                 "%s/s" % util.human_size(self.rate)]
+        estimate = self.estimated_size()
+        if estimate is not None:
+            parts.append("est. %s" % util.human_size(estimate))
+        return ', '.join(parts)
+
+    def _monitor(self):
+        with ProgressIndicator(show_cpu=False) as progress_bar:
+            while True:
+                self.scan()
+                progress_bar.update(self.data_size, total_size=self.estimated_size() or 0, message=self.status())
+                if self._flag.wait(self.interval):
+                    break
+
+    def __enter__(self):
+        self._flag.clear()
+        self._thread = threading.Thread(target=self._monitor)
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._flag.set()
+        self._thread.join()
+        self._thread = None
+        LOGGER.info("Trial data: %s", self.status())
+        return False
+
+
 class TrialController(Controller):
     """Trial data controller."""
 
@@ -141,14 +349,14 @@ class TrialController(Controller):
             LOGGER.info("The job has been added to the queue.")
         return retval
 
-    def _perform_interactive(self, expr, trial, cmd, cwd, env):
-        def banner(mark, name, time):
-            headline = '\n{:=<{}}\n'.format('== %s %s at %s ==' % (mark, name, time), logger.LINE_WIDTH)
+    def _perform_interactive(self, expr, trial, cmd, cwd, env, monitor, stage_dir):
+        def banner(mark, name, timestamp):
+            headline = '\n{:=<{}}\n'.format('== %s %s at %s ==' % (mark, name, timestamp), logger.LINE_WIDTH)
             LOGGER.info(headline)
 
         banner('BEGIN', expr.name, trial['begin_time'])
         try:
-            retval = trial.execute_command(expr, cmd, cwd, env)
+            retval = trial.execute_command(expr, cmd, cwd, env, monitor, stage_dir)
         except:
             self.delete(trial.eid)
             raise
@@ -178,9 +386,23 @@ class TrialController(Controller):
         LOGGER.info('Current working directory: %s' %cwd)
         LOGGER.info('Data size: %s bytes' %data_size)
         LOGGER.info('Command: %s' %' '.join(cmd))
+        try:
+            auto_compact = configuration.get('trial.auto_compact')
+        except KeyError:
+            auto_compact = False
+        trial = self.one(trial.eid)
+        if (not auto_compact and trial.get('ranks') and trial.profile_format() == 'tau' and 
+                expr.populate('measurement').get('profile') == 'auto'):
+            # Pack per-thread profiles so large runs don't leave thousands of small files behind
+            auto_compact = trial['ranks'] >= auto_profile_threshold('pack')
+        if auto_compact and data_size != 0:
+            trial.compact()
+        enforce_if_needed(expr.populate('project'))
         return retval
 
-    def perform(self, expr, cmd, cwd, env, description):
+    # pylint: disable=too-many-arguments
+    def perform(self, expr, cmd, cwd, env, description, monitor=False, profile_format=None, ranks=None, 
+                launched=False):
         """Performs a trial of an experiment.
 
         Args:
@@ -189,29 +411,45 @@ class TrialController(Controller):
             cwd (str): Working directory to perform trial in.
             env (dict): Environment variables to set before performing the trial.
             description (str): Description of this trial.
+            monitor (bool): If True, report the trial data write rate while the command runs.
+            profile_format (str): Format of the profiles the command will write, or None to use the
+                                  measurement's profile format.
+            ranks (int): Number of processes started by the application launcher, or None if unknown.
+            launched (bool): If True, the command starts the application with a launcher like ``mpirun``
+                             so the application may run on many nodes.
         """
         trial_number = expr.next_trial_number()
         LOGGER.debug("New trial number is %d", trial_number)
+        # Store the environment before the trial data directories are added so that trials
+        # with otherwise identical environments share the same environment blob.
+        blobs = expr.populate('project').blob_store()
         data = {'number': trial_number,
                 'experiment': expr.eid,
                 'command': ' '.join(cmd),
                 'cwd': cwd,
-                'environment': 'FIXME',
+                'environment': blobs.put_json(env),
                 'begin_time': str(datetime.utcnow())}
         if description is not None:
             data['description'] = str(description)
+        if profile_format is not None:
+            data['profile_format'] = profile_format
+        if ranks is not None:
+            data['ranks'] = ranks
         trial = self.create(data)
-        # Tell TAU to send profiles and traces to the trial prefix
-        env['PROFILEDIR'] = trial.prefix
-        env['TRACEDIR'] = trial.prefix
+        targ = expr.populate('target')
+        # Batch jobs outlive this process so their data can't be drained from a staging directory
+        stage_dir = None if targ.architecture().is_bluegene() else trial.staging_dir(shared=launched)
+        # Tell TAU to send profiles and traces to the trial prefix or the staging directory
+        data_dir = stage_dir or trial.prefix
+        env['PROFILEDIR'] = data_dir
+        env['TRACEDIR'] = data_dir
         measurement = expr.populate('measurement')
         if measurement['trace'] == 'otf2' or measurement['profile'] == 'cubex':
-            env['SCOREP_EXPERIMENT_DIRECTORY'] = trial.prefix
-        targ = expr.populate('target')
+            env['SCOREP_EXPERIMENT_DIRECTORY'] = data_dir
         if targ.architecture().is_bluegene():
             return self._perform_bluegene(expr, trial, cmd, cwd, env)
         else:
-            return self._perform_interactive(expr, trial, cmd, cwd, env)
+            return self._perform_interactive(expr, trial, cmd, cwd, env, monitor, stage_dir)
 
 
 class Trial(Model):
@@ -234,24 +472,25 @@ class Trial(Model):
                                      'Check that you have write access')
 
     def on_delete(self):
+        # Data is removed later by the trash purger so the storage transaction isn't held open
         try:
-            util.rmtree(self.prefix)
+            move_to_trash(self.prefix, self.storage)
         except Exception as err:  # pylint: disable=broad-except
             if os.path.exists(self.prefix):
                 LOGGER.error("Could not remove trial data at '%s': %s", self.prefix, err)
                 
-    def _postprocess_slog2(self):
-        slog2 = os.path.join(self.prefix, 'tau.slog2')
+    def _postprocess_slog2(self, prefix):
+        slog2 = os.path.join(prefix, 'tau.slog2')
         if os.path.exists(slog2):
             return
         tau = TauInstallation.minimal()
-        merged_trc = os.path.join(self.prefix, 'tau.trc')
-        merged_edf = os.path.join(self.prefix, 'tau.edf')
+        merged_trc = os.path.join(prefix, 'tau.trc')
+        merged_edf = os.path.join(prefix, 'tau.edf')
         if not os.path.exists(merged_trc) or not os.path.exists(merged_edf):
-            tau.merge_tau_trace_files(self.prefix)
+            tau.merge_tau_trace_files(prefix)
         tau.tau_trace_to_slog2(merged_trc, merged_edf, slog2)
-        trc_files = glob.glob(os.path.join(self.prefix, '*.trc'))
-        edf_files = glob.glob(os.path.join(self.prefix, '*.edf'))
+        trc_files = glob.glob(os.path.join(prefix, '*.trc'))
+        edf_files = glob.glob(os.path.join(prefix, '*.edf'))
         count_trc_edf = len(trc_files) + len(edf_files)
         LOGGER.info('Cleaning up TAU trace files...')
         with ProgressIndicator(count_trc_edf) as progress_bar:
@@ -261,6 +500,257 @@ class Trial(Model):
                 count += 1
                 progress_bar.update(count)
 
+    def get_environment(self):
+        """Returns the shell environment the trial was performed in.
+        
+        The environment is loaded from the project's blob store.  The trial data directory variables, 
+        e.g. PROFILEDIR, are not stored since they are set when the trial is performed: to the trial 
+        directory, or to a staging directory that is drained to the trial directory when the trial 
+        is staged (see :any:`staging_dir`).
+        
+        Returns:
+            dict: Environment variables keyed by name.
+            
+        Raises:
+            ConfigurationError: The trial environment was not recorded.
+        """
+        digest = self['environment']
+        blobs = self.populate('experiment').populate('project').blob_store()
+        try:
+            return blobs.get_json(digest)
+        except KeyError:
+            raise ConfigurationError("The environment of trial %s was not recorded" % self['number'])
+
+    def is_compact(self):
+        """Returns True if the trial data has been packed into a compressed container.
+        
+        Only the trial record is authoritative: a container file that was never recorded, e.g. one left
+        behind by an interrupted compaction, does not make the trial compact.
+        """
+        return bool(self.get('container'))
+
+    def compact(self, compresslevel=None, nthreads=None):
+        """Pack the trial data files into a compressed container and delete the original files.
+        
+        The container is a zip archive in the trial directory.  Files are compressed in parallel
+        and the archive is verified before the original files are removed.
+        
+        Args:
+            compresslevel (int): zlib compression level, 0-9.  Default is set by :any:`util.create_archive`.
+            nthreads (int): Number of compression threads.  Default is set by :any:`util.create_archive`.
+            
+        Returns:
+            int: Size in bytes of the compressed container.
+        """
+        if self.is_compact():
+            return os.path.getsize(self._container_path())
+        container = os.path.join(self.prefix, CONTAINER_FILENAME)
+        items = self.data_members()
+        if not items:
+            raise ConfigurationError("Trial %s has no data to compact" % self['number'])
+        LOGGER.info("Compacting trial %s data in '%s'...", self['number'], container)
+        # The container is only moved into place once it is complete and verified so an interrupted 
+        # compaction never leaves a truncated container behind
+        partial = container + _PARTIAL_SUFFIX
+        try:
+            util.create_archive('zip', partial, sorted(items), self.prefix, 
+                                compresslevel=compresslevel, nthreads=nthreads)
+            with ZipFile(partial) as archive:
+                bad_member = archive.testzip()
+            if bad_member is not None:
+                raise TrialError("Failed to compact trial %s: '%s' is corrupt in '%s'" % 
+                                 (self['number'], bad_member, partial))
+            os.rename(partial, container)
+        except:
+            if os.path.exists(partial):
+                os.remove(partial)
+            raise
+        compressed_size = os.path.getsize(container)
+        self.controller(self.storage).update({'container': CONTAINER_FILENAME, 
+                                              'container_size': compressed_size}, self.eid)
+        for item in items:
+            os.remove(os.path.join(self.prefix, item))
+        for dir_path, _, _ in sorted(os.walk(self.prefix), reverse=True):
+            if dir_path != self.prefix and not os.listdir(dir_path):
+                os.rmdir(dir_path)
+        LOGGER.info("Trial %s data compacted from %s to %s", self['number'], 
+                    util.human_size(self.get('data_size', 0)), util.human_size(compressed_size))
+        return compressed_size
+
+    def stored_size(self):
+        """Returns the size in bytes of the trial data as stored on disk, according to the trial record."""
+        if self.is_compact() and self.get('container_size') is not None:
+            return int(self['container_size'])
+        return int(self.get('data_size') or 0)
+
+    def profile_format(self):
+        """Returns the format of the trial's profiles, resolving the measurement's "auto" profile format."""
+        try:
+            return self['profile_format']
+        except KeyError:
+            profile_fmt = self.populate('experiment').populate('measurement').get('profile', 'none')
+            return 'tau' if profile_fmt == 'auto' else profile_fmt
+
+    def has_traces(self):
+        """Returns True if the trial's measurement produced trace data that has not been dropped."""
+        if self.get('traces_dropped'):
+            return False
+        return self.populate('experiment').populate('measurement').get('trace', 'none') != 'none'
+
+    def drop_traces(self):
+        """Delete the trial's trace data but keep its profile data.
+        
+        Packed trials are repacked without the trace files.
+        
+        Returns:
+            int: Number of bytes of uncompressed trace data removed.
+        """
+        is_packed = self.is_compact()
+        if is_packed:
+            self.unpack()
+        removed_size = 0
+        for name in os.listdir(self.prefix):
+            if not any(fnmatch.fnmatch(name, pattern) for pattern in TRACE_PATTERNS):
+                continue
+            path = os.path.join(self.prefix, name)
+            if os.path.isdir(path):
+                removed_size += sum(os.path.getsize(os.path.join(dir_path, file_name)) 
+                                    for dir_path, _, file_names in os.walk(path) for file_name in file_names)
+                util.rmtree(path)
+            else:
+                removed_size += os.path.getsize(path)
+                os.remove(path)
+        data_size = max(int(self.get('data_size') or 0) - removed_size, 0)
+        self.controller(self.storage).update({'data_size': data_size, 'traces_dropped': True}, self.eid)
+        LOGGER.info("Removed %s of trace data from trial %s", util.human_size(removed_size), self['number'])
+        if is_packed and data_size:
+            self.controller(self.storage).one(self.eid).compact()
+        return removed_size
+
+    def _container_path(self):
+        return os.path.join(self.prefix, self.get('container') or CONTAINER_FILENAME)
+
+    def open_pack(self):
+        """Open the trial's packed data for random access.
+        
+        The pack is opened at most once per process.
+        
+        Returns:
+            TrialPack: The trial's data pack.
+            
+        Raises:
+            ConfigurationError: The trial data has not been packed.
+        """
+        if not self.is_compact():
+            raise ConfigurationError("Trial %s data has not been packed" % self['number'],
+                                     "Use `tau trial pack %s` to pack the trial data." % self['number'])
+        container = self._container_path()
+        try:
+            return _OPEN_PACKS[container]
+        except KeyError:
+            pack = _OPEN_PACKS[container] = TrialPack(container)
+            return pack
+
+    def data_members(self):
+        """Returns a sorted list of the trial's data file paths relative to the trial directory."""
+        if self.is_compact():
+            return sorted(name for name in self.open_pack().names() if not name.endswith('/'))
+        members = []
+        for dir_path, _, file_names in os.walk(self.prefix):
+            for name in file_names:
+                members.append(os.path.relpath(os.path.join(dir_path, name), self.prefix))
+        # Skip a container that was never recorded, e.g. one left by an interrupted compaction
+        excluded = ANALYSIS_CACHE_FILENAME, CONTAINER_FILENAME, CONTAINER_FILENAME + _PARTIAL_SUFFIX
+        return sorted(member for member in members if member not in excluded)
+
+    def analysis_cache_path(self):
+        """Returns the path to the trial's analysis cache file, see :any:`taucmdr.analysis.cache`."""
+        return os.path.join(self.prefix, ANALYSIS_CACHE_FILENAME)
+
+    def open_data_file(self, name):
+        """Open one of the trial's data files for reading without unpacking the rest of the trial data.
+        
+        Args:
+            name (str): Path to the data file relative to the trial directory, e.g. "profile.0.0.0".
+            
+        Returns:
+            file: A read-only file-like object.
+            
+        Raises:
+            IOError: The trial has no data file named `name`.
+        """
+        if not self.is_compact():
+            return open(os.path.join(self.prefix, name), 'rb')
+        try:
+            return self.open_pack().open(name)
+        except KeyError:
+            raise IOError(errno.ENOENT, "No such file in trial %s data" % self['number'], name)
+
+    def unpack(self):
+        """Unpack the trial's packed data into the trial directory and delete the pack."""
+        if not self.is_compact():
+            return
+        container = self._container_path()
+        LOGGER.info("Unpacking trial %s data to '%s'...", self['number'], self.prefix)
+        pack = _OPEN_PACKS.pop(container, None) or TrialPack(container)
+        try:
+            pack.extract(self.prefix)
+        finally:
+            pack.close()
+        fields = [attr for attr in 'container', 'container_size' if attr in self]
+        if fields:
+            self.controller(self.storage).unset(fields, self.eid)
+        os.remove(container)
+        _UNPACKED_PREFIXES.pop(container, None)
+
+    def data_prefix(self, members=None):
+        """Returns the path to a directory containing the trial's uncompressed data files.
+        
+        If the trial has been packed then members of the pack are extracted to a temporary directory
+        that is removed when the program exits.  Each member is extracted at most once per process.
+        
+        Args:
+            members (list): Paths relative to the trial directory of the data files that will be read, 
+                            or None if all data files will be read.
+        
+        Returns:
+            str: Path to a directory.
+        """
+        if not self.is_compact():
+            return self.prefix
+        container = self._container_path()
+        try:
+            prefix, extracted = _UNPACKED_PREFIXES[container]
+        except KeyError:
+            prefix = util.mkdtemp(prefix='trial%s-' % self['number'], dir=os.path.dirname(self.prefix))
+            extracted = set()
+            _UNPACKED_PREFIXES[container] = prefix, extracted
+        try:
+            pack = self.open_pack()
+            names = pack.names() if members is None else [name for name in members if name in pack]
+            names = [name for name in names if name not in extracted]
+            if names:
+                LOGGER.info("Unpacking trial %s data...", self['number'])
+                extracted.update(pack.extract(prefix, names))
+        except (IOError, OSError) as err:
+            raise TrialError("Cannot unpack trial %s data from '%s': %s" % (self['number'], container, err))
+        return prefix
+
+    def _data_members_for(self, profile_fmt, trace_fmt):
+        """Returns the data files needed by the given formats, or None if all data files are needed."""
+        members = []
+        if profile_fmt == 'merged':
+            members.append('tauprofile.xml')
+        elif profile_fmt == 'cubex':
+            members.append('profile.cubex')
+        elif profile_fmt != 'none':
+            return None
+        if trace_fmt == 'slog2' and self.is_compact() and 'tau.slog2' in self.open_pack():
+            members.append('tau.slog2')
+        elif trace_fmt != 'none':
+            return None
+        return members
+
     def get_data_files(self):
         """Return paths to the trial's data files or directories maped by data type. 
         
@@ -268,6 +758,8 @@ class Trial(Model):
         by this trial to paths to related data files or directories.  The paths should be suitable for 
         passing on a command line to one of the known data analysis tools. For example, a trial producing 
         SLOG2 traces and TAU profiles would return ``{"slog2": "/path/to/tau.slog2", "tau": "/path/to/directory/"}``.
+        Only the data files needed by the trial's data formats are unpacked from packed trials, 
+        see :any:`data_prefix`.
         
         Returns:
             dict: Keys are strings indicating the data type; values are filesystem paths.
@@ -276,29 +768,191 @@ class Trial(Model):
         if self.get('data_size', 0) <= 0:
             raise ConfigurationError("Trial %s of experiment '%s' has no data" % (self['number'], expr['name']))
         meas = self.populate('experiment').populate('measurement')
-        profile_fmt = meas.get('profile', 'none')
-        trace_fmt = meas.get('trace', 'none')
+        profile_fmt = self.profile_format()
+        trace_fmt = meas.get('trace', 'none') if self.has_traces() else 'none'
+        prefix = self.data_prefix(self._data_members_for(profile_fmt, trace_fmt))
         if trace_fmt == 'slog2':
-            self._postprocess_slog2()
+            self._postprocess_slog2(prefix)
         data = {}
         if profile_fmt == 'tau':
-            data[profile_fmt] = self.prefix
+            data[profile_fmt] = prefix
         elif profile_fmt == 'merged':
-            data[profile_fmt] = os.path.join(self.prefix, 'tauprofile.xml')
+            data[profile_fmt] = os.path.join(prefix, 'tauprofile.xml')
         elif profile_fmt == 'cubex':
-            data[profile_fmt] = os.path.join(self.prefix, 'profile.cubex')
+            data[profile_fmt] = os.path.join(prefix, 'profile.cubex')
         elif profile_fmt != 'none':
             raise InternalError("Unhandled profile format '%s'" % profile_fmt)
-        trace_fmt = meas.get('trace', 'none')
         if trace_fmt == 'slog2':
-            data[trace_fmt] = os.path.join(self.prefix, 'tau.slog2')
+            data[trace_fmt] = os.path.join(prefix, 'tau.slog2')
         elif trace_fmt == 'otf2':
-            data[trace_fmt] = os.path.join(self.prefix, 'traces.otf2')
+            data[trace_fmt] = os.path.join(prefix, 'traces.otf2')
         elif trace_fmt != 'none':
             raise InternalError("Unhandled trace format '%s'" % trace_fmt)
         return data
 
-    def execute_command(self, expr, cmd, cwd, env):
+    def duration(self):
+        """Return the trial's wall clock time in seconds, or None if the trial hasn't finished."""
+        begin_time = _parse_time(self.get('begin_time'))
+        end_time = _parse_time(self.get('end_time'))
+        if begin_time is None or end_time is None:
+            return None
+        return (end_time - begin_time).total_seconds()
+
+    def age(self, now=None):
+        """Return the number of seconds since the trial ended, or None if the trial hasn't finished."""
+        end_time = _parse_time(self.get('end_time'))
+        if end_time is None:
+            return None
+        return ((now or datetime.utcnow()) - end_time).total_seconds()
+
+    def data_monitor(self, prefix=None):
+        """Build a :any:`TrialDataMonitor` for this trial's data directory.
+        
+        The expected run time is taken from the most recent finished trial of the same experiment
+        so the monitor can estimate the final data size.
+        
+        Args:
+            prefix (str): Directory to monitor if not the trial directory, e.g. a staging directory.
+        
+        Returns:
+            TrialDataMonitor: A monitor for this trial.
+        """
+        try:
+            interval = float(configuration.get('trial.monitor_interval'))
+        except KeyError:
+            interval = 5
+        expected_duration = None
+        finished = [trial for trial in self.populate('experiment').populate('trials') 
+                    if trial.eid != self.eid and trial.duration()]
+        if finished:
+            latest = max(finished, key=lambda trial: trial['begin_time'])
+            expected_duration = latest.duration()
+        return TrialDataMonitor(prefix or self.prefix, interval=interval, expected_duration=expected_duration)
+
+    def staging_dir(self, shared=False):
+        """Create a directory to stage trial data in before it is drained to the trial directory.
+        
+        The staging prefix is set by the ``trial.staging_prefix`` configuration key.  It should be on
+        a fast filesystem such as a ramdisk or burst buffer.  The special value ``tmpfs`` selects the 
+        temporary filesystem found by :any:`tmpfs_prefix`.
+        
+        The staging directory is only created on the node running this process and only drained from 
+        there, so runs that may span nodes are only staged on filesystems shared by all nodes.  
+        Otherwise ranks on other nodes would write to a directory that doesn't exist on their node.
+        
+        Args:
+            shared (bool): If True, only stage trial data on a filesystem shared by all nodes.
+        
+        Returns:
+            str: Path to a new, empty staging directory, or None if staging is not configured.
+            
+        Raises:
+            ConfigurationError: The staging directory could not be created.
+        """
+        try:
+            prefix = configuration.get('trial.staging_prefix')
+        except KeyError:
+            return None
+        if not prefix:
+            return None
+        if prefix == 'tmpfs':
+            if shared:
+                LOGGER.warning("Not staging trial %s data in a node-local tmpfs because the application may "
+                               "run on more than one node", self['number'])
+                return None
+            prefix = tmpfs_prefix()
+        try:
+            util.mkdirp(prefix)
+            fs_type = util.filesystem_type(prefix)
+            if shared and fs_type not in _SHARED_FILESYSTEMS:
+                LOGGER.warning("Not staging trial %s data in '%s' because the application may run on more than "
+                               "one node and the %s filesystem is not known to be shared by all nodes", 
+                               self['number'], prefix, fs_type or 'unknown')
+                return None
+            stage_dir = tempfile.mkdtemp(prefix='trial%s-' % self['number'], dir=prefix)
+        except (IOError, OSError) as err:
+            raise ConfigurationError("Cannot create trial staging directory in '%s': %s" % (prefix, err),
+                                     "Check the 'trial.staging_prefix' configuration value.")
+        LOGGER.debug("Staging trial %s data in '%s'", self['number'], stage_dir)
+        return stage_dir
+
+    def drain(self, stage_dir, nthreads=None):
+        """Copy trial data files from a staging directory to the trial directory.
+        
+        Files are copied in parallel and the copies are checked against a manifest of the staged files.
+        If the trial records how many ranks the application launcher started then the drained per-rank
+        profiles or traces must cover every rank.  The staging directory is removed only if every file 
+        was copied correctly.
+        
+        Args:
+            stage_dir (str): Path to the staging directory.
+            nthreads (int): Number of copy threads.  Default is the number of CPU cores.
+            
+        Returns:
+            int: Total size in bytes of the drained files.
+            
+        Raises:
+            TrialError: A file could not be copied or failed verification.
+        """
+        manifest = {}
+        for dir_path, _, file_names in os.walk(stage_dir):
+            for name in file_names:
+                path = os.path.join(dir_path, name)
+                manifest[os.path.relpath(path, stage_dir)] = os.path.getsize(path)
+        if not manifest:
+            util.rmtree(stage_dir, ignore_errors=True)
+            return 0
+        hint = "The staged trial data is in '%s'" % stage_dir
+        LOGGER.info("Draining %s files (%s) from '%s'...", 
+                    len(manifest), util.human_size(sum(manifest.itervalues())), stage_dir)
+        try:
+            for dir_path in set(os.path.dirname(relpath) for relpath in manifest):
+                util.mkdirp(os.path.join(self.prefix, dir_path))
+            pool = ThreadPool(nthreads or multiprocessing.cpu_count())
+            try:
+                copies = pool.imap_unordered(lambda relpath: shutil.copy2(os.path.join(stage_dir, relpath), 
+                                                                          os.path.join(self.prefix, relpath)),
+                                             manifest)
+                with ProgressIndicator(len(manifest)) as progress_bar:
+                    for count, _ in enumerate(copies, 1):
+                        progress_bar.update(count)
+            finally:
+                pool.terminate()
+                pool.join()
+        except (IOError, OSError) as err:
+            raise TrialError("Failed to drain trial %s data: %s" % (self['number'], err), hint)
+        failed = [relpath for relpath, size in manifest.iteritems() 
+                  if not os.path.isfile(os.path.join(self.prefix, relpath)) or 
+                  os.path.getsize(os.path.join(self.prefix, relpath)) != size]
+        if failed:
+            raise TrialError("%d trial data files failed verification after draining, e.g. '%s'" % 
+                             (len(failed), failed[0]), hint)
+        self._check_drained_ranks(manifest, hint)
+        util.rmtree(stage_dir, ignore_errors=True)
+        return sum(manifest.itervalues())
+
+    def _check_drained_ranks(self, manifest, hint):
+        """Check that every rank the launcher started wrote per-rank data to the staging directory.
+        
+        The size check in :any:`drain` only proves the staged files were copied, not that every rank's
+        data reached the staging directory, e.g. ranks on other nodes may have written to their own node.
+        Formats without per-rank files, like merged profiles or OTF2 traces, are not checked.
+        """
+        expected = self.get('ranks')
+        if not expected:
+            return
+        ranks = set()
+        for relpath in manifest:
+            match = _RANK_FILE_RE.search(relpath.replace(os.sep, '/'))
+            if match:
+                ranks.add(int(match.group(1)))
+        if ranks and len(ranks) < expected:
+            missing = sorted(set(xrange(expected)) - ranks)
+            raise TrialError("Trial %s data from %d of %d ranks is missing after draining, e.g. rank %d" % 
+                             (self['number'], expected - len(ranks), expected, missing[0]),
+                             hint, "Set 'trial.staging_prefix' to a filesystem that every node can see.")
+
+    def execute_command(self, expr, cmd, cwd, env, monitor=False, stage_dir=None):
         """Execute a command as part of an experiment trial.
 
         Creates a new subprocess for the command and checks for TAU data files
@@ -309,6 +963,9 @@ class Trial(Model):
             cmd (str): Command to profile, with command line arguments.
             cwd (str): Working directory to perform trial in.
             env (dict): Environment variables to set before performing the trial.
+            monitor (bool): If True, report the trial data write rate while the command runs.
+            stage_dir (str): If not None, the command writes trial data to this directory and the data 
+                             is drained to the trial directory when the subprocess exits.
 
         Returns:
             int: Subprocess return code.
@@ -321,13 +978,19 @@ class Trial(Model):
         LOGGER.info('\n'.join(tau_env_opts))
         LOGGER.info(cmd_str)
         try:
-            retval = util.create_subprocess(cmd, cwd=cwd, env=env, log=False)
+            if monitor:
+                with self.data_monitor(stage_dir):
+                    retval = util.create_subprocess(cmd, cwd=cwd, env=env, log=False)
+            else:
+                retval = util.create_subprocess(cmd, cwd=cwd, env=env, log=False)
         except OSError as err:
             target = expr.populate('target')
             errno_hint = {errno.EPERM: "Check filesystem permissions",
                           errno.ENOENT: "Check paths and command line arguments",
                           errno.ENOEXEC: "Check that this host supports '%s'" % target['host_arch']}
             raise TrialError("Couldn't execute %s: %s" % (cmd_str, err), errno_hint.get(err.errno, None))
+        if stage_dir:
+            self.drain(stage_dir)
         
         measurement = expr.populate('measurement')
         profiles = []
@@ -369,11 +1032,16 @@ class Trial(Model):
             LOGGER.warning("Return code %d from '%s'", retval, cmd_str)
         return retval
     
-    def export(self, dest):
-        """Export experiment trial data.
- 
+    def export_jobs(self, dest):
+        """List the files to write when exporting this trial's data.
+        
+        Trial data is post-processed or unpacked as needed by :any:`get_data_files`.
+        
         Args:
             dest (str): Path to directory to contain exported data.
+            
+        Returns:
+            list: (fmt, path, export_file) tuples suitable for :any:`export_data_file`.
  
         Raises:
             ConfigurationError: This trial has no data.
@@ -383,27 +1051,133 @@ class Trial(Model):
             raise ConfigurationError("Trial %s of experiment '%s' has no data" % (self['number'], expr['name']))
         data = self.get_data_files()
         stem = '%s.trial%d' % (expr['name'], self['number'])
-        for fmt, path in data.iteritems(): 
-            if fmt == 'tau':
-                export_file = os.path.join(dest, stem+'.ppk')
-                tau = TauInstallation.minimal()
-                tau.create_ppk_file(export_file, path)
-            elif fmt == 'merged':
-                export_file = os.path.join(dest, stem+'.xml.gz')
-                util.create_archive('gz', export_file, [path])
-            elif fmt == 'cubex':
-                export_file = os.path.join(dest, stem+'.cubex')
-                LOGGER.info("Writing '%s'...", export_file)
-                util.copy_file(path, export_file)
-            elif fmt == 'slog2':
-                export_file = os.path.join(dest, stem+'.slog2')
-                LOGGER.info("Writing '%s'...", export_file)
-                util.copy_file(path, export_file)
-            elif fmt == 'otf2':
-                export_file = os.path.join(dest, stem+'.tgz')
-                expr_dir, trial_dir = os.path.split(os.path.dirname(path))
-                items = [os.path.join(trial_dir, item) for item in 'traces', 'traces.def', 'traces.otf2']
-                util.create_archive('tgz', export_file, items, expr_dir)
-            elif fmt != 'none':
+        ext = {'tau': '.ppk', 'merged': '.xml.gz', 'cubex': '.cubex', 'slog2': '.slog2', 'otf2': '.tgz'}
+        jobs = []
+        for fmt, path in data.iteritems():
+            if fmt == 'none':
+                continue
+            try:
+                jobs.append((fmt, path, os.path.join(dest, stem+ext[fmt])))
+            except KeyError:
                 raise InternalError("Unhandled data file format '%s'" % fmt)
+        return jobs
+
+    def export(self, dest, native=False):
+        """Export experiment trial data.
+ 
+        Args:
+            dest (str): Path to directory to contain exported data.
+            native (bool): If True, write PPK files natively instead of with ParaProf.
+ 
+        Raises:
+            ConfigurationError: This trial has no data.
+        """
+        for fmt, path, export_file in self.export_jobs(dest):
+            export_data_file(fmt, path, export_file, native=native)
+
+
+def export_data_file(fmt, path, export_file, show_progress=True, nthreads=None, native=False):
+    """Write a trial data file or directory in a format suitable for exporting.
+    
+    Only plain strings are passed so this function can run in a worker process.  TAU profiles are
+    packed by ParaProf unless `native` is True or Java is not available, in which case they are
+    packed by :any:`tau_profile.write_ppk`.
+    
+    Args:
+        fmt (str): Data format, i.e. a key returned by :any:`Trial.get_data_files`.
+        path (str): Path to the trial data file or directory.
+        export_file (str): Path to the file to write.
+        show_progress (bool): If True, show progress indicators.
+        nthreads (int): Number of compression threads.  Default is set by :any:`util.create_archive`.
+        native (bool): If True, write PPK files natively instead of with ParaProf.
+        
+    Returns:
+        str: `export_file`.
+    """
+    if fmt == 'tau':
+        if native or not util.which('java'):
+            tau_profile.write_ppk(export_file, path, nthreads=nthreads)
+        else:
+            tau = TauInstallation.minimal()
+            tau.create_ppk_file(export_file, path, show_progress=show_progress)
+    elif fmt == 'merged':
+        util.create_archive('gz', export_file, [path], show_progress=show_progress, nthreads=nthreads)
+    elif fmt in ('cubex', 'slog2'):
+        LOGGER.info("Writing '%s'...", export_file)
+        util.copy_file(path, export_file, show_progress=show_progress)
+    elif fmt == 'otf2':
+        expr_dir, trial_dir = os.path.split(os.path.dirname(path))
+        items = [os.path.join(trial_dir, item) for item in 'traces', 'traces.def', 'traces.otf2']
+        util.create_archive('tgz', export_file, items, expr_dir, show_progress=show_progress, nthreads=nthreads)
+    else:
+        raise InternalError("Unhandled data file format '%s'" % fmt)
+    return export_file
+
+
+def _export_worker(args):
+    # Error subclasses have different constructors and don't all survive pickling so send the 
+    # error message and hints back instead
+    job, nthreads, native = args
+    try:
+        return export_data_file(*job, show_progress=False, nthreads=nthreads, native=native), None
+    except Error as err:
+        return None, (err.value, err.hints)
+
+
+def _data_size(path):
+    if os.path.isdir(path):
+        return sum(os.path.getsize(os.path.join(dir_path, name)) 
+                   for dir_path, _, file_names in os.walk(path) for name in file_names)
+    return os.path.getsize(path) if os.path.exists(path) else 0
+
+
+def export_trials(trials, dest, jobs=None, native=False):
+    """Export data from several trials at once.
+    
+    Each trial data format is exported by a separate job.  Jobs run in a pool of worker processes
+    so slow exports, e.g. PPK files written by Java, overlap with each other.  The CPU cores are
+    divided among the jobs' compression threads.  Progress is reported as the aggregate throughput 
+    of all jobs.  Each ParaProf job starts its own JVM so by default only a few jobs run at once.
+    
+    Args:
+        trials (list): :any:`Trial` objects to export.
+        dest (str): Path to directory to contain exported data.
+        jobs (int): Maximum number of concurrent export jobs.  Default is :any:`DEFAULT_EXPORT_JOBS` or
+                    the number of CPU cores, whichever is smaller.
+        native (bool): If True, write PPK files natively instead of with ParaProf.
+        
+    Returns:
+        list: Paths to exported files.
+    """
+    export_jobs = []
+    for trial in trials:
+        export_jobs.extend(trial.export_jobs(dest))
+    if not export_jobs:
+        return []
+    jobs = min(jobs or min(DEFAULT_EXPORT_JOBS, multiprocessing.cpu_count()), len(export_jobs))
+    if jobs == 1:
+        return [export_data_file(*job, native=native) for job in export_jobs]
+    sizes = {export_file: _data_size(path) for _, path, export_file in export_jobs}
+    total_size = sum(sizes.itervalues())
+    LOGGER.info("Exporting %s files (%s) with %s jobs...", len(export_jobs), util.human_size(total_size), jobs)
+    export_files = []
+    pool = multiprocessing.Pool(jobs)
+    try:
+        done_size = 0
+        start = time.time()
+        with ProgressIndicator(total_size) as progress_bar:
+            nthreads = max(multiprocessing.cpu_count() // jobs, 1)
+            results = pool.imap_unordered(_export_worker, [(job, nthreads, native) for job in export_jobs])
+            for export_file, error in results:
+                if error:
+                    value, hints = error
+                    raise ConfigurationError(value, *hints)
+                export_files.append(export_file)
+                done_size += sizes[export_file]
+                rate = done_size / max(time.time() - start, 1e-6)
+                progress_bar.update(done_size, message='%s/s' % util.human_size(rate))
+    finally:
+        pool.terminate()
+        pool.join()
+    return export_files
 
@@ -107,7 +107,7 @@ class ProgressIndicator(object):
     
     _spinner = itertools.cycle(['-', '/', '|', '\\'])
     
-    def __init__(self, total_size=0, block_size=1, show_cpu=True, mode=None):
+    def __init__(self, total_size=0, block_size=1, show_cpu=True, mode=None, message=None):
         """ Initialize the ProgressBar object.
 
         Args:
@@ -122,6 +122,7 @@ class ProgressIndicator(object):
                         If ``mode == 'minimal'`` then a single '.' character is written to sys.stdout approximately
                             every five seconds without erasing the line (best for Travis regression test).
                         If ``mode == 'disabled'`` then no output is written to stdout.
+            message (str): Short status text to show after the elapsed time, or None.
         """
         if mode is None:
             mode = os.environ.get('__TAUCMDR_PROGRESS_BARS__', 'full').lower()
@@ -132,6 +133,7 @@ class ProgressIndicator(object):
         self.block_size = block_size
         self.show_cpu = show_cpu
         self.mode = mode
+        self.message = message
         self._last_time = datetime.now()
         self._start_time = None
         self._line_remaining = 0
@@ -175,7 +177,9 @@ class ProgressIndicator(object):
             sys.stdout.write('.')
             sys.stdout.flush()
             
-    def _update_full(self, count, block_size, total_size):
+    def _update_full(self, count, block_size, total_size, message):
+        if message is not None:
+            self.message = message
         if count is not None:
             self.count = count
         if block_size is not None:
@@ -188,6 +192,8 @@ class ProgressIndicator(object):
         tdelta = datetime.now() - self._start_time
         self._line_reset()
         self._line_append("%0.1f seconds " % tdelta.total_seconds())        
+        if self.message and len(self.message) < self._line_remaining - 10:
+            self._line_append("%s " % self.message)
         if (not self.show_cpu and not show_bar) or (self._line_remaining < 40):
             self._line_append('[%s]' % self._spinner.next())
             self._line_flush()
@@ -208,7 +214,7 @@ class ProgressIndicator(object):
                 self._line_append("]")
             self._line_flush()
 
-    def update(self, count=None, block_size=None, total_size=None):
+    def update(self, count=None, block_size=None, total_size=None, message=None):
         """Show progress.
 
         Updates `block_size` or `total_size` if given for compatibility with :any:`urllib.urlretrieve`.
@@ -217,13 +223,14 @@ class ProgressIndicator(object):
             count (int): Number of blocks of `block_size` that have been completed.
             block_size (int): Size of a work block.
             total_size (int): Total amount of work to be completed.
+            message (str): New status text to show after the elapsed time.
         """
         if self.mode == 'disabled' or getattr(logging, logger.LOG_LEVEL) >= logging.ERROR:
             return
         elif self.mode == 'minimal':
             self._update_minimal()
         elif self.mode == 'full':
-            self._update_full(count, block_size, total_size)
+            self._update_full(count, block_size, total_size, message)
 
     def complete(self):
         if self.mode != 'disabled':
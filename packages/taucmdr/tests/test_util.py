@@ -30,7 +30,12 @@
 Functions used for unit tests of util.py.
 """
 
-
+import os
+import zlib
+import gzip
+import time
+import tarfile
+from zipfile import ZipFile
 from taucmdr import util, tests
 
 
@@ -82,3 +87,162 @@ class CamelCaseTest(tests.TestCase):
 
     def test_camelcase(self):
         self.assertEqual(util.camelcase("abc_def_ghi"), "AbcDefGhi")
+
+
+class CreateArchiveTest(tests.TestCase):
+    """Tests for :any:`util.create_archive`."""
+    
+    def test_zip(self):
+        workdir = tests.get_test_workdir()
+        util.mkdirp(os.path.join(workdir, 'data', 'sub'))
+        contents = {os.path.join('data', 'empty'): '',
+                    os.path.join('data', 'small'): 'hello world\n',
+                    os.path.join('data', 'sub', 'large'): os.urandom(1024) * 3000}
+        for path, data in contents.iteritems():
+            with open(os.path.join(workdir, path), 'wb') as fout:
+                fout.write(data)
+        dest = os.path.join(workdir, 'test.zip')
+        util.create_archive('zip', dest, ['data'], workdir, show_progress=False, nthreads=3)
+        with ZipFile(dest) as archive:
+            self.assertIsNone(archive.testzip())
+            self.assertItemsEqual(archive.namelist(), contents.keys())
+            for path, data in contents.iteritems():
+                self.assertEqual(archive.read(path), data)
+
+    def test_zip64_member(self):
+        data = 'x' * 100000
+        compressed = ''.join(block[2] for block in util.parallel_deflate([('a', data, True)], nthreads=1))
+        stat = os.stat_result((0100644, 0, 0, 1, 0, 0, 5 * 2**30, 0, time.time(), 0))
+        dest = os.path.join(tests.get_test_workdir(), 'test64.zip')
+        with open(dest, 'wb') as fout:
+            writer = util._DeflatedZipWriter(fout)  # pylint: disable=protected-access
+            writer.add('big', stat, [(data, compressed)])
+            writer.add(u'sm\xe5ll', os.stat(dest), [('', zlib.compress('')[2:-4])])
+            writer.close()
+        with ZipFile(dest) as archive:
+            self.assertIsNone(archive.testzip())
+            self.assertEqual(archive.read('big'), data)
+            self.assertEqual(archive.read(u'sm\xe5ll'), '')
+
+    def test_parallel_deflate(self):
+        data = ''.join(str(i) for i in xrange(200000))
+        blocks = [('a', data[i:i+10000], i+10000 >= len(data)) for i in xrange(0, len(data), 10000)]
+        compressed = ''.join(block[2] for block in util.parallel_deflate(blocks, nthreads=4))
+        self.assertEqual(zlib.decompress(compressed, -zlib.MAX_WBITS), data)
+
+    def test_gz(self):
+        workdir = tests.get_test_workdir()
+        data = ''.join('%d\n' % i for i in xrange(500000)) + os.urandom(100000)
+        src = os.path.join(workdir, 'data.txt')
+        with open(src, 'wb') as fout:
+            fout.write(data)
+        dest = os.path.join(workdir, 'data.txt.gz')
+        util.create_archive('gz', dest, [src], show_progress=False, compresslevel=1, nthreads=4)
+        with gzip.open(dest, 'rb') as fin:
+            self.assertEqual(fin.read(), data)
+
+    def test_tgz(self):
+        workdir = tests.get_test_workdir()
+        util.mkdirp(os.path.join(workdir, 'tree', 'sub'))
+        contents = {os.path.join('tree', 'a'): 'a' * 3000000, 
+                    os.path.join('tree', 'sub', 'b'): os.urandom(2000000)}
+        for path, data in contents.iteritems():
+            with open(os.path.join(workdir, path), 'wb') as fout:
+                fout.write(data)
+        dest = os.path.join(workdir, 'tree.tgz')
+        util.create_archive('tgz', dest, ['tree'], workdir, show_progress=False, nthreads=3)
+        with tarfile.open(dest, 'r:gz') as archive:
+            for path, data in contents.iteritems():
+                self.assertEqual(archive.extractfile(path).read(), data)
+
+
+class CopyFileTest(tests.TestCase):
+    """Tests for :any:`util.copy_file`."""
+
+    def _make_src(self, name):
+        src = os.path.join(tests.get_test_workdir(), name)
+        data = os.urandom(1024) * 5000
+        with open(src, 'wb') as fout:
+            fout.write(data)
+        os.chmod(src, 0640)
+        return src, data
+
+    def test_copy(self):
+        src, data = self._make_src('copy_src')
+        dest = os.path.join(tests.get_test_workdir(), 'copy_dest')
+        method = util.copy_file(src, dest, show_progress=False)
+        self.assertNotEqual(method, 'link')
+        self.assertFalse(os.path.samefile(src, dest))
+        self.assertEqual(os.stat(dest).st_mode & 0777, 0640)
+        with open(dest, 'rb') as fin:
+            self.assertEqual(fin.read(), data)
+        # Overwrite with smaller file
+        with open(src, 'wb') as fout:
+            fout.write('small')
+        util.copy_file(src, dest, show_progress=False)
+        with open(dest, 'rb') as fin:
+            self.assertEqual(fin.read(), 'small')
+
+    def test_copy_to_dir(self):
+        src, data = self._make_src('dir_src')
+        destdir = os.path.join(tests.get_test_workdir(), 'destdir')
+        util.mkdirp(destdir)
+        util.copy_file(src, destdir, show_progress=False)
+        with open(os.path.join(destdir, 'dir_src'), 'rb') as fin:
+            self.assertEqual(fin.read(), data)
+
+    def test_buffered_fallback(self):
+        src, data = self._make_src('buf_src')
+        dest = os.path.join(tests.get_test_workdir(), 'buf_dest')
+        src_fd = os.open(src, os.O_RDONLY)
+        dest_fd = os.open(dest, os.O_WRONLY | os.O_CREAT | os.O_TRUNC)
+        try:
+            util._buffered_copy_fd(src_fd, dest_fd) # pylint: disable=protected-access
+        finally:
+            os.close(src_fd)
+            os.close(dest_fd)
+        with open(dest, 'rb') as fin:
+            self.assertEqual(fin.read(), data)
+
+    def test_copy_pseudo_file(self):
+        src = '/proc/self/status'
+        if not os.path.exists(src):
+            self.skipTest("%s does not exist" % src)
+        dest = os.path.join(tests.get_test_workdir(), 'status_copy')
+        util.copy_file(src, dest, show_progress=False)
+        with open(dest, 'rb') as fin:
+            copied = fin.read()
+        self.assertTrue(copied)
+        self.assertIn('Name:', copied)
+
+    def test_link(self):
+        src, _ = self._make_src('link_src')
+        dest = os.path.join(tests.get_test_workdir(), 'link_dest')
+        with open(dest, 'w') as fout:
+            fout.write('stale')
+        self.assertEqual(util.copy_file(src, dest, show_progress=False, link=True), 'link')
+        self.assertTrue(os.path.samefile(src, dest))
+        self.assertEqual(util.copy_file(src, dest, show_progress=False, link=True), 'link')
+
+
+class FilesystemTypeTest(tests.TestCase):
+    """Tests for :any:`util.filesystem_type`."""
+
+    def test_filesystem_type(self):
+        if not os.path.exists('/proc/self/mounts'):
+            self.skipTest("No mount table")
+        self.assertEqual(util.filesystem_type('/proc/self'), 'proc')
+        self.assertIsNotNone(util.filesystem_type(tests.get_test_workdir()))
+
+
+class ParseSizeTest(tests.TestCase):
+    """Tests for :any:`util.parse_size`."""
+
+    def test_parse_size(self):
+        self.assertEqual(util.parse_size(1000), 1000)
+        self.assertEqual(util.parse_size('1000'), 1000)
+        self.assertEqual(util.parse_size('2K'), 2048)
+        self.assertEqual(util.parse_size('1.5GiB'), 1536 * 1024**2)
+        self.assertEqual(util.parse_size('3 mb'), 3 * 1024**2)
+        self.assertEqual(util.parse_size(util.human_size(5 * 1024**4)), 5 * 1024**4)
+        self.assertRaises(ValueError, util.parse_size, 'lots')
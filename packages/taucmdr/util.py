@@ -41,13 +41,20 @@ import shutil
 import urllib
 import pkgutil
 import tarfile
-import gzip
+import zlib
 import tempfile
 import urlparse
 import hashlib
+import struct
+import fcntl
+import ctypes
+import ctypes.util
+import collections
+import multiprocessing
+from multiprocessing.pool import ThreadPool
 from contextlib import contextmanager
 from zipimport import zipimporter
-from zipfile import ZipFile
+from zipfile import ZipFile, ZIP64_LIMIT
 from termcolor import termcolor
 from taucmdr import logger
 from taucmdr.error import InternalError
@@ -95,11 +102,154 @@ def mkdtemp(*args, **kwargs):
     return path
 
 
-def copy_file(src, dest, show_progress=True):
-    """Works just like :any:`shutil.copy` except with progress bars."""
+_FICLONE = 0x40049409
+
+_COPY_CHUNK_SIZE = 1 << 30
+
+_COPY_BUFFER_SIZE = 8 * 1024 * 1024
+
+# Errors indicating that a copy method isn't supported for these files, not that the copy failed
+_COPY_UNSUPPORTED_ERRNOS = (errno.EXDEV, errno.EINVAL, errno.ENOSYS, errno.ENOTTY, 
+                            errno.EOPNOTSUPP, errno.EBADF, errno.EPERM, errno.ETXTBSY)
+
+_LIBC = []
+
+
+def _libc():
+    if not _LIBC:
+        libc = None
+        if sys.platform.startswith('linux'):
+            try:
+                libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+            except OSError:
+                pass
+            else:
+                for name, argtypes in (('copy_file_range', [ctypes.c_int, ctypes.c_void_p, ctypes.c_int, 
+                                                            ctypes.c_void_p, ctypes.c_size_t, ctypes.c_uint]),
+                                       ('sendfile', [ctypes.c_int, ctypes.c_int, ctypes.c_void_p, ctypes.c_size_t])):
+                    try:
+                        func = getattr(libc, name)
+                    except AttributeError:
+                        continue
+                    func.argtypes = argtypes
+                    func.restype = ctypes.c_ssize_t
+        _LIBC.append(libc)
+    return _LIBC[0]
+
+
+def _clone_fd(src_fd, dest_fd):
+    if not sys.platform.startswith('linux'):
+        return False
+    try:
+        fcntl.ioctl(dest_fd, _FICLONE, src_fd)
+    except (IOError, OSError) as err:
+        if err.errno in _COPY_UNSUPPORTED_ERRNOS:
+            return False
+        raise
+    return True
+
+
+def _syscall_copy_fd(name, src_fd, dest_fd, size):
+    # Returns False if the copy is incomplete so the caller can finish it from the current file offsets.
+    # Files whose reported size is zero, like those in /proc, may still have data so are never copied here.
+    func = getattr(_libc(), name, None)
+    if func is None or not size:
+        return False
+    copied = 0
+    while copied < size:
+        chunk = min(_COPY_CHUNK_SIZE, size - copied)
+        if name == 'copy_file_range':
+            count = func(src_fd, None, dest_fd, None, chunk, 0)
+        else:
+            count = func(dest_fd, src_fd, None, chunk)
+        if count < 0:
+            err = ctypes.get_errno()
+            if copied == 0 and err in _COPY_UNSUPPORTED_ERRNOS:
+                return False
+            raise OSError(err, os.strerror(err))
+        elif count == 0:
+            # End of file before the expected size, e.g. a pseudo-file or a file that was truncated
+            return False
+        copied += count
+    return True
+
+
+def _buffered_copy_fd(src_fd, dest_fd):
+    while True:
+        buf = os.read(src_fd, _COPY_BUFFER_SIZE)
+        if not buf:
+            break
+        while buf:
+            buf = buf[os.write(dest_fd, buf):]
+    return True
+
+
+def _link_file(src, dest):
+    try:
+        os.link(src, dest)
+    except OSError as err:
+        if err.errno != errno.EEXIST:
+            return False
+        os.remove(dest)
+        try:
+            os.link(src, dest)
+        except OSError:
+            return False
+    return True
+
+
+def _fast_copy(src, dest, link):
+    if os.path.isdir(dest):
+        dest = os.path.join(dest, os.path.basename(src))
+    if os.path.exists(dest) and os.path.samefile(src, dest):
+        if link:
+            return 'link'
+        raise shutil.Error("'%s' and '%s' are the same file" % (src, dest))
+    if link and _link_file(src, dest):
+        return 'link'
+    size = os.path.getsize(src)
+    src_fd = os.open(src, os.O_RDONLY)
+    try:
+        dest_fd = os.open(dest, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0666)
+        try:
+            if _clone_fd(src_fd, dest_fd):
+                method = 'reflink'
+            elif _syscall_copy_fd('copy_file_range', src_fd, dest_fd, size):
+                method = 'copy_file_range'
+            elif _syscall_copy_fd('sendfile', src_fd, dest_fd, size):
+                method = 'sendfile'
+            else:
+                method = 'copy'
+                _buffered_copy_fd(src_fd, dest_fd)
+        finally:
+            os.close(dest_fd)
+    finally:
+        os.close(src_fd)
+    shutil.copymode(src, dest)
+    return method
+
+
+def copy_file(src, dest, show_progress=True, link=False):
+    """Works just like :any:`shutil.copy` except with progress bars and a faster copy engine.
+    
+    Tries the fastest copy method the filesystem supports: a reflink clone (e.g. on btrfs or XFS),
+    then an in-kernel ``copy_file_range`` or ``sendfile`` copy, and finally a plain buffered copy.
+    If `link` is True then a hardlink is tried first, so only set `link` if neither file will be modified.
+    
+    Args:
+        src (str): Path to the file to copy.
+        dest (str): Path to the destination file or directory.
+        show_progress (bool): Show a spinner while copying if True.
+        link (bool): Hardlink `dest` to `src` if possible.
+        
+    Returns:
+        str: The method used to copy the file, i.e. one of "link", "reflink", "copy_file_range", "sendfile", or "copy".
+    """
     context = progress_spinner if show_progress else _null_context
     with context():
-        shutil.copy(src, dest)
+        method = _fast_copy(src, dest, link)
+    LOGGER.debug("Copied '%s' to '%s' via %s", src, dest, method)
+    return method
 
 
 def mkdirp(*args):
@@ -146,6 +296,35 @@ def rmtree(path, ignore_errors=False, onerror=None, attempts=5):
     shutil.rmtree(path, ignore_errors, onerror)
 
 
+def filesystem_type(path):
+    """Returns the type of the filesystem holding a path, e.g. 'nfs', 'lustre', or 'tmpfs'.
+    
+    The type is read from the kernel's mount table so it is only known on Linux.
+    
+    Args:
+        path (str): Path to an existing file or directory.
+        
+    Returns:
+        str: The filesystem type, or None if it could not be determined.
+    """
+    path = os.path.realpath(path)
+    fs_type, mount_len = None, -1
+    try:
+        with open('/proc/self/mounts') as fin:
+            for line in fin:
+                fields = line.split()
+                if len(fields) < 3:
+                    continue
+                # Whitespace in mount points is octal escaped, e.g. \040 for a space
+                mount_point = re.sub(r'\\([0-7]{3})', lambda match: chr(int(match.group(1), 8)), fields[1])
+                if ((path == mount_point or path.startswith(mount_point.rstrip('/') + '/')) and 
+                        len(mount_point) >= mount_len):
+                    fs_type, mount_len = fields[2], len(mount_point)
+    except IOError:
+        return None
+    return fs_type
+
+
 @contextmanager
 def umask(new_mask):
     """Context manager to temporarily set the process umask.
@@ -222,7 +401,7 @@ def download(src, dest, timeout=8):
     if os.path.isfile(src):
         LOGGER.debug("Copying '%s' to '%s'", src, dest)
         mkdirp(os.path.dirname(dest))
-        shutil.copy(src, dest)
+        copy_file(src, dest, show_progress=False, link=True)
     else:
         LOGGER.debug("Downloading '%s' to '%s'", src, dest)
         LOGGER.info("Downloading '%s'", src)
@@ -363,15 +542,327 @@ def extract_archive(archive, dest, show_progress=True):
     return full_dest
 
 
-def create_archive(fmt, dest, items, cwd=None, show_progress=True):
+_DEFLATE_BLOCK_SIZE = 1024*1024
+
+
+def _deflate_block(data, compresslevel, last):
+    cmpr = zlib.compressobj(compresslevel, zlib.DEFLATED, -zlib.MAX_WBITS)
+    return cmpr.compress(data) + cmpr.flush(zlib.Z_FINISH if last else zlib.Z_SYNC_FLUSH)
+
+
+def parallel_deflate(blocks, compresslevel=6, nthreads=None):
+    """Compress blocks of data as raw deflate streams in a pool of threads.
+    
+    Each block is compressed independently.  Every block except the last block of a stream ends with 
+    a sync flush so the compressed blocks of a stream can be concatenated to form a single valid
+    deflate stream.  :any:`zlib` releases the GIL while compressing so the blocks really are compressed 
+    in parallel.  At most ``2*nthreads`` blocks are in flight at once so memory use is bounded.
+    
+    Args:
+        blocks: Iterable of (key, data, last) tuples where `last` is True if `data` is the last block of
+                the stream identified by `key`.
+        compresslevel (int): zlib compression level, 0-9.
+        nthreads (int): Number of compression threads.  Default is the number of CPU cores.
+        
+    Yields:
+        tuple: (key, data, compressed, last) in the same order as `blocks`.
+    """
+    nthreads = nthreads or multiprocessing.cpu_count()
+    pool = ThreadPool(nthreads)
+    window = collections.deque()
+    try:
+        for key, data, last in blocks:
+            window.append((key, data, last, pool.apply_async(_deflate_block, (data, compresslevel, last))))
+            if len(window) >= 2*nthreads:
+                key, data, last, result = window.popleft()
+                yield key, data, result.get(), last
+        while window:
+            key, data, last, result = window.popleft()
+            yield key, data, result.get(), last
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+class ParallelGzipFile(object):
+    """A write-only gzip file compressed by a pool of threads.
+    
+    Data is split into blocks that are deflated in parallel like `pigz`_ does.  The output is a standard 
+    single-member gzip stream that any gzip reader can decompress.  Compressed blocks are written in order 
+    and at most ``2*nthreads`` blocks are in flight at once so memory use is bounded.
+    
+    .. _pigz: http://zlib.net/pigz/
+    
+    Args:
+        filename (str): Path to the file to write, if `fileobj` is not given.
+        compresslevel (int): zlib compression level, 0-9.
+        nthreads (int): Number of compression threads.  Default is the number of CPU cores.
+        fileobj: File-like object to write to instead of opening `filename`.
+        block_size (int): Size in bytes of the uncompressed blocks.
+    """
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(self, filename=None, compresslevel=6, nthreads=None, fileobj=None, 
+                 block_size=_DEFLATE_BLOCK_SIZE):
+        self._owns_fileobj = fileobj is None
+        self.fileobj = open(filename, 'wb') if fileobj is None else fileobj
+        self.compresslevel = compresslevel
+        self.nthreads = nthreads or multiprocessing.cpu_count()
+        self.block_size = block_size
+        self._pool = ThreadPool(self.nthreads)
+        self._window = collections.deque()
+        self._buffer = []
+        self._buffered = 0
+        self._crc = 0
+        self._size = 0
+        self.closed = False
+        self._write_header(filename)
+
+    def _write_header(self, filename):
+        fname = os.path.basename(filename or '')
+        if fname.endswith('.gz'):
+            fname = fname[:-3]
+        flags = 0x08 if fname else 0x00
+        xfl = {1: 4, 9: 2}.get(self.compresslevel, 0)
+        self.fileobj.write(struct.pack('<BBBBLBB', 0x1f, 0x8b, 8, flags, long(time.time()), xfl, 255))
+        if fname:
+            self.fileobj.write(fname + '\0')
+
+    def _submit(self, data, last):
+        self._window.append(self._pool.apply_async(_deflate_block, (data, self.compresslevel, last)))
+        while len(self._window) > 2*self.nthreads:
+            self.fileobj.write(self._window.popleft().get())
+
+    def write(self, data):
+        """Write a string to the file."""
+        if self.closed:
+            raise ValueError("write() on closed ParallelGzipFile object")
+        self._crc = zlib.crc32(data, self._crc)
+        self._size += len(data)
+        self._buffer.append(data)
+        self._buffered += len(data)
+        if self._buffered >= self.block_size:
+            data = ''.join(self._buffer)
+            end = len(data) - len(data) % self.block_size
+            for i in xrange(0, end, self.block_size):
+                self._submit(data[i:i+self.block_size], False)
+            self._buffer = [data[end:]]
+            self._buffered = len(data) - end
+
+    def flush(self):
+        """Does nothing; blocks are written as they are compressed."""
+        pass
+
+    def close(self):
+        """Compress any remaining data, write the gzip trailer, and close the file."""
+        if self.closed:
+            return
+        try:
+            self._submit(''.join(self._buffer), True)
+            while self._window:
+                self.fileobj.write(self._window.popleft().get())
+            self.fileobj.write(struct.pack('<LL', self._crc & 0xffffffffL, self._size & 0xffffffffL))
+        finally:
+            self.closed = True
+            self._buffer = []
+            self._pool.terminate()
+            self._pool.join()
+            if self._owns_fileobj:
+                self.fileobj.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def _iter_file_blocks(paths, block_size=_DEFLATE_BLOCK_SIZE):
+    for path in paths:
+        with open(path, 'rb') as fin:
+            data = fin.read(block_size)
+            while True:
+                next_data = fin.read(block_size)
+                if not next_data:
+                    yield path, data, True
+                    break
+                yield path, data, False
+                data = next_data
+
+
+def _expand_items(items):
+    for item in items:
+        if os.path.isdir(item):
+            for dir_path, _, file_names in os.walk(item):
+                for name in sorted(file_names):
+                    yield os.path.join(dir_path, name)
+        else:
+            yield item
+
+
+class _DeflatedZipWriter(object):
+    """Writes a zip archive of members that have already been deflated.
+    
+    :any:`ZipFile` only writes members it compresses itself, one at a time, so archives of members 
+    compressed by :any:`parallel_deflate` are written by this small writer instead.  Local headers are
+    rewritten with the member's CRC and sizes once the member is complete and zip64 extensions are
+    added where the sizes, offsets, or number of members require them.  The archive can be read by
+    :any:`ZipFile` or any other zip reader.
+    
+    Args:
+        fileobj: File object opened for binary writing.
+        comment (str): Archive comment.
+    """
+    # pylint: disable=too-few-public-methods
+
+    _LOCAL_HEADER = struct.Struct('<4s2B4HL2L2H')
+    _CENTRAL_HEADER = struct.Struct('<4s4B4HL2L5H2L')
+    _END_RECORD = struct.Struct('<4s4H2LH')
+    _END_RECORD64 = struct.Struct('<4sQ2H2L4Q')
+    _END_LOCATOR64 = struct.Struct('<4sLQL')
+    _MAX_16 = 0xffff
+    _MAX_32 = 0xffffffff
+
+    def __init__(self, fileobj, comment=''):
+        self.fileobj = fileobj
+        self.comment = comment
+        self._members = []
+
+    @staticmethod
+    def _dos_time(mtime):
+        tm = time.localtime(mtime)
+        year = min(max(tm.tm_year, 1980), 2107)
+        return (tm.tm_hour << 11 | tm.tm_min << 5 | tm.tm_sec // 2, 
+                (year - 1980) << 9 | tm.tm_mon << 5 | tm.tm_mday)
+
+    def _local_header(self, member):
+        if member['zip64']:
+            extra = struct.pack('<2H2Q', 1, 16, member['file_size'], member['compress_size'])
+            sizes = self._MAX_32, self._MAX_32
+        else:
+            extra = ''
+            sizes = member['compress_size'], member['file_size']
+        return self._LOCAL_HEADER.pack('PK\003\004', member['version'], 0, member['flag_bits'], 8,
+                                       member['dos_time'], member['dos_date'], member['crc'], 
+                                       sizes[0], sizes[1], len(member['name']), len(extra)) + member['name'] + extra
+
+    def add(self, arcname, stat, blocks):
+        """Add a member to the archive.
+        
+        Args:
+            arcname (str): Member name.
+            stat: :any:`os.stat` result of the member's source file.
+            blocks: Iterable of (data, compressed) tuples where `compressed` is the raw deflate stream of `data`.
+                    The concatenated compressed blocks must form a single deflate stream.
+                    
+        Raises:
+            InternalError: The member grew past the zip64 size limit while it was written.
+        """
+        flag_bits = 0
+        if isinstance(arcname, unicode):
+            arcname = arcname.encode('utf-8')
+            flag_bits |= 0x800
+        zip64 = stat.st_size * 1.05 > ZIP64_LIMIT
+        dos_time, dos_date = self._dos_time(stat.st_mtime)
+        member = {'name': arcname, 'flag_bits': flag_bits, 'zip64': zip64, 'version': 45 if zip64 else 20,
+                  'dos_time': dos_time, 'dos_date': dos_date, 'crc': 0, 'file_size': 0, 'compress_size': 0,
+                  'external_attr': (stat.st_mode & 0xFFFF) << 16, 'header_offset': self.fileobj.tell()}
+        self.fileobj.write(self._local_header(member))
+        for data, compressed in blocks:
+            member['crc'] = zlib.crc32(data, member['crc'])
+            member['file_size'] += len(data)
+            member['compress_size'] += len(compressed)
+            self.fileobj.write(compressed)
+        member['crc'] &= self._MAX_32
+        if not zip64 and max(member['file_size'], member['compress_size']) >= self._MAX_32:
+            raise InternalError("'%s' grew past the zip64 limit while it was archived" % arcname)
+        position = self.fileobj.tell()
+        self.fileobj.seek(member['header_offset'])
+        self.fileobj.write(self._local_header(member))
+        self.fileobj.seek(position)
+        self._members.append(member)
+
+    def close(self):
+        """Write the central directory and end of archive records.  Does not close the file object."""
+        central_offset = self.fileobj.tell()
+        for member in self._members:
+            fields = [member['file_size'], member['compress_size'], member['header_offset']]
+            extra = [value for value in fields if value >= self._MAX_32]
+            fields = [min(value, self._MAX_32) for value in fields]
+            extra = struct.pack('<2H%dQ' % len(extra), 1, 8 * len(extra), *extra) if extra else ''
+            version = 45 if extra else member['version']
+            self.fileobj.write(self._CENTRAL_HEADER.pack('PK\001\002', version, 3, version, 0, 
+                                                         member['flag_bits'], 8, member['dos_time'], 
+                                                         member['dos_date'], member['crc'], fields[1], fields[0], 
+                                                         len(member['name']), len(extra), 0, 0, 0, 
+                                                         member['external_attr'], fields[2]))
+            self.fileobj.write(member['name'] + extra)
+        central_size = self.fileobj.tell() - central_offset
+        count = len(self._members)
+        if count > self._MAX_16 or central_offset >= self._MAX_32 or central_size >= self._MAX_32:
+            end64_offset = self.fileobj.tell()
+            self.fileobj.write(self._END_RECORD64.pack('PK\006\006', self._END_RECORD64.size - 12, 45, 45, 0, 0,
+                                                       count, count, central_size, central_offset))
+            self.fileobj.write(self._END_LOCATOR64.pack('PK\006\007', 0, end64_offset, 1))
+        self.fileobj.write(self._END_RECORD.pack('PK\005\006', 0, 0, min(count, self._MAX_16), 
+                                                 min(count, self._MAX_16), min(central_size, self._MAX_32), 
+                                                 min(central_offset, self._MAX_32), len(self.comment)))
+        self.fileobj.write(self.comment)
+
+
+def _create_zip(dest, items, compresslevel, nthreads):
+    """Write a deflated zip archive, compressing members in parallel."""
+    paths = list(_expand_items(items))
+    deflated = parallel_deflate(_iter_file_blocks(paths), compresslevel, nthreads)
+
+    def member_blocks():
+        for _, data, compressed, last in deflated:
+            yield data, compressed
+            if last:
+                break
+
+    try:
+        with open(dest, 'wb') as fout:
+            writer = _DeflatedZipWriter(fout, "Created by TAU Commander")
+            for path in paths:
+                writer.add(os.path.normpath(path).lstrip(os.sep), os.stat(path), member_blocks())
+            writer.close()
+    finally:
+        deflated.close()
+
+
+def _compression_settings(compresslevel, nthreads):
+    from taucmdr import configuration
+    if compresslevel is None:
+        try:
+            compresslevel = int(configuration.get('archive.compress_level'))
+        except KeyError:
+            compresslevel = 6
+    if nthreads is None:
+        try:
+            nthreads = int(configuration.get('archive.compress_threads'))
+        except KeyError:
+            nthreads = multiprocessing.cpu_count()
+    return min(max(compresslevel, 0), 9), max(nthreads, 1)
+
+
+def create_archive(fmt, dest, items, cwd=None, show_progress=True, compresslevel=None, nthreads=None):
     """Creates a new archive file in the specified format.
     
+    'zip', 'gz', and 'tgz' archives are compressed by a pool of threads, see :any:`parallel_deflate`
+    and :any:`ParallelGzipFile`.  The compression level and thread count default to the values of the 
+    ``archive.compress_level`` and ``archive.compress_threads`` configuration keys, if set.
+    
     Args:
         fmt (str): Archive fmt, e.g. 'zip' or 'tgz'.
         dest (str): Path to the archive file that will be created.
         items (list): Items (i.e. files or folders) to add to the archive.
         cwd (str): Current working directory while creating the archive. 
+        show_progress (bool): If True, show a progress spinner while the archive is written.
+        compresslevel (int): Compression level, 0-9.  Default is 6.
+        nthreads (int): Number of compression threads.  Default is the number of CPU cores.
     """
+    compresslevel, nthreads = _compression_settings(compresslevel, nthreads)
     if cwd:
         oldcwd = os.getcwd()
         os.chdir(cwd)
@@ -383,18 +874,20 @@ def create_archive(fmt, dest, items, cwd=None, show_progress=True):
     with context():
         try:
             if fmt == 'zip':
-                with ZipFile(dest, 'w') as archive:
-                    archive.comment = "Created by TAU Commander"
-                    for item in items:
-                        archive.write(item)
-            elif fmt in ('tar', 'tgz', 'tar.bz2'):
-                mode_map = {'tar': 'w', 'tgz': 'w:gz', 'tar.bz2': 'w:bz2'}
+                _create_zip(dest, items, compresslevel, nthreads)
+            elif fmt == 'tgz':
+                with ParallelGzipFile(dest, compresslevel, nthreads) as fout:
+                    with tarfile.open(mode='w|', fileobj=fout) as archive:
+                        for item in items:
+                            archive.add(item)
+            elif fmt in ('tar', 'tar.bz2'):
+                mode_map = {'tar': 'w', 'tar.bz2': 'w:bz2'}
                 with tarfile.open(dest, mode_map[fmt]) as archive:
                     for item in items:
                         archive.add(item)
             elif fmt == 'gz':
-                with open(items[0], 'rb') as fin, gzip.open(dest, 'wb') as fout:
-                    shutil.copyfileobj(fin, fout)
+                with open(items[0], 'rb') as fin, ParallelGzipFile(dest, compresslevel, nthreads) as fout:
+                    shutil.copyfileobj(fin, fout, _DEFLATE_BLOCK_SIZE)
             else:
                 raise InternalError("Invalid archive format: %s" % fmt)
         finally:
@@ -694,3 +1187,30 @@ def _iter_modules(paths, prefix):
                 yielded[name] = True
                 yield importer, name, ispkg
  
+
+
+_SIZE_UNITS = {'': 1, 'K': 1024, 'M': 1024**2, 'G': 1024**3, 'T': 1024**4, 'P': 1024**5}
+
+_SIZE_RE = re.compile(r'^\s*([0-9]*\.?[0-9]+)\s*([KMGTP]?)(?:i?B)?\s*$', re.IGNORECASE)
+
+
+def parse_size(value):
+    """Converts a human readable size, e.g. "1.5GiB" or "200M", to a byte count.
+    
+    Units are powers of 1024 as in :any:`human_size`.
+    
+    Args:
+        value: A number of bytes or a string as produced by :any:`human_size`.
+        
+    Returns:
+        int: The byte count.
+        
+    Raises:
+        ValueError: `value` is not a valid size.
+    """
+    if isinstance(value, (int, long, float)) and not isinstance(value, bool):
+        return int(value)
+    match = _SIZE_RE.match(str(value))
+    if not match:
+        raise ValueError("Invalid size: %r" % value)
+    return int(float(match.group(1)) * _SIZE_UNITS[match.group(2).upper()])